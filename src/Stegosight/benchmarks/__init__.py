@@ -0,0 +1,12 @@
+from .corpus import PROFILES, CoverSpec, ensure_cover
+from .runner import compare_results, load_results, run_benchmarks, write_results
+
+__all__ = [
+    "CoverSpec",
+    "PROFILES",
+    "compare_results",
+    "ensure_cover",
+    "load_results",
+    "run_benchmarks",
+    "write_results",
+]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from ..services.registry import methods
+from .corpus import PROFILES
+from .runner import (
+    ANALYZE_METHODS,
+    DECODE_METHODS,
+    DEFAULT_PAYLOAD_RATIO,
+    DEFAULT_TOLERANCE,
+    compare_results,
+    load_results,
+    run_benchmarks,
+    write_results,
+)
+
+
+def _print_record(record: dict) -> None:
+    line = f"{record['cover']:<28} {record['operation']:<8} {record['method']:<18} {record['status']}"
+    if record["status"] == "ok":
+        line += f"  {record['seconds']:.3f}s  {record['mb_per_s']:.1f} MB/s"
+    elif record["status"] == "error":
+        line += f"  {record['error']}"
+    print(line, flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Stegosight.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="generate the corpus and time every method")
+    run.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    run.add_argument("--corpus", help="directory for the synthetic covers")
+    run.add_argument("--output", "-o", default="benchmark.json")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--payload-ratio", type=float, default=DEFAULT_PAYLOAD_RATIO)
+    run.add_argument(
+        "--method",
+        action="append",
+        choices=sorted({*[spec.key for spec in methods()], *ANALYZE_METHODS, *DECODE_METHODS.values()}),
+        help="only run these method keys",
+    )
+
+    commands.add_parser("methods", help="list registered methods and their cost hints")
+
+    compare = commands.add_parser("compare", help="report regressions between two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+
+    args = parser.parse_args(argv)
+    if args.command == "methods":
+        for spec in methods():
+            formats = " ".join(spec.suffixes) or "-"
+            capabilities = ",".join(sorted(spec.capabilities))
+            print(f"{spec.key:<18} {spec.media:<6} {spec.speed:<9} {spec.memory:<14} {capabilities:<24} {formats}")
+        return 0
+    if args.command == "run":
+        report = run_benchmarks(
+            args.profile,
+            args.corpus,
+            payload_ratio=args.payload_ratio,
+            repeat=args.repeat,
+            methods=set(args.method) if args.method else None,
+            progress=_print_record,
+        )
+        write_results(report, args.output)
+        print(f"results written to {args.output}")
+        return 0
+
+    problems = compare_results(load_results(args.baseline), load_results(args.current), args.tolerance)
+    for problem in problems:
+        print(problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import os
+import struct
+import wave
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+import numpy as np
+
+from ..services.png_stream import filter_band
+
+# Bump when the generators change so stale corpora are not compared.
+CORPUS_VERSION = 3
+BAND_ROWS = 256
+JPEG_QUALITY = 90
+AUDIO_RATE = 44_100
+VIDEO_SIZE = (640, 360)
+VIDEO_FPS = 25
+
+
+@dataclass(frozen=True)
+class CoverSpec:
+    """One synthetic cover: ``kind`` is image/audio/video, ``size`` MP or seconds."""
+
+    kind: str
+    fmt: str
+    size: float
+
+    @property
+    def name(self) -> str:
+        unit = "mp" if self.kind == "image" else "s"
+        return f"{self.kind}-{self.size:g}{unit}-v{CORPUS_VERSION}.{self.fmt}"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+PROFILES: dict[str, list[CoverSpec]] = {
+    "quick": [
+        CoverSpec("image", "bmp", 1),
+        CoverSpec("image", "png", 1),
+        CoverSpec("image", "jpg", 1),
+        CoverSpec("audio", "wav", 60),
+        CoverSpec("video", "avi", 2),
+    ],
+    "standard": [
+        CoverSpec("image", "bmp", 1),
+        CoverSpec("image", "png", 1),
+        CoverSpec("image", "bmp", 10),
+        CoverSpec("image", "png", 10),
+        CoverSpec("image", "jpg", 1),
+        CoverSpec("image", "jpg", 10),
+        CoverSpec("audio", "wav", 60),
+        CoverSpec("audio", "wav", 600),
+        CoverSpec("video", "avi", 10),
+    ],
+    "full": [
+        *(CoverSpec("image", fmt, mp) for mp in (1, 10, 50, 100) for fmt in ("bmp", "png")),
+        *(CoverSpec("image", "jpg", mp) for mp in (1, 10, 50)),
+        *(CoverSpec("audio", "wav", seconds) for seconds in (60, 600, 3600, 7200)),
+        CoverSpec("video", "avi", 10),
+        CoverSpec("video", "avi", 60),
+    ],
+}
+
+
+def _seed(spec: CoverSpec) -> int:
+    return zlib.crc32(spec.name.encode("ascii"))
+
+
+def image_dimensions(megapixels: float) -> tuple[int, int]:
+    """4:3 dimensions (width multiple of 4) closest to ``megapixels``."""
+
+    height = int(round((megapixels * 1e6 * 3 / 4) ** 0.5))
+    width = int(round(height * 4 / 3 / 4)) * 4
+    return width, height
+
+
+def _image_band(seed: int, row0: int, rows: int, width: int) -> np.ndarray:
+    """Smooth gradients with textured and flat tiles, deterministic per band."""
+
+    rng = np.random.default_rng([seed, row0])
+    y = np.arange(row0, row0 + rows, dtype=np.float32)[:, None]
+    x = np.arange(width, dtype=np.float32)[None, :]
+    base = 110 + 60 * np.sin(x / 211.0 + y / 157.0) + 30 * np.cos((x - y) / 389.0)
+    textured = ((x // 256 + y // 256) % 3 == 0).astype(np.float32)
+    band = np.empty((rows, width, 3), dtype=np.uint8)
+    for channel in range(3):
+        noise = rng.normal(0.0, 1.5 + 20.0 * textured, size=(rows, width)).astype(np.float32)
+        band[:, :, channel] = np.clip(base + 12 * channel + noise, 0, 255)
+    return band
+
+
+def _image_bands(spec: CoverSpec) -> tuple[int, int, Iterator[np.ndarray]]:
+    width, height = image_dimensions(spec.size)
+    seed = _seed(spec)
+
+    def bands() -> Iterator[np.ndarray]:
+        for row0 in range(0, height, BAND_ROWS):
+            yield _image_band(seed, row0, min(BAND_ROWS, height - row0), width)
+
+    return width, height, bands()
+
+
+def _write_bmp(path: str, spec: CoverSpec) -> None:
+    width, height, bands = _image_bands(spec)
+    stride = width * 3
+    with open(path, "wb") as handle:
+        # Top-down (negative height) so bands can be written as generated.
+        handle.write(struct.pack("<2sIHHI", b"BM", 54 + stride * height, 0, 0, 54))
+        handle.write(struct.pack("<IiiHHIIiiII", 40, width, -height, 1, 24, 0, stride * height, 2835, 2835, 0, 0))
+        for band in bands:
+            handle.write(np.ascontiguousarray(band[:, :, ::-1]).tobytes())
+
+
+def _png_chunk(handle, ctype: bytes, data: bytes) -> None:
+    handle.write(struct.pack(">I", len(data)) + ctype + data)
+    handle.write(struct.pack(">I", zlib.crc32(ctype + data) & 0xFFFFFFFF))
+
+
+def _write_png(path: str, spec: CoverSpec) -> None:
+    """Adaptively filtered like real encoders, so decoding exercises Average and Paeth."""
+
+    width, height, bands = _image_bands(spec)
+    deflater = zlib.compressobj(6)
+    prev = np.zeros(width * 3, dtype=np.uint8)
+    with open(path, "wb") as handle:
+        handle.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(handle, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        for band in bands:
+            rows = band.reshape(band.shape[0], -1)
+            data = deflater.compress(filter_band(rows, prev, 3))
+            prev = rows[-1]
+            if data:
+                _png_chunk(handle, b"IDAT", data)
+        _png_chunk(handle, b"IDAT", deflater.flush())
+        _png_chunk(handle, b"IEND", b"")
+
+
+def _write_jpg(path: str, spec: CoverSpec) -> None:
+    """Baseline 4:2:0 JPEG; the encoder needs the whole image at once."""
+
+    from PIL import Image
+
+    _width, _height, bands = _image_bands(spec)
+    Image.fromarray(np.concatenate(list(bands))).save(path, "JPEG", quality=JPEG_QUALITY)
+
+
+def _write_wav(path: str, spec: CoverSpec) -> None:
+    """16-bit stereo tones with a slow melody and a noise floor, one second at a time."""
+
+    seed = _seed(spec)
+    with wave.open(path, "wb") as handle:
+        handle.setnchannels(2)
+        handle.setsampwidth(2)
+        handle.setframerate(AUDIO_RATE)
+        for second in range(int(spec.size)):
+            rng = np.random.default_rng([seed, second])
+            t = (np.arange(AUDIO_RATE) + second * AUDIO_RATE) / AUDIO_RATE
+            pitch = 220.0 * 2 ** ((second % 12) / 12)
+            tone = 6000 * np.sin(2 * np.pi * pitch * t) + 2500 * np.sin(2 * np.pi * 3.01 * pitch * t)
+            left = tone + rng.normal(0, 300, AUDIO_RATE)
+            right = 0.8 * tone + rng.normal(0, 300, AUDIO_RATE)
+            frames = np.stack([left, right], axis=1).clip(-32768, 32767).astype("<i2")
+            handle.writeframes(frames.tobytes())
+
+
+def _write_avi(path: str, spec: CoverSpec) -> None:
+    """Uncompressed 24-bit RIFF AVI (``DIB `` frames) with an ``idx1`` index."""
+
+    width, height = VIDEO_SIZE
+    frames = int(spec.size * VIDEO_FPS)
+    frame_bytes = width * height * 3
+    seed = _seed(spec)
+
+    avih = struct.pack(
+        "<14I", 1_000_000 // VIDEO_FPS, frame_bytes * VIDEO_FPS, 0, 0x10, frames, 0, 1,
+        frame_bytes, width, height, 0, 0, 0, 0,
+    )
+    strh = struct.pack(
+        "<4s4sIHHIIIIIIIIhhhh", b"vids", b"DIB ", 0, 0, 0, 0, 1, VIDEO_FPS, 0, frames,
+        frame_bytes, 0xFFFFFFFF, 0, 0, 0, width, height,
+    )
+    strf = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, frame_bytes, 0, 0, 0, 0)
+    strl = b"strl" + b"strh" + struct.pack("<I", len(strh)) + strh + b"strf" + struct.pack("<I", len(strf)) + strf
+    hdrl = b"hdrl" + b"avih" + struct.pack("<I", len(avih)) + avih + b"LIST" + struct.pack("<I", len(strl)) + strl
+    movi_size = 4 + frames * (8 + frame_bytes)
+    idx1_size = 16 * frames
+    riff_size = 4 + (8 + len(hdrl)) + (8 + movi_size) + (8 + idx1_size)
+
+    with open(path, "wb") as handle:
+        handle.write(b"RIFF" + struct.pack("<I", riff_size) + b"AVI ")
+        handle.write(b"LIST" + struct.pack("<I", len(hdrl)) + hdrl)
+        handle.write(b"LIST" + struct.pack("<I", movi_size) + b"movi")
+        for index in range(frames):
+            # A drifting band plus noise keeps consecutive frames related.
+            band = _image_band(seed, index * 7, height, width)
+            handle.write(b"00db" + struct.pack("<I", frame_bytes))
+            handle.write(np.ascontiguousarray(band[::-1, :, ::-1]).tobytes())
+        handle.write(b"idx1" + struct.pack("<I", idx1_size))
+        for index in range(frames):
+            offset = 4 + index * (8 + frame_bytes)
+            handle.write(struct.pack("<4sIII", b"00db", 0x10, offset, frame_bytes))
+
+
+WRITERS = {"bmp": _write_bmp, "png": _write_png, "jpg": _write_jpg, "wav": _write_wav, "avi": _write_avi}
+
+
+def ensure_cover(spec: CoverSpec, directory: str) -> str:
+    """Generate ``spec`` into ``directory`` unless an identical file exists."""
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, spec.name)
+    if not os.path.exists(path):
+        temp = f"{path}.part"
+        WRITERS[spec.fmt](temp, spec)
+        os.replace(temp, path)
+    return path
+
+
+def payload_for(spec: CoverSpec, size: int) -> bytes:
+    """Deterministic pseudo-random secret of ``size`` bytes."""
+
+    return np.random.default_rng([_seed(spec), size]).integers(0, 256, size, dtype=np.uint8).tobytes()
+
+
+__all__ = [
+    "CORPUS_VERSION",
+    "CoverSpec",
+    "PROFILES",
+    "ensure_cover",
+    "image_dimensions",
+    "payload_for",
+]
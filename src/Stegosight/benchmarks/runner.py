@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from ..daemon.screening import DETECTORS, detector_name
+from ..services.embedding import embed_file, extract_file, probe_capacity, supported_methods
+from ..services.profiling import Profiler, peak_rss
+from ..services.registry import EMBED, EXTRACT, MEDIA_TYPES, methods
+from ..services.risk import RiskTracker
+from .corpus import CORPUS_VERSION, PROFILES, CoverSpec, ensure_cover, payload_for
+
+SCHEMA_VERSION = 1
+DEFAULT_PAYLOAD_RATIO = 0.1
+DEFAULT_TOLERANCE = 0.15
+
+# Method keys as listed by EmbedTab, ExtractTab and AnalyzeTab.
+EMBED_METHODS = {media: tuple(spec.key for spec in methods(media, EMBED)) for media in MEDIA_TYPES}
+EXTRACT_METHODS = {media: tuple(spec.key for spec in methods(media, EXTRACT)) for media in MEDIA_TYPES}
+# The analysis tab's detectors, keyed as in the analysis history.
+ANALYZE_METHODS = tuple(sorted({detector_name(detector) for detector in DETECTORS.values()}))
+# Format decoders timed on their own; each is checked pixel for pixel
+# against Pillow's decode of the same cover.
+DECODE_METHODS = {"png": "png_stream"}
+# Embed method that produces the stego file an extract method is timed on.
+EXTRACT_SOURCES = {"adaptive": "content_adaptive"}
+
+
+def _time_stages(stages: list[tuple[str, Callable[[], object]]], repeat: int) -> dict[str, float]:
+    """Median wall time of each stage over ``repeat`` runs."""
+
+    samples: dict[str, list[float]] = {name: [] for name, _ in stages}
+    for _ in range(repeat):
+        for name, stage in stages:
+            started = time.perf_counter()
+            stage()
+            samples[name].append(time.perf_counter() - started)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def run_case(path: str, spec: dict, operation: str, method: str, payload_ratio: float, repeat: int) -> dict:
+    """Benchmark one (cover, operation, method); runs in a fresh process."""
+
+    cover = CoverSpec(**spec)
+    record = {
+        "cover": cover.name,
+        "kind": cover.kind,
+        "format": cover.fmt,
+        "size": cover.size,
+        "bytes": os.path.getsize(path),
+        "operation": operation,
+        "method": method,
+    }
+    if operation == "decode":
+        return _run_decode(path, record, repeat)
+    if operation == "analyze":
+        return _run_analyze(path, record, repeat)
+    engine_method = EXTRACT_SOURCES.get(method, method)
+    if engine_method not in supported_methods(path):
+        return {**record, "status": "unavailable"}
+
+    workdir = tempfile.mkdtemp(prefix="stegosight-bench-")
+    output = os.path.join(workdir, f"stego.{cover.fmt}")
+    try:
+        capacity = probe_capacity(path, engine_method)
+        payload = payload_for(cover, max(int(capacity * payload_ratio), 1))
+        record["payload_bytes"] = len(payload)
+        recovered: list[bytes] = []
+
+        def probe() -> None:
+            probe_capacity(path, engine_method)
+
+        def embed() -> None:
+            embed_file(path, output, payload, engine_method, tracker=RiskTracker())
+
+        def extract() -> None:
+            recovered.append(extract_file(output, method))
+
+        def verify() -> None:
+            if recovered[-1] != payload:
+                raise AssertionError("extracted payload does not match")
+
+        profiler = Profiler(f"{operation}:{method}")
+        if operation == "embed":
+            with profiler.activate():
+                stages = _time_stages([("probe", probe), ("embed", embed)], repeat)
+        else:
+            embed()
+            with profiler.activate():
+                stages = _time_stages([("extract", extract), ("verify", verify)], repeat)
+    except Exception as exc:
+        return {**record, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    finally:
+        if os.path.exists(output):
+            os.remove(output)
+        os.rmdir(workdir)
+
+    return _finish(record, stages, profiler)
+
+
+def _run_analyze(path: str, record: dict, repeat: int) -> dict:
+    detector = DETECTORS[f".{record['format']}"]
+    results: list = []
+
+    def analyze() -> None:
+        results.append(detector(path))
+
+    profiler = Profiler(f"analyze:{record['method']}")
+    try:
+        with profiler.activate():
+            stages = _time_stages([("analyze", analyze)], repeat)
+    except Exception as exc:
+        return {**record, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    return {**_finish(record, stages, profiler), "score": results[-1].score}
+
+
+def _run_decode(path: str, record: dict, repeat: int) -> dict:
+    from PIL import Image
+
+    from ..services.png_stream import read_png_pixels
+
+    decoded: list[np.ndarray] = []
+
+    def decode() -> None:
+        decoded.append(read_png_pixels(path))
+
+    def verify() -> None:
+        with Image.open(path) as image:
+            reference = np.asarray(image)
+        if not np.array_equal(decoded[-1].reshape(reference.shape), reference):
+            raise AssertionError("decoded pixels differ from Pillow's")
+
+    profiler = Profiler(f"decode:{record['method']}")
+    try:
+        with profiler.activate():
+            stages = _time_stages([("decode", decode), ("verify", verify)], repeat)
+    except Exception as exc:
+        return {**record, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    return _finish(record, stages, profiler)
+
+
+def _finish(record: dict, stages: dict[str, float], profiler: Profiler) -> dict:
+    seconds = sum(stages.values())
+    return {
+        **record,
+        "status": "ok",
+        "seconds": seconds,
+        "mb_per_s": record["bytes"] / (1 << 20) / seconds if seconds > 0 else None,
+        "stages": stages,
+        # Engine-internal breakdown, summed over all repeats.
+        "profile": profiler.to_dict()["stages"],
+        "peak_rss_bytes": peak_rss(),
+    }
+
+
+def _cases(spec: CoverSpec) -> list[tuple[str, str]]:
+    cases = (
+        [("embed", method) for method in EMBED_METHODS[spec.kind]]
+        + [("extract", method) for method in EXTRACT_METHODS[spec.kind]]
+    )
+    detector = DETECTORS.get(f".{spec.fmt}")
+    if detector is not None:
+        cases.append(("analyze", detector_name(detector)))
+    if spec.fmt in DECODE_METHODS:
+        cases.append(("decode", DECODE_METHODS[spec.fmt]))
+    return cases
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(
+    profile: str = "quick",
+    corpus_dir: str | None = None,
+    *,
+    payload_ratio: float = DEFAULT_PAYLOAD_RATIO,
+    repeat: int = 3,
+    methods: set[str] | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """Generate the ``profile`` corpus and benchmark every listed method on it.
+
+    Each case runs in its own spawned process so ``peak_rss_bytes`` belongs
+    to that case alone.
+    """
+
+    if profile not in PROFILES:
+        raise ValueError(f"unknown benchmark profile {profile!r}")
+    corpus_dir = corpus_dir or os.path.join(tempfile.gettempdir(), "stegosight-corpus")
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for spec in PROFILES[profile]:
+        path = ensure_cover(spec, corpus_dir)
+        for operation, method in _cases(spec):
+            if methods and method not in methods:
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                record = pool.submit(
+                    run_case, path, spec.to_dict(), operation, method, payload_ratio, repeat
+                ).result()
+            results.append(record)
+            if progress is not None:
+                progress(record)
+    return {
+        "schema": SCHEMA_VERSION,
+        "corpus_version": CORPUS_VERSION,
+        "profile": profile,
+        "payload_ratio": payload_ratio,
+        "repeat": repeat,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def write_results(report: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Describe every case that got slower than ``tolerance`` or stopped working."""
+
+    if (baseline.get("schema"), baseline.get("corpus_version")) != (
+        current.get("schema"),
+        current.get("corpus_version"),
+    ):
+        return ["results were produced by different schema or corpus versions"]
+
+    def keyed(report: dict) -> dict[tuple[str, str, str], dict]:
+        return {(r["cover"], r["operation"], r["method"]): r for r in report["results"]}
+
+    before, after = keyed(baseline), keyed(current)
+    problems = []
+    for key, old in sorted(before.items()):
+        new = after.get(key)
+        label = "/".join(key)
+        if old["status"] != "ok":
+            continue
+        if new is None or new["status"] != "ok":
+            problems.append(f"{label}: was ok, now {new['status'] if new else 'missing'}")
+            continue
+        for stage, seconds in old["stages"].items():
+            now = new["stages"].get(stage)
+            if now is not None and seconds > 0 and now > seconds * (1 + tolerance):
+                problems.append(f"{label} [{stage}]: {seconds:.4f}s -> {now:.4f}s (+{now / seconds - 1:.0%})")
+    return problems
+
+
+__all__ = [
+    "ANALYZE_METHODS",
+    "DECODE_METHODS",
+    "EMBED_METHODS",
+    "EXTRACT_METHODS",
+    "compare_results",
+    "environment",
+    "load_results",
+    "run_benchmarks",
+    "run_case",
+    "write_results",
+]
@@ -0,0 +1,24 @@
+from .screening import DETECTORS, ScreenResult, detector_name, file_digest, screen_file
+from .server import AnalysisServer
+from .service import WatchDaemon, WatchSettings, WatchStats
+from .store import JsonlStore, SqliteStore, open_store, query_results
+from .watcher import InotifyWatcher, PollingWatcher, open_watcher
+
+__all__ = [
+    "AnalysisServer",
+    "DETECTORS",
+    "InotifyWatcher",
+    "JsonlStore",
+    "PollingWatcher",
+    "ScreenResult",
+    "SqliteStore",
+    "WatchDaemon",
+    "WatchSettings",
+    "WatchStats",
+    "detector_name",
+    "file_digest",
+    "open_store",
+    "open_watcher",
+    "query_results",
+    "screen_file",
+]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from ..core.logging_conf import setup_logging
+from .server import (
+    DEFAULT_HOST,
+    DEFAULT_MAX_UPLOAD,
+    DEFAULT_OUTPUT_DIR,
+    DEFAULT_PORT,
+    DEFAULT_QUEUE,
+    TOKEN_HEADER,
+    AnalysisServer,
+)
+from .service import WatchDaemon, WatchSettings
+from .store import open_store, query_results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Stegosight.daemon")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    watch = commands.add_parser("watch", help="screen files arriving in a folder")
+    watch.add_argument("folder")
+    watch.add_argument(
+        "--store", default="screening.db", help="results database (.db) or JSON Lines file (.jsonl)"
+    )
+    watch.add_argument("--workers", type=int, help="analysis processes (default: one per CPU)")
+    watch.add_argument("--queue-size", type=int, default=64, help="files in flight before intake pauses")
+    watch.add_argument("--interval", type=float, default=1.0, help="polling period in seconds")
+    watch.add_argument("--poll", action="store_true", help="poll even where inotify is available")
+    watch.add_argument("--once", action="store_true", help="screen what is there now, then exit")
+
+    serve = commands.add_parser("serve", help="answer analyze/extract/embed requests over local HTTP")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, help="warm worker processes (default: one per CPU)")
+    serve.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE, help="requests waiting before 503")
+    serve.add_argument("--max-upload", type=int, default=DEFAULT_MAX_UPLOAD, help="largest upload in bytes")
+    serve.add_argument("--spool-dir", help="where uploads are spooled (default: system temp)")
+    serve.add_argument(
+        "--output-dir", default=DEFAULT_OUTPUT_DIR, help="the only folder /embed may write stego files to"
+    )
+
+    history = commands.add_parser("history", help="list stored screening results as JSON Lines")
+    history.add_argument("--store", default="screening.db", help="results database written by watch")
+    history.add_argument("--detector", help="e.g. jpeg_analysis, audio_analysis, video_analysis")
+    history.add_argument("--status", choices=("ok", "unsupported", "error"))
+    history.add_argument("--min-score", type=int)
+    history.add_argument("--min-chi-square", type=float, help="lowest chi-square p-value")
+    history.add_argument("--days", type=float, help="only results from the last N days")
+    history.add_argument("--digest")
+    history.add_argument("--limit", type=int, default=1000)
+
+    index = commands.add_parser("index-covers", help="add a reference corpus to the cover index")
+    index.add_argument("folders", nargs="+")
+    index.add_argument("--index", help="index file (default: in the user data folder)")
+    index.add_argument("--workers", type=int, help="hashing processes (default: one per CPU)")
+    index.add_argument("--prune", action="store_true", help="also drop files that no longer exist")
+
+    find = commands.add_parser("find-cover", help="list likely original covers of a suspect image")
+    find.add_argument("file")
+    find.add_argument("--index", help="index file (default: in the user data folder)")
+    find.add_argument("-k", type=int, default=5, help="candidates to list")
+    find.add_argument("--radius", type=int, default=7, help="largest pHash distance in bits")
+
+    args = parser.parse_args(argv)
+    if args.command == "history":
+        return _history(args)
+    if args.command == "find-cover":
+        return _find_cover(args)
+    setup_logging("Stegosight")
+    if args.command == "serve":
+        return _serve(args)
+    if args.command == "index-covers":
+        return _index_covers(args)
+    settings = WatchSettings(
+        args.folder,
+        args.store,
+        workers=args.workers,
+        queue_size=max(1, args.queue_size),
+        interval=args.interval,
+        use_inotify=not args.poll,
+    )
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    with open_store(settings.store) as store:
+        stats = WatchDaemon(settings, store).run(stop, until_idle=args.once)
+    print(stats.summary())
+    return 1 if args.once and stats.errors else 0
+
+
+def _history(args: argparse.Namespace) -> int:
+    results = query_results(
+        args.store,
+        detector=args.detector,
+        status=args.status,
+        min_score=args.min_score,
+        min_chi_square=args.min_chi_square,
+        since=time.time() - args.days * 86400 if args.days is not None else None,
+        digest=args.digest,
+        limit=args.limit if args.limit > 0 else None,
+    )
+    for result in results:
+        print(json.dumps(result.to_record(), ensure_ascii=False))
+    return 0
+
+
+def _index_covers(args: argparse.Namespace) -> int:
+    from ..services.cover_index import CoverIndex, default_index_path
+
+    path = args.index or default_index_path()
+    index = CoverIndex.open(path)
+    before = len(index)
+    started = time.monotonic()
+    hashed = sum(index.update_folder(folder, max_workers=args.workers) for folder in args.folders)
+    dropped = index.prune() if args.prune else 0
+    index.save(path)
+    print(
+        f"{path}: {len(index)} images ({len(index) - before + dropped} new, {hashed} hashed, "
+        f"{dropped} dropped) in {time.monotonic() - started:.1f}s"
+    )
+    return 0
+
+
+def _find_cover(args: argparse.Namespace) -> int:
+    from ..services.cover_index import CoverIndex, default_index_path
+
+    path = args.index or default_index_path()
+    if not os.path.exists(path):
+        print(f"no cover index at {path}; run index-covers first", file=sys.stderr)
+        return 1
+    matches = CoverIndex.load(path).nearest(args.file, k=args.k, radius=args.radius)
+    for match in matches:
+        print(f"{match.distance:2d}  {match.dhash_distance:2d}  {match.path}")
+    return 0 if matches else 1
+
+
+def _serve(args: argparse.Namespace) -> int:
+    with AnalysisServer(
+        args.host,
+        args.port,
+        workers=args.workers,
+        queue_size=max(0, args.queue_size),
+        max_upload=args.max_upload,
+        spool_dir=args.spool_dir,
+        output_dir=args.output_dir,
+    ) as server:
+        # shutdown() waits for serve_forever(), so it cannot run in the signal handler's thread.
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: threading.Thread(target=server.shutdown).start())
+        host, port = server.server_address[:2]
+        print(f"serving on http://{host}:{port} with {server.workers} warm workers", flush=True)
+        print(f"{TOKEN_HEADER}: {server.token}", flush=True)
+        print(f"/embed writes to {server.output_dir}", flush=True)
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
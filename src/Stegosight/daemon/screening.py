@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from dataclasses import asdict, dataclass
+
+from ..services.ingest import read_chunks
+from ..services.registry import EngineRef
+
+# The analysis tab's detectors, imported in the worker that first needs them.
+DETECTORS: dict[str, EngineRef] = {
+    ".jpg": EngineRef(".jpeg_analysis:analyze_jpeg"),
+    ".jpeg": EngineRef(".jpeg_analysis:analyze_jpeg"),
+    ".wav": EngineRef(".audio_analysis:analyze_audio"),
+    ".wave": EngineRef(".audio_analysis:analyze_audio"),
+    ".avi": EngineRef(".video_analysis:analyze_video"),
+}
+
+
+@dataclass(frozen=True)
+class ScreenResult:
+    """Outcome of screening one intake file."""
+
+    path: str
+    digest: str
+    size: int
+    status: str  # "ok", "unsupported" or "error"
+    score: int | None = None
+    level: str = ""
+    summary: str = ""
+    seconds: float = 0.0
+    screened_at: float = 0.0
+    detector: str = ""  # analysis module, e.g. "jpeg_analysis"
+    chi_square: float | None = None  # the detector's pair-of-values p
+
+    @classmethod
+    def from_analysis(
+        cls, path: str, digest: str, size: int, detector: str, analysis, seconds: float
+    ) -> ScreenResult:
+        """Record a JPEG, audio or video analysis (anything with ``score``/``level``/``summary()``)."""
+
+        chi_square = getattr(analysis, "chi_square_p", None)
+        return cls(
+            path,
+            digest,
+            size,
+            "ok",
+            analysis.score,
+            analysis.level,
+            analysis.summary(),
+            seconds,
+            time.time(),
+            detector,
+            None if chi_square is None else float(chi_square),
+        )
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    def to_record(self) -> dict:
+        return asdict(self)
+
+
+def detector_name(detector: EngineRef) -> str:
+    """The analysis module behind ``detector``, as stored with its results."""
+
+    return detector.target.partition(":")[0].lstrip(".")
+
+
+def file_digest(path: str) -> str:
+    """BLAKE2b-128 of the file's content, read in chunks."""
+
+    hasher = hashlib.blake2b(digest_size=16)
+    for chunk in read_chunks(path):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def screen_file(path: str, digest: str) -> ScreenResult:
+    """Run the detector for ``path``'s format; errors are reported, not raised."""
+
+    started = time.perf_counter()
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    detector = DETECTORS.get(os.path.splitext(path)[1].lower())
+    if detector is None:
+        return ScreenResult(path, digest, size, "unsupported", screened_at=time.time())
+    name = detector_name(detector)
+    try:
+        analysis = detector(path)
+    except Exception as exc:
+        return ScreenResult(
+            path,
+            digest,
+            size,
+            "error",
+            summary=str(exc),
+            seconds=time.perf_counter() - started,
+            screened_at=time.time(),
+            detector=name,
+        )
+    return ScreenResult.from_analysis(path, digest, size, name, analysis, time.perf_counter() - started)
+
+
+__all__ = ["DETECTORS", "ScreenResult", "detector_name", "file_digest", "screen_file"]
@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ..services.header import PayloadError
+from ..services.sink import ResultSink, discard_file
+from .screening import DETECTORS, screen_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE = 32
+DEFAULT_MAX_UPLOAD = 1 << 30
+UPLOAD_CHUNK = 1 << 20
+DEFAULT_OUTPUT_DIR = "stegosight-output"
+PASSWORD_HEADER = "X-Stegosight-Password"
+TOKEN_HEADER = "X-Stegosight-Token"
+
+
+# ----------------------------------------------------------------------
+# Worker side: every function below runs in a pool process.
+
+
+def _warm_worker() -> None:
+    """Import every engine and detector once, when the worker process starts."""
+
+    from ..services.registry import format_engine, format_suffixes
+
+    for suffix in format_suffixes():
+        engine = format_engine(suffix)
+        engine.embed.resolve()
+        engine.extract.resolve()
+    for detector in DETECTORS.values():
+        detector.resolve()
+    from ..services import ingest, keys  # noqa: F401  (pipeline and sealing)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _extract(path: str, method: str, password: str | None, spool_dir: str | None) -> tuple[str, int]:
+    """Extract into a new spool file; returns its path and size."""
+
+    from ..services.embedding import extract_file
+    from ..services.ingest import UnpackWriter
+
+    data = extract_file(path, method, password=password)
+    with ResultSink(spool_dir) as sink:
+        output = UnpackWriter(sink)
+        output.write(data)
+        output.close()
+    return sink.path, sink.size
+
+
+def _embed(cover: str, secret: str, output: str, method: str, password: str | None) -> dict:
+    from ..services.embedding import embed_file
+    from ..services.ingest import ingest_secret
+    from ..services.risk import RiskTracker
+
+    tracker = RiskTracker()
+    spooled = ingest_secret(secret, os.path.dirname(os.path.abspath(output)), password=password)
+    try:
+        with spooled.mapped() as payload:
+            changed = embed_file(
+                cover, output, payload, method, tracker=tracker, **({"key": password} if password else {})
+            )
+    finally:
+        discard_file(spooled.path)
+    report = tracker.report()
+    return {
+        "output": output,
+        "method": method,
+        "changed": changed,
+        "payload_bytes": spooled.size,
+        "secret_bytes": spooled.source_bytes,
+        "risk_score": report.score,
+        "risk_level": report.level,
+    }
+
+
+# ----------------------------------------------------------------------
+# Server side.
+
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    """Local JSON-over-HTTP front end to a pool of pre-warmed worker processes.
+
+    Endpoints (``POST`` bodies are either the raw file, streamed to a spool
+    file as it arrives, or a JSON object naming a local ``path``):
+
+    * ``GET /health`` — pool size and load; the only call without a token.
+    * ``POST /analyze?name=<file>`` — screening result as JSON.
+    * ``POST /extract?name=<file>&method=<key>`` — the payload as
+      ``application/octet-stream``; a password goes in the
+      ``X-Stegosight-Password`` header.
+    * ``POST /embed`` — JSON ``{"cover", "secret", "output"?, "method",
+      "password"?}`` with local paths; ``output`` is resolved inside
+      ``output_dir``.  Returns the embedding report.
+
+    Every other request must carry ``token`` (random per start unless given)
+    in the ``X-Stegosight-Token`` header, and every request's ``Host`` must
+    name the bound address, so web pages cannot drive the server through
+    the browser, DNS rebinding included.
+
+    At most ``workers`` jobs run at once and ``queue_size`` more wait for a
+    worker; beyond that requests are turned away with ``503`` and a
+    ``Retry-After`` header instead of piling up.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        *,
+        workers: int | None = None,
+        queue_size: int = DEFAULT_QUEUE,
+        max_upload: int = DEFAULT_MAX_UPLOAD,
+        spool_dir: str | None = None,
+        output_dir: str = DEFAULT_OUTPUT_DIR,
+        token: str | None = None,
+    ) -> None:
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_size = queue_size
+        self.max_upload = max_upload
+        self.spool_dir = spool_dir
+        self.output_dir = os.path.realpath(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.token = token or secrets.token_urlsafe(32)
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.served = 0
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Workers are started (and warmed) now, not by the first request.
+        for future in [self.pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        super().__init__((host, port), AnalysisRequestHandler)
+
+    def __exit__(self, *exc_info) -> None:
+        super().__exit__(*exc_info)
+        self.pool.shutdown(cancel_futures=True)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Admit one request, or raise 503 when every worker and queue slot is taken."""
+
+        if not self._slots.acquire(blocking=False):
+            raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE, "server is busy; retry later")
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.served += 1
+            self._slots.release()
+
+    def allowed_hosts(self) -> set[str] | None:
+        """``Host`` values naming the bound address; ``None`` when bound to every interface."""
+
+        host, port = self.server_address[:2]
+        address = ipaddress.ip_address(host)
+        if address.is_unspecified:
+            return None
+        names = {f"[{host}]" if address.version == 6 else host}
+        if address.is_loopback:
+            names.add("localhost")
+        return {f"{name}:{port}" for name in names} | (names if port == 80 else set())
+
+    def authorized(self, token: str | None) -> bool:
+        return token is not None and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def output_path(self, requested: str) -> str:
+        """``requested`` resolved inside :attr:`output_dir`, which it may not leave."""
+
+        path = os.path.realpath(os.path.join(self.output_dir, requested))
+        if os.path.commonpath([path, self.output_dir]) != self.output_dir or path == self.output_dir:
+            raise RequestError(HTTPStatus.FORBIDDEN, "output must be a file inside the output directory")
+        return path
+
+    def run_job(self, function, *args):
+        """Run ``function(*args)`` on a warm worker and wait for its result."""
+
+        return self.pool.submit(function, *args).result()
+
+    def health(self) -> dict:
+        with self._lock:
+            return {
+                "status": "ok",
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self.active,
+                "served": self.served,
+            }
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    server: AnalysisServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        logger.info("%s %s", self.address_string(), format % args)
+
+    # -- responses -------------------------------------------------------
+    def _send_json(self, status: HTTPStatus, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_file(self, path: str, size: int) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        with open(path, "rb") as handle:
+            while chunk := handle.read(UPLOAD_CHUNK):
+                self.wfile.write(chunk)
+
+    # -- requests --------------------------------------------------------
+    def _check_access(self, with_token: bool = True) -> None:
+        allowed = self.server.allowed_hosts()
+        if allowed is not None and self.headers.get("Host", "").lower() not in allowed:
+            raise RequestError(HTTPStatus.FORBIDDEN, "Host header does not name this server")
+        if with_token and not self.server.authorized(self.headers.get(TOKEN_HEADER)):
+            raise RequestError(HTTPStatus.UNAUTHORIZED, f"missing or wrong {TOKEN_HEADER} header")
+
+    def do_GET(self) -> None:
+        try:
+            path = urlsplit(self.path).path
+            self._check_access(with_token=path != "/health")
+        except RequestError as exc:
+            self._send_json(exc.status, {"error": str(exc)})
+            return
+        if path == "/health":
+            self._send_json(HTTPStatus.OK, self.server.health())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "unknown endpoint"})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        handler = {"/analyze": self._analyze, "/extract": self._extract, "/embed": self._embed}.get(url.path)
+        self._spool: str | None = None
+        try:
+            self._check_access()
+            if handler is None:
+                self._drain()
+                raise RequestError(HTTPStatus.NOT_FOUND, "unknown endpoint")
+            # Admission comes first, so a busy server does not take uploads it cannot serve.
+            with self.server.slot():
+                handler(query)
+        except RequestError as exc:
+            headers = None
+            if exc.status in (
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                HTTPStatus.UNAUTHORIZED,
+                HTTPStatus.FORBIDDEN,
+            ):
+                # The body was not read, so the connection cannot be reused.
+                self.close_connection = True
+                if exc.status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    headers = {"Retry-After": "1"}
+            self._send_json(exc.status, {"error": str(exc)}, headers)
+        except PayloadError as exc:
+            self._send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(exc)})
+        except (OSError, ValueError) as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+        except Exception as exc:
+            logger.exception("request failed")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)})
+        finally:
+            # Uploads are spooled by _receive, which may have failed halfway through the job.
+            discard_file(self._spool)
+
+    def _analyze(self, query: dict) -> None:
+        path, digest = self._receive(query)
+        result = self.server.run_job(screen_file, path, digest)
+        if self._spool is not None:
+            result = dataclasses.replace(result, path=query.get("name", ""))
+        self._send_json(HTTPStatus.OK, result.to_record())
+
+    def _extract(self, query: dict) -> None:
+        path, _digest = self._receive(query)
+        password = self.headers.get(PASSWORD_HEADER) or None
+        output, size = self.server.run_job(
+            _extract, path, query.get("method", "auto"), password, self.server.spool_dir
+        )
+        try:
+            self._send_file(output, size)
+        finally:
+            discard_file(output)
+
+    def _embed(self, query: dict) -> None:
+        request = self._read_json()
+        try:
+            cover, secret, method = request["cover"], request["secret"], request["method"]
+        except KeyError as exc:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"missing field {exc}") from None
+        from ..services.embedding import default_output_path
+
+        output = self.server.output_path(
+            request.get("output") or os.path.basename(default_output_path(cover))
+        )
+        report = self.server.run_job(_embed, cover, secret, output, method, request.get("password"))
+        self._send_json(HTTPStatus.OK, report)
+
+    # -- request bodies --------------------------------------------------
+    def _receive(self, query: dict) -> tuple[str, str]:
+        """``(path, digest)`` of a local ``path`` from JSON, or of the streamed upload."""
+
+        if self.headers.get_content_type() == "application/json":
+            path = self._read_json().get("path")
+            if not path or not os.path.isfile(path):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "JSON requests need an existing 'path'")
+            from .screening import file_digest
+
+            return path, file_digest(path)
+        name = os.path.basename(query.get("name", ""))
+        hasher = hashlib.blake2b(digest_size=16)
+        sink = ResultSink(self.server.spool_dir, suffix=os.path.splitext(name)[1].lower())
+        self._spool = sink.path
+        with sink:
+            for chunk in self._body_chunks():
+                hasher.update(chunk)
+                sink.write(chunk)
+        return sink.path, hasher.hexdigest()
+
+    def _read_json(self) -> dict:
+        data = b"".join(self._body_chunks(limit=1 << 20))
+        try:
+            request = json.loads(data or b"{}")
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "body is not valid JSON") from None
+        if not isinstance(request, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return request
+
+    def _drain(self) -> None:
+        for _ in self._body_chunks():
+            pass
+
+    def _body_chunks(self, limit: int | None = None):
+        """The request body in chunks, for ``Content-Length`` and chunked uploads alike."""
+
+        limit = self.server.max_upload if limit is None else limit
+        received = 0
+
+        def count(size: int) -> None:
+            nonlocal received
+            received += size
+            if received > limit:
+                raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"body exceeds {limit} bytes")
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    return
+                count(size)
+                remaining = size
+                while remaining:
+                    chunk = self.rfile.read(min(remaining, UPLOAD_CHUNK))
+                    if not chunk:
+                        raise RequestError(HTTPStatus.BAD_REQUEST, "upload ended early")
+                    remaining -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+        remaining = int(self.headers.get("Content-Length") or 0)
+        count(remaining)
+        while remaining:
+            chunk = self.rfile.read(min(remaining, UPLOAD_CHUNK))
+            if not chunk:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "upload ended early")
+            remaining -= len(chunk)
+            yield chunk
+
+
+__all__ = ["AnalysisRequestHandler", "AnalysisServer", "RequestError", "TOKEN_HEADER"]
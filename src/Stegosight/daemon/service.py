@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .screening import ScreenResult, file_digest, screen_file
+from .store import JsonlStore, SqliteStore, open_store
+from .watcher import open_watcher, scan_folder
+
+logger = logging.getLogger(__name__)
+
+# Files whose (size, mtime) were already hashed; older entries are forgotten first.
+KNOWN_LIMIT = 10_000
+# Longest the loop waits on the watcher while screens are running.
+BUSY_POLL = 0.2
+
+
+@dataclass(frozen=True)
+class WatchSettings:
+    """How the watch daemon screens ``folder``.
+
+    ``queue_size`` caps the files handed to the pool and not yet finished;
+    once it is reached the daemon stops taking new files until a worker
+    frees up, leaving bursts queued in the folder rather than in memory.
+    """
+
+    folder: str
+    store: str = "screening.db"  # .db/.sqlite for SQLite, anything else for JSON Lines
+    workers: int | None = None  # default: one per CPU
+    queue_size: int = 64
+    interval: float = 1.0  # polling period, also how long a file must stay unchanged
+    use_inotify: bool = True
+
+
+@dataclass
+class WatchStats:
+    screened: int = 0
+    duplicates: int = 0
+    errors: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def files_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.screened * 60.0 / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.screened} screened · {self.duplicates} duplicates · {self.errors} errors · "
+            f"{self.files_per_minute:.1f} files/min"
+        )
+
+
+class WatchDaemon:
+    """Screens files as they arrive in a folder, on a process pool.
+
+    Files already in the folder are screened first.  Each file is hashed
+    before it is queued, and content already in the store (or in flight)
+    is recorded as a duplicate instead of being analysed again.
+    """
+
+    def __init__(
+        self,
+        settings: WatchSettings,
+        store: JsonlStore | SqliteStore | None = None,
+        *,
+        on_result: Callable[[ScreenResult], None] | None = None,
+    ) -> None:
+        self.settings = settings
+        self.store = store if store is not None else open_store(settings.store)
+        self.on_result = on_result
+        self.stats = WatchStats()
+        self._backlog: deque[str] = deque()
+        self._in_flight: dict[Future, tuple[str, str]] = {}
+        self._known: OrderedDict[str, tuple[int, int]] = OrderedDict()
+
+    @property
+    def workers(self) -> int:
+        return max(1, self.settings.workers or os.cpu_count() or 1)
+
+    def run(self, stop: threading.Event | None = None, *, until_idle: bool = False) -> WatchStats:
+        """Watch until ``stop`` is set; with ``until_idle``, return once nothing is left to do."""
+
+        stop = stop or threading.Event()
+        settings = self.settings
+        self.stats = WatchStats()
+        logger.info(
+            "watching %s with %d workers (queue %d)", settings.folder, self.workers, settings.queue_size
+        )
+        with ProcessPoolExecutor(max_workers=self.workers) as pool, open_watcher(
+            settings.folder, interval=settings.interval, use_inotify=settings.use_inotify
+        ) as watcher:
+            self._backlog.extend(scan_folder(settings.folder))
+            while not stop.is_set():
+                while self._backlog and len(self._in_flight) < settings.queue_size:
+                    self._submit(pool, self._backlog.popleft())
+                if len(self._in_flight) >= settings.queue_size:
+                    # Backpressure: new arrivals wait in the folder until a worker frees up.
+                    self._finish(wait(self._in_flight, timeout=settings.interval, return_when=FIRST_COMPLETED)[0])
+                    continue
+                self._backlog.extend(watcher.poll(BUSY_POLL if self._in_flight else settings.interval))
+                self._finish([future for future in self._in_flight if future.done()])
+                if not self._in_flight:
+                    self.store.flush()  # nothing running: write out the last partial batch
+                if until_idle and not self._backlog and not self._in_flight:
+                    break
+            self._finish(wait(self._in_flight)[0])
+        self.store.flush()
+        logger.info("stopped: %s", self.stats.summary())
+        return self.stats
+
+    def _submit(self, pool: ProcessPoolExecutor, path: str) -> None:
+        try:
+            info = os.stat(path)
+            signature = (info.st_size, info.st_mtime_ns)
+            if self._known.get(path) == signature:
+                return
+            digest = file_digest(path)
+        except OSError as exc:
+            logger.warning("skipping %s: %s", path, exc)
+            return
+        self._known[path] = signature
+        self._known.move_to_end(path)
+        while len(self._known) > KNOWN_LIMIT:
+            self._known.popitem(last=False)
+
+        if self.store.seen(digest) or any(digest == queued for _, queued in self._in_flight.values()):
+            self.stats.duplicates += 1
+            logger.info("duplicate content, not screened: %s", os.path.basename(path))
+            return
+        self._in_flight[pool.submit(screen_file, path, digest)] = (path, digest)
+
+    def _finish(self, futures) -> None:
+        for future in futures:
+            path, digest = self._in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as exc:  # a crashed worker, not a detector error
+                result = ScreenResult(path, digest, 0, "error", summary=str(exc), screened_at=time.time())
+            self.store.add(result)
+            self.stats.screened += 1
+            if result.status == "error":
+                self.stats.errors += 1
+                logger.warning("screening failed for %s: %s", result.path, result.summary)
+            else:
+                logger.info("%s: %s", os.path.basename(result.path), result.summary or result.status)
+            if self.on_result is not None:
+                self.on_result(result)
+
+
+__all__ = ["WatchDaemon", "WatchSettings", "WatchStats"]
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import json
+import operator
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+
+from .screening import ScreenResult
+
+# Results are written in transactions of up to this many rows ...
+BATCH_SIZE = 500
+# ... or after this many seconds, whichever comes first.
+FLUSH_INTERVAL = 1.0
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+_COLUMNS = tuple(field.name for field in fields(ScreenResult))
+_row = operator.attrgetter(*_COLUMNS)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    score INTEGER,
+    level TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    seconds REAL NOT NULL DEFAULT 0,
+    screened_at REAL NOT NULL,
+    detector TEXT NOT NULL DEFAULT '',
+    chi_square REAL
+);
+CREATE INDEX IF NOT EXISTS results_digest ON results (digest);
+CREATE INDEX IF NOT EXISTS results_path ON results (path);
+CREATE INDEX IF NOT EXISTS results_detector ON results (detector, screened_at);
+CREATE INDEX IF NOT EXISTS results_score ON results (score);
+CREATE INDEX IF NOT EXISTS results_chi_square ON results (chi_square);
+CREATE INDEX IF NOT EXISTS results_screened_at ON results (screened_at);
+"""
+
+
+class JsonlStore:
+    """Screening results appended to a JSON Lines file, one record per line.
+
+    The digests already on file are loaded when the store opens, so a
+    restarted daemon does not screen the same content again.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._digests: set[str] = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._digests.add(json.loads(line)["digest"])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # a line cut short by a crash
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def __enter__(self) -> JsonlStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def seen(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._digests
+
+    def add(self, result: ScreenResult) -> None:
+        line = json.dumps(result.to_record(), ensure_ascii=False)
+        with self._lock:
+            self._handle.write(line + "\n")
+            self._handle.flush()
+            self._digests.add(result.digest)
+
+    def flush(self) -> None:
+        """Every line is flushed as it is added; kept for parity with :class:`SqliteStore`."""
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._handle.closed:
+                self._handle.close()
+
+
+def _connect(path: str, *, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        connection = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, timeout=30.0)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        # WAL lets readers (the UI, ``history``) run while a batch is being written.
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+    return connection
+
+
+def _select(
+    connection: sqlite3.Connection,
+    *,
+    digest: str | None = None,
+    path: str | None = None,
+    detector: str | None = None,
+    status: str | None = None,
+    min_score: int | None = None,
+    min_chi_square: float | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    limit: int | None = 1000,
+) -> list[ScreenResult]:
+    clauses: list[str] = []
+    values: list = []
+    for column, op, value in (
+        ("digest", "=", digest),
+        ("path", "=", path),
+        ("detector", "=", detector),
+        ("status", "=", status),
+        ("score", ">=", min_score),
+        ("chi_square", ">=", min_chi_square),
+        ("screened_at", ">=", since),
+        ("screened_at", "<", until),
+    ):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            values.append(value)
+    query = f"SELECT {', '.join(_COLUMNS)} FROM results"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY screened_at DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        values.append(limit)
+    return [ScreenResult(*row) for row in connection.execute(query, values)]
+
+
+class SqliteStore:
+    """Screening results in an indexed SQLite database (WAL mode).
+
+    Results are buffered and written in one transaction per
+    ``batch_size`` rows or ``flush_interval`` seconds, so large runs do
+    not pay a commit per file.  Digests still waiting to be written count
+    as seen.  :meth:`query` filters on the indexed columns, e.g. every
+    JPEG with ``chi_square >= 0.8`` screened since a given time.
+    """
+
+    def __init__(self, path: str, *, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL) -> None:
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._connection = _connect(path)
+        self._pending: list[ScreenResult] = []
+        self._pending_digests: set[str] = set()
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> SqliteStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """Distinct content digests on file."""
+
+        self.flush()
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(DISTINCT digest) FROM results").fetchone()[0]
+
+    def seen(self, digest: str) -> bool:
+        with self._lock:
+            if digest in self._pending_digests:
+                return True
+            row = self._connection.execute("SELECT 1 FROM results WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+            return row is not None
+
+    def add(self, result: ScreenResult) -> None:
+        with self._lock:
+            self._pending.append(result)
+            self._pending_digests.add(result.digest)
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._flushed >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def add_many(self, results) -> None:
+        for result in results:
+            self.add(result)
+
+    def flush(self) -> None:
+        """Write buffered results in a single transaction."""
+
+        with self._lock:
+            self._flushed = time.monotonic()
+            if not self._pending:
+                return
+            placeholders = ", ".join("?" * len(_COLUMNS))
+            with self._connection:
+                self._connection.executemany(
+                    f"INSERT INTO results ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                    [_row(result) for result in self._pending],
+                )
+            self._pending.clear()
+            self._pending_digests.clear()
+
+    def query(self, **filters) -> list[ScreenResult]:
+        """Newest results first; see :func:`query_results` for the filters."""
+
+        self.flush()
+        with self._lock:
+            return _select(self._connection, **filters)
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        self.flush()
+        with self._lock:
+            self._connection.close()
+            self._connection = None
+
+
+def query_results(path: str, **filters) -> list[ScreenResult]:
+    """Query a results database from any thread, on a read-only connection of its own.
+
+    Filters: ``digest``, ``path``, ``detector``, ``status``, ``min_score``,
+    ``min_chi_square``, ``since``/``until`` (epoch seconds) and ``limit``
+    (``None`` for no limit).  A database that does not exist yet has no results.
+    """
+
+    if not os.path.exists(path):
+        return []
+    connection = _connect(path, readonly=True)
+    try:
+        return _select(connection, **filters)
+    finally:
+        connection.close()
+
+
+def open_store(path: str) -> JsonlStore | SqliteStore:
+    """A :class:`SqliteStore` for ``.db``/``.sqlite`` paths, else a :class:`JsonlStore`."""
+
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        return SqliteStore(path)
+    return JsonlStore(path)
+
+
+__all__ = ["JsonlStore", "SqliteStore", "open_store", "query_results"]
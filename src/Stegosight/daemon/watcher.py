@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify(7) flags; only the events that mean "a file is complete" are watched.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def is_candidate(name: str) -> bool:
+    """Hidden files are skipped: they are usually partial writes or our own spools."""
+
+    return not name.startswith(".")
+
+
+def scan_folder(folder: str) -> list[str]:
+    """Every candidate file directly inside ``folder``, oldest first."""
+
+    entries = [entry for entry in os.scandir(folder) if entry.is_file() and is_candidate(entry.name)]
+    entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    return [entry.path for entry in entries]
+
+
+class PollingWatcher:
+    """Finds new or changed files by rescanning ``folder`` every ``interval`` seconds.
+
+    A file is reported once its size and modification time have stayed the
+    same for a whole interval, so files still being copied in are not
+    picked up half-written.
+    """
+
+    def __init__(self, folder: str, interval: float = 1.0) -> None:
+        self.folder = folder
+        self.interval = interval
+        self._pending: dict[str, tuple[int, int]] = {}
+        self._reported: dict[str, tuple[int, int]] = {}
+        self._next = 0.0
+
+    def __enter__(self) -> PollingWatcher:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    def poll(self, timeout: float) -> list[str]:
+        """Paths that became ready, waiting at most ``timeout`` seconds for the next scan."""
+
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            time.sleep(max(timeout, 0.0))
+            return []
+        if delay > 0:
+            time.sleep(delay)
+        self._next = time.monotonic() + self.interval
+
+        ready = []
+        current: dict[str, tuple[int, int]] = {}
+        for entry in os.scandir(self.folder):
+            if not (entry.is_file() and is_candidate(entry.name)):
+                continue
+            info = entry.stat()
+            signature = (info.st_size, info.st_mtime_ns)
+            current[entry.path] = signature
+            if self._reported.get(entry.path) == signature:
+                continue
+            if self._pending.get(entry.path) == signature:
+                ready.append(entry.path)
+                self._reported[entry.path] = signature
+        self._pending = {path: sig for path, sig in current.items() if self._reported.get(path) != sig}
+        self._reported = {path: sig for path, sig in self._reported.items() if path in current}
+        return ready
+
+
+class InotifyWatcher:
+    """Reports files in ``folder`` as soon as they are closed after writing or moved in.
+
+    Linux only (see :func:`inotify_available`).  If the kernel's event queue
+    overflows during a burst, the next :meth:`poll` rescans the folder so
+    nothing is lost.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        libc = _libc()
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        watch = libc.inotify_add_watch(self._fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if watch < 0:
+            code = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(code, f"cannot watch {folder}")
+
+    def __enter__(self) -> InotifyWatcher:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def poll(self, timeout: float) -> list[str]:
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0.0))
+        if not readable:
+            return []
+        ready: list[str] = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                _wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif name and not mask & IN_ISDIR:
+                    decoded = os.fsdecode(name)
+                    if is_candidate(decoded):
+                        ready.append(os.path.join(self.folder, decoded))
+        if overflow:
+            return scan_folder(self.folder)
+        return list(dict.fromkeys(ready))
+
+
+def _libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        _libc()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+def open_watcher(folder: str, *, interval: float = 1.0, use_inotify: bool = True) -> PollingWatcher | InotifyWatcher:
+    """inotify where the platform has it, otherwise polling every ``interval`` seconds."""
+
+    if use_inotify and inotify_available():
+        try:
+            return InotifyWatcher(folder)
+        except OSError:
+            pass
+    return PollingWatcher(folder, interval)
+
+
+__all__ = [
+    "InotifyWatcher",
+    "PollingWatcher",
+    "inotify_available",
+    "is_candidate",
+    "open_watcher",
+    "scan_folder",
+]
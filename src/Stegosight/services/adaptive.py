@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import tempfile
+from typing import Iterator
+
+import numpy as np
+
+from .cost_cache import CostCache
+from .cost_maps import hill_costs, hill_costs_tiled
+from .lsb import lsb_match
+from .payload import HEADER_BITS, bit_window, bits_to_bytes, bytes_to_bits, pack_header, parse_header
+from .permutation import KeyedPermutation
+from .profiling import span
+from .samples import SampleBuffer
+from .stc import DEFAULT_CONSTRAINT, stc_embed, stc_extract, stc_layout
+
+# Content-adaptive embedding always scatters; without a password the order
+# is still keyed, just not secret.
+DEFAULT_KEY = b"stegosight-adaptive"
+
+
+def _batches(blocks: int, block_batch: int | None) -> Iterator[tuple[int, int]]:
+    """``(first, last)`` block ranges of at most ``block_batch`` blocks."""
+
+    step = max(int(block_batch), 1) if block_batch else blocks
+    for first in range(0, blocks, step):
+        yield first, min(first + step, blocks)
+
+
+def adaptive_capacity(samples: SampleBuffer) -> int:
+    """Upper bound on payload bytes (STC at one cover element per bit)."""
+
+    return max((samples.size - HEADER_BITS) // 8, 0)
+
+
+def embed_adaptive(
+    samples: SampleBuffer,
+    costs: np.ndarray,
+    payload: bytes,
+    *,
+    key: bytes | str | None = None,
+    seed: int | None = None,
+    constraint: int = DEFAULT_CONSTRAINT,
+    workers: int | None = None,
+    block_batch: int | None = None,
+) -> int:
+    """Embed ``payload`` with syndrome-trellis coding under ``costs``.
+
+    ``costs`` has one entry per sample (same row-major order as
+    ``samples``).  The header goes into the first keyed positions with plain
+    LSB matching so the extractor can learn the payload length; the body is
+    STC-coded over the following positions.  STC blocks are independent, so
+    ``block_batch`` bounds how many are gathered and coded at once; the
+    output is the same either way.  Returns samples changed.
+    """
+
+    order = KeyedPermutation(samples.size, key or DEFAULT_KEY)
+    rng = np.random.default_rng(seed)
+    flat_costs = np.asarray(costs, dtype=np.float32).reshape(-1)
+
+    with span("adaptive.header"):
+        head = order.range(0, HEADER_BITS)
+        changed = lsb_match(samples, head, bytes_to_bits(pack_header(len(payload))), rng)
+
+    message_bits = len(payload) * 8
+    blocks, block_bits, width = stc_layout(message_bits, samples.size - HEADER_BITS)
+    if width < 1:
+        raise ValueError("payload exceeds the content-adaptive capacity of this cover")
+    length = block_bits * width
+    for first, last in _batches(blocks, block_batch):
+        with span("adaptive.gather", (last - first) * length):
+            body = order.range(HEADER_BITS + first * length, HEADER_BITS + last * length)
+            cover = (samples.gather(body) & 1).astype(np.uint8)
+        # Message bits are unpacked one batch at a time; past the end they read as zero.
+        bits = bit_window(payload, first * block_bits, last * block_bits)
+        part = max(min(last * block_bits, message_bits) - first * block_bits, 0)
+        with span("stc.embed", part // 8):
+            stego = stc_embed(cover, flat_costs[body], bits, constraint=constraint, workers=workers)
+        with span("adaptive.apply"):
+            flips = np.flatnonzero(stego != cover)
+            changed += lsb_match(samples, body[flips], stego[flips], rng)
+            samples.release()
+    return changed
+
+
+def image_costs(
+    samples: SampleBuffer,
+    *,
+    cost_cache: CostCache | None = None,
+    cover_digest: str | None = None,
+    tile_rows: int | None = None,
+) -> np.ndarray:
+    """HILL costs for ``samples``, served from ``cost_cache`` when possible.
+
+    With ``tile_rows`` the map is computed tile by tile straight into a
+    memory map (the cache entry, or an anonymous temporary file).
+    """
+
+    pixels = samples.array
+    with span("cost_map", samples.size, tiled=bool(tile_rows)):
+        cached = cost_cache is not None and cover_digest is not None
+        key = CostCache.make_key(cover_digest, "hill", {"shape": pixels.shape}) if cached else ""
+        if not tile_rows:
+            if not cached:
+                return hill_costs(pixels)
+            return cost_cache.get_or_compute(key, lambda: hill_costs(pixels))
+        if not cached:
+            out = np.memmap(tempfile.TemporaryFile(), dtype=np.float32, mode="w+", shape=pixels.shape)
+            return hill_costs_tiled(pixels, out, tile_rows)
+        return cost_cache.get_or_fill(key, pixels.shape, lambda out: hill_costs_tiled(pixels, out, tile_rows))
+
+
+def embed_image_adaptive(
+    samples: SampleBuffer,
+    payload: bytes,
+    *,
+    cost_cache: CostCache | None = None,
+    cover_digest: str | None = None,
+    tile_rows: int | None = None,
+    **options,
+) -> int:
+    """:func:`embed_adaptive` with HILL costs computed from the image itself.
+
+    With a ``cost_cache`` and the cover's ``cover_digest`` the cost map is
+    reused across embeds of the same cover; ``tile_rows`` selects the tiled,
+    memory-mapped cost map.
+    """
+
+    costs = image_costs(
+        samples, cost_cache=cost_cache, cover_digest=cover_digest, tile_rows=tile_rows
+    )
+    return embed_adaptive(samples, costs, payload, **options)
+
+
+def extract_adaptive(
+    samples: SampleBuffer,
+    *,
+    key: bytes | str | None = None,
+    constraint: int = DEFAULT_CONSTRAINT,
+    block_batch: int | None = None,
+) -> bytes:
+    """Recover a payload written by :func:`embed_adaptive`, ``block_batch`` blocks at a time."""
+
+    order = KeyedPermutation(samples.size, key or DEFAULT_KEY)
+    head = samples.gather(order.range(0, HEADER_BITS)) & 1
+    _flags, length = parse_header(bits_to_bytes(head))
+
+    blocks, block_bits, width = stc_layout(length * 8, samples.size - HEADER_BITS)
+    if width < 1:
+        raise ValueError("declared payload does not fit this cover")
+    size = block_bits * width
+    syndromes = []
+    for first, last in _batches(blocks, block_batch):
+        body = order.range(HEADER_BITS + first * size, HEADER_BITS + last * size)
+        stego = (samples.gather(body) & 1).astype(np.uint8)
+        with span("stc.extract", (last - first) * block_bits // 8):
+            syndromes.append(
+                stc_extract(stego, (last - first) * block_bits, constraint=constraint)
+            )
+    return bits_to_bytes(np.concatenate(syndromes)[: length * 8])
+
+
+__all__ = [
+    "adaptive_capacity",
+    "embed_adaptive",
+    "embed_image_adaptive",
+    "extract_adaptive",
+    "image_costs",
+]
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from .adaptive import DEFAULT_KEY, embed_adaptive, extract_adaptive, image_costs
+from .cost_cache import CostCache
+from .lsb import lsb_match
+from .payload import HEADER_BITS, HEADER_SIZE, PayloadError, bits_to_bytes, bytes_to_bits, pack_header, parse_header
+from .permutation import KeyedPermutation
+from .profiling import span
+from .risk import RiskTracker
+from .samples import SampleBuffer
+from .scene import DEFAULT_BATCH, DEFAULT_SCALE, frame_scores, select_frames
+
+BI_RGB = 0
+SUPPORTED_DEPTHS = {24: 3, 32: 4}
+# Frame 0 carries the frame map; payload frames are chosen among the rest.
+INDEX_FRAME = 0
+INDEX_COUNTS = struct.Struct(">II")
+# Preferred STC width (cover samples per message bit) when choosing how many
+# frames to use; fewer frames are used only up to this embedding rate.
+TARGET_WIDTH = 4
+
+METHODS = ("video_adaptive",)
+
+
+@dataclass(frozen=True)
+class AviLayout:
+    """Geometry and data offsets of the uncompressed video frames of an AVI."""
+
+    width: int
+    height: int
+    bits_per_pixel: int
+    stride: int
+    bottom_up: bool
+    offsets: np.ndarray
+
+    @property
+    def channels(self) -> int:
+        return 3
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.stride * self.height
+
+    @property
+    def frame_samples(self) -> int:
+        return self.width * self.height * self.channels
+
+    @property
+    def frames(self) -> int:
+        return int(self.offsets.size)
+
+
+def _chunks(handle: BinaryIO, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """``(fourcc, size, data_offset)`` for the RIFF chunks up to ``end``."""
+
+    position = handle.tell()
+    while position + 8 <= end:
+        handle.seek(position)
+        head = handle.read(8)
+        if len(head) < 8:
+            return
+        fourcc, size = struct.unpack("<4sI", head)
+        yield fourcc, size, position + 8
+        position += 8 + size + (size & 1)
+
+
+def _list_type(handle: BinaryIO, offset: int) -> bytes:
+    handle.seek(offset)
+    return handle.read(4)
+
+
+def _video_format(handle: BinaryIO, offset: int, size: int) -> tuple[int, tuple | None]:
+    """Stream index and BITMAPINFOHEADER of the first video stream in ``hdrl``."""
+
+    stream = 0
+    handle.seek(offset + 4)
+    for fourcc, length, start in _chunks(handle, offset + size):
+        if fourcc != b"LIST" or _list_type(handle, start) != b"strl":
+            continue
+        kind = None
+        bitmap = None
+        handle.seek(start + 4)
+        for inner, inner_size, inner_start in _chunks(handle, start + length):
+            handle.seek(inner_start)
+            if inner == b"strh":
+                kind = handle.read(4)
+            elif inner == b"strf" and inner_size >= 40:
+                bitmap = struct.unpack("<IiiHHI", handle.read(20))
+        if kind == b"vids" and bitmap is not None:
+            return stream, bitmap
+        stream += 1
+    return stream, None
+
+
+def read_avi_layout(path: str) -> AviLayout:
+    """Parse the headers and ``movi`` index of an uncompressed RIFF AVI.
+
+    Only the first RIFF segment is read (OpenDML ``AVIX`` extensions are
+    ignored) and only BI_RGB 24/32-bit video is supported; chunk headers are
+    walked with seeks, so pixel data is never read.
+    """
+
+    with open(path, "rb") as handle:
+        head = handle.read(12)
+        if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"AVI ":
+            raise ValueError(f"{path} is not an AVI file")
+        end = min(12 + struct.unpack_from("<I", head, 4)[0] - 4, os.fstat(handle.fileno()).st_size)
+
+        bitmap = None
+        stream = 0
+        movi: tuple[int, int] | None = None
+        for fourcc, size, start in _chunks(handle, end):
+            if fourcc != b"LIST":
+                continue
+            kind = _list_type(handle, start)
+            if kind == b"hdrl":
+                stream, bitmap = _video_format(handle, start, size)
+            elif kind == b"movi":
+                movi = (start, size)
+
+        if bitmap is None:
+            raise ValueError("AVI has no video stream")
+        _size, width, height, _planes, bpp, compression = bitmap
+        if compression != BI_RGB or bpp not in SUPPORTED_DEPTHS:
+            raise ValueError("only uncompressed 24/32-bit AVI video is supported")
+        if movi is None:
+            raise ValueError("AVI has no movi list")
+
+        stride = ((width * bpp + 31) // 32) * 4
+        frame_bytes = stride * abs(height)
+        wanted = {f"{stream:02d}db".encode(), f"{stream:02d}dc".encode()}
+        offsets: list[int] = []
+        pending = [movi]
+        while pending:
+            start, size = pending.pop()
+            handle.seek(start + 4)
+            for fourcc, length, data in _chunks(handle, start + size):
+                if fourcc == b"LIST" and _list_type(handle, data) == b"rec ":
+                    pending.append((data, length))
+                elif fourcc in wanted and length == frame_bytes:
+                    # Zero-length chunks repeat the previous frame; skip them.
+                    offsets.append(data)
+    return AviLayout(
+        width=width,
+        height=abs(height),
+        bits_per_pixel=bpp,
+        stride=stride,
+        bottom_up=height > 0,
+        offsets=np.array(sorted(offsets), dtype=np.int64),
+    )
+
+
+class AviFrames:
+    """Memory-mapped access to the frames described by an :class:`AviLayout`."""
+
+    def __init__(self, path: str, mode: str = "r") -> None:
+        self.layout = read_avi_layout(path)
+        self.mapped = np.memmap(path, dtype=np.uint8, mode=mode)
+
+    def __len__(self) -> int:
+        return self.layout.frames
+
+    def pixels(self, index: int) -> np.ndarray:
+        """Top-down ``(height, width, 3)`` view of frame ``index``."""
+
+        layout = self.layout
+        start = int(layout.offsets[index])
+        rows = self.mapped[start : start + layout.frame_bytes].reshape(layout.height, layout.stride)
+        rows = rows[:, : layout.width * layout.bits_per_pixel // 8]
+        if layout.bottom_up:
+            rows = rows[::-1]
+        pixels = rows.reshape(layout.height, layout.width, layout.bits_per_pixel // 8)
+        return pixels[:, :, : layout.channels]
+
+    def samples(self, index: int) -> SampleBuffer:
+        return SampleBuffer(self.pixels(index))
+
+    def previews(self, scale: int = DEFAULT_SCALE) -> Iterator[np.ndarray]:
+        """Every ``scale``-th pixel of every ``scale``-th row, frame by frame."""
+
+        for index in range(len(self)):
+            yield self.pixels(index)[::scale, ::scale]
+
+    def flush(self) -> None:
+        if self.mapped.mode != "r":
+            self.mapped.flush()
+
+
+def _key_bytes(key: bytes | str | None) -> bytes:
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return key or DEFAULT_KEY
+
+
+def _index_bits(frames: int) -> int:
+    return (HEADER_SIZE + INDEX_COUNTS.size + math.ceil(frames / 8)) * 8
+
+
+def _index_order(layout: AviLayout, key: bytes) -> np.ndarray:
+    order = KeyedPermutation(layout.frame_samples, key + b"/index")
+    return order.range(0, _index_bits(layout.frames))
+
+
+def video_capacity(layout: AviLayout) -> int:
+    """Payload bytes that fit when every frame but the index frame is used."""
+
+    usable = max(layout.frames - 1, 0)
+    per_frame = max((layout.frame_samples - HEADER_BITS) // 8 - HEADER_SIZE, 0)
+    return usable * per_frame
+
+
+def frames_needed(layout: AviLayout, payload_bytes: int) -> int:
+    """Frames to spread ``payload_bytes`` over at :data:`TARGET_WIDTH`, at least one."""
+
+    per_frame = max((layout.frame_samples - HEADER_BITS) // TARGET_WIDTH, 1)
+    needed = max(math.ceil(payload_bytes * 8 / per_frame), 1)
+    return min(needed, max(layout.frames - 1, 0), max(payload_bytes, 1))
+
+
+def embed_avi(
+    cover: str,
+    output: str,
+    payload: bytes,
+    method: str = "video_adaptive",
+    *,
+    key: bytes | str | None = None,
+    seed: int | None = None,
+    scale: int = DEFAULT_SCALE,
+    batch: int = DEFAULT_BATCH,
+    workers: int | None = None,
+    tracker: RiskTracker | None = None,
+    cost_cache: CostCache | None = None,
+    cover_digest: str | None = None,
+) -> int:
+    """Copy ``cover`` to ``output`` and hide ``payload`` in its best frames.
+
+    A first pass scores every frame from ``1/scale`` previews (texture and
+    motion, a batch of frames at a time) and picks just enough frames.  Only
+    those are processed at full resolution: each gets its own HILL cost map
+    and a content-adaptive share of the payload under a per-frame key.  The
+    frame map goes into frame 0 with keyed LSB matching.  With a
+    ``cost_cache`` and the cover's ``cover_digest`` each frame's cost map is
+    reused by later embeds into the same cover.  Returns samples changed.
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"method {method!r} is not available for AVI covers")
+
+    with span("avi.copy", os.path.getsize(cover)):
+        shutil.copyfile(cover, output)
+    try:
+        frames = AviFrames(output, mode="r+")
+        layout = frames.layout
+        if layout.frames < 2:
+            raise ValueError("video needs at least two frames")
+        if len(payload) > video_capacity(layout):
+            raise ValueError("payload exceeds the capacity of this video")
+        base = _key_bytes(key)
+        rng = np.random.default_rng(seed)
+
+        with span("scene.score", layout.frames * layout.frame_bytes // (scale * scale)):
+            texture, motion = frame_scores(frames.previews(scale), batch)
+        count = frames_needed(layout, len(payload))
+        chosen = select_frames(texture, motion, count, exclude=(INDEX_FRAME,))
+
+        with span("avi.index"):
+            selected = np.zeros(layout.frames, dtype=bool)
+            selected[chosen] = True
+            index = pack_header(len(payload)) + INDEX_COUNTS.pack(layout.frames, chosen.size)
+            index += np.packbits(selected).tobytes()
+            changed = lsb_match(
+                frames.samples(INDEX_FRAME), _index_order(layout, base), bytes_to_bits(index), rng
+            )
+
+        if tracker is not None:
+            tracker.begin(chosen.size * layout.height, layout.width, layout.channels)
+        share = math.ceil(len(payload) / chosen.size)
+        for slot, frame in enumerate(chosen):
+            samples = frames.samples(int(frame))
+            if tracker is not None:
+                tracker.observe_cover(samples.array)
+                samples.observer = tracker.observer(slot * layout.height)
+            chunk = payload[slot * share : (slot + 1) * share]
+            with span("video.frame", len(chunk)):
+                costs = image_costs(
+                    samples,
+                    cost_cache=cost_cache,
+                    cover_digest=None if cover_digest is None else f"{cover_digest}/frame{frame}",
+                )
+                changed += embed_adaptive(
+                    samples,
+                    costs,
+                    chunk,
+                    key=base + b"/frame%d" % frame,
+                    seed=None if seed is None else seed + slot,
+                    workers=workers,
+                )
+        frames.flush()
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+    return changed
+
+
+def read_frame_map(frames: AviFrames, key: bytes | str | None = None) -> tuple[int, np.ndarray]:
+    """Payload length and selected frame indices stored in the index frame."""
+
+    layout = frames.layout
+    bits = frames.samples(INDEX_FRAME).gather(_index_order(layout, _key_bytes(key))) & 1
+    index = bits_to_bytes(bits)
+    _flags, length = parse_header(index[:HEADER_SIZE])
+    total, count = INDEX_COUNTS.unpack_from(index, HEADER_SIZE)
+    if total != layout.frames:
+        raise PayloadError("frame map does not match this video")
+    selected = np.unpackbits(
+        np.frombuffer(index[HEADER_SIZE + INDEX_COUNTS.size :], dtype=np.uint8), count=total
+    ).astype(bool)
+    chosen = np.flatnonzero(selected)
+    if chosen.size != count or selected[INDEX_FRAME]:
+        raise PayloadError("frame map is corrupt")
+    return length, chosen
+
+
+def extract_avi(path: str, method: str = "video_adaptive", *, key: bytes | str | None = None) -> bytes:
+    """Recover a payload written by :func:`embed_avi`."""
+
+    if method not in METHODS:
+        raise ValueError(f"method {method!r} is not available for AVI covers")
+    frames = AviFrames(path, mode="r")
+    length, chosen = read_frame_map(frames, key)
+    base = _key_bytes(key)
+    parts = []
+    for frame in chosen:
+        with span("video.frame"):
+            parts.append(extract_adaptive(frames.samples(int(frame)), key=base + b"/frame%d" % frame))
+    payload = b"".join(parts)
+    if len(payload) != length:
+        raise PayloadError("video payload is incomplete")
+    return payload
+
+
+def probe_avi_capacity(path: str) -> int:
+    return video_capacity(read_avi_layout(path))
+
+
+__all__ = [
+    "AviFrames",
+    "AviLayout",
+    "embed_avi",
+    "extract_avi",
+    "frames_needed",
+    "probe_avi_capacity",
+    "read_avi_layout",
+    "read_frame_map",
+    "video_capacity",
+]
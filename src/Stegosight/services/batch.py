@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterator, TypeVar
+
+from .embedding import default_output_path, embed_file, probe_capacity
+from .keys import SEAL_OVERHEAD
+from .registry import format_engine
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SecretSpec:
+    """One secret to hide; ``cover``/``method``/``key`` override the batch defaults."""
+
+    secret: str
+    cover: str | None = None
+    method: str | None = None
+    key: str | None = None
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    cover: str
+    secret: str
+    output: str
+    method: str
+    key: str | None = None
+    salt: bytes | None = None  # shared by every shard of one set
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    secret: str
+    cover: str | None
+    output: str | None
+    status: str
+    message: str = ""
+    payload_bytes: int = 0
+    cover_bytes: int = 0
+    changed: int = 0
+    seconds: float = 0.0
+    risk_score: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+@dataclass(frozen=True)
+class BatchSummary:
+    files: int
+    succeeded: int
+    failed: int
+    payload_bytes: int
+    cover_bytes: int
+    elapsed: float
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Cover data processed per second of wall time."""
+
+        return self.cover_bytes / (1 << 20) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def list_covers(folder: str) -> list[str]:
+    """Cover files in ``folder`` whose format has an embedding engine."""
+
+    return sorted(
+        entry.path
+        for entry in os.scandir(folder)
+        if entry.is_file() and format_engine(os.path.splitext(entry.name)[1].lower()) is not None
+    )
+
+
+def list_secrets(folder: str) -> list[SecretSpec]:
+    return [
+        SecretSpec(entry.path)
+        for entry in sorted(os.scandir(folder), key=lambda item: item.name)
+        if entry.is_file()
+    ]
+
+
+def read_manifest(path: str) -> list[SecretSpec]:
+    """Load a JSON manifest: a list of ``{"secret", "cover"?, "method"?, "key"?}``.
+
+    Relative paths are resolved against the manifest's directory.
+    """
+
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as handle:
+        entries = json.load(handle)
+    if not isinstance(entries, list):
+        raise ValueError("batch manifest must be a JSON list")
+
+    specs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"secret": entry}
+        if not isinstance(entry, dict) or "secret" not in entry:
+            raise ValueError("every manifest entry needs a 'secret'")
+        cover = entry.get("cover")
+        specs.append(
+            SecretSpec(
+                os.path.join(base, entry["secret"]),
+                os.path.join(base, cover) if cover else None,
+                entry.get("method"),
+                entry.get("key"),
+            )
+        )
+    return specs
+
+
+def output_path_for(cover: str, output_dir: str) -> str:
+    """Where the stego copy of ``cover`` goes inside ``output_dir``."""
+
+    output = os.path.join(output_dir, os.path.basename(cover))
+    if os.path.abspath(output) == os.path.abspath(cover):
+        output = os.path.join(output_dir, os.path.basename(default_output_path(cover)))
+    return output
+
+
+def plan_batch(
+    covers: list[str],
+    secrets: list[SecretSpec],
+    output_dir: str,
+    method: str,
+    key: str | None = None,
+) -> tuple[list[BatchJob], list[BatchResult]]:
+    """Pair secrets with covers by capacity.
+
+    Capacities come from header probes only, for each secret's own method.
+    Secrets with a fixed cover keep it if it is large enough and no earlier
+    secret claimed it; the rest are placed largest first into the smallest
+    unused cover that still fits (best fit).  Returns the jobs plus a result
+    for every secret that could not be placed.
+    """
+
+    jobs: list[BatchJob] = []
+    rejected: list[BatchResult] = []
+    used: set[str] = set()
+    capacities: dict[tuple[str, str], int | None] = {}
+
+    def capacity(cover: str, spec_method: str) -> int | None:
+        probe = (cover, spec_method)
+        if probe not in capacities:
+            try:
+                capacities[probe] = probe_capacity(cover, spec_method)
+            except (OSError, ValueError):
+                capacities[probe] = None
+        return capacities[probe]
+
+    def needed(spec: SecretSpec) -> int:
+        size = os.path.getsize(spec.secret)
+        if (spec.key if spec.key is not None else key):
+            size += SEAL_OVERHEAD
+        return size
+
+    def job_for(spec: SecretSpec, cover: str) -> BatchJob:
+        used.add(os.path.abspath(cover))
+        return BatchJob(
+            cover,
+            spec.secret,
+            output_path_for(cover, output_dir),
+            spec.method or method,
+            spec.key if spec.key is not None else key,
+        )
+
+    free = []
+    for spec in secrets:
+        if spec.cover is None:
+            free.append(spec)
+        elif os.path.abspath(spec.cover) in used:
+            # A second job would overwrite the first one's output.
+            rejected.append(
+                BatchResult(spec.secret, spec.cover, None, "error", "cover is already used by another secret")
+            )
+        else:
+            available = capacity(spec.cover, spec.method or method)
+            if available is None or available < needed(spec):
+                rejected.append(
+                    BatchResult(spec.secret, spec.cover, None, "unmatched", "the chosen cover is too small")
+                )
+                continue
+            jobs.append(job_for(spec, spec.cover))
+
+    # One best-fit pool per method, built on first use.
+    pools: dict[str, list[tuple[int, str]]] = {}
+
+    def pool_for(spec_method: str) -> list[tuple[int, str]]:
+        if spec_method not in pools:
+            pool = []
+            for cover in covers:
+                if os.path.abspath(cover) in used:
+                    continue
+                available = capacity(cover, spec_method)
+                if available is not None:
+                    pool.append((available, cover))
+            pools[spec_method] = sorted(pool)
+        return pools[spec_method]
+
+    free.sort(key=lambda spec: os.path.getsize(spec.secret), reverse=True)
+    for spec in free:
+        pool = pool_for(spec.method or method)
+        slot = bisect.bisect_left(pool, (needed(spec), ""))
+        if slot == len(pool):
+            rejected.append(
+                BatchResult(spec.secret, None, None, "unmatched", "no remaining cover is large enough")
+            )
+            continue
+        _capacity, cover = pool.pop(slot)
+        for other, covers_left in pools.items():
+            if covers_left is not pool:
+                available = capacities.get((cover, other))
+                if available is not None:
+                    covers_left.remove((available, cover))
+        jobs.append(job_for(spec, cover))
+    return jobs, rejected
+
+
+def run_job(job: BatchJob, memory_budget: int | None = None) -> BatchResult:
+    """Embed one job; errors are reported in the result rather than raised."""
+
+    try:
+        with open(job.secret, "rb") as handle:
+            payload = handle.read()
+    except OSError as exc:
+        return BatchResult(job.secret, job.cover, None, "error", str(exc))
+    return embed_payload(job, payload, memory_budget)
+
+
+def embed_payload(job: BatchJob, payload: bytes, memory_budget: int | None = None) -> BatchResult:
+    """Embed ``payload`` as described by ``job`` and report the outcome."""
+
+    from .risk import RiskTracker
+
+    started = time.perf_counter()
+    try:
+        options = {"password": job.key, "salt": job.salt} if job.key else {}
+        if job.method == "content_adaptive":
+            # Batch jobs already fill the process pool; keep STC in-process.
+            options["workers"] = 1
+        tracker = RiskTracker()
+        changed = embed_file(
+            job.cover,
+            job.output,
+            payload,
+            job.method,
+            tracker=tracker,
+            memory_budget=memory_budget,
+            **options,
+        )
+    except Exception as exc:
+        return BatchResult(
+            job.secret, job.cover, None, "error", str(exc), seconds=time.perf_counter() - started
+        )
+    return BatchResult(
+        job.secret,
+        job.cover,
+        job.output,
+        "ok",
+        payload_bytes=len(payload),
+        cover_bytes=os.path.getsize(job.cover),
+        changed=changed,
+        seconds=time.perf_counter() - started,
+        risk_score=tracker.report().score,
+    )
+
+
+def worker_count(tasks: int, max_workers: int | None = None) -> int:
+    """Processes :func:`run_parallel` will use for ``tasks`` tasks."""
+
+    return max(1, min(max_workers or os.cpu_count() or 1, tasks))
+
+
+def worker_budget(tasks: int, max_workers: int | None = None) -> int:
+    """Each pool worker's share of the memory budget, so jobs run side by side fit."""
+
+    from .memory_plan import default_budget
+
+    return default_budget() // worker_count(tasks, max_workers)
+
+
+def run_parallel(
+    function: Callable[..., T],
+    tasks: list[tuple],
+    max_workers: int | None = None,
+) -> Iterator[T]:
+    """Call ``function(*task)`` for every task on a process pool.
+
+    Results are yielded in completion order; a single worker runs inline.
+    """
+
+    if not tasks:
+        return
+    workers = worker_count(len(tasks), max_workers)
+    if workers == 1:
+        for task in tasks:
+            yield function(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(function, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch(jobs: list[BatchJob], max_workers: int | None = None) -> Iterator[BatchResult]:
+    """Run ``jobs`` across a process pool, yielding results as they finish."""
+
+    for job in jobs:
+        os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+    budget = worker_budget(len(jobs), max_workers)
+    yield from run_parallel(run_job, [(job, budget) for job in jobs], max_workers)
+
+
+def summarize(results: list[BatchResult], elapsed: float) -> BatchSummary:
+    succeeded = [result for result in results if result.ok]
+    return BatchSummary(
+        files=len(results),
+        succeeded=len(succeeded),
+        failed=len(results) - len(succeeded),
+        payload_bytes=sum(result.payload_bytes for result in succeeded),
+        cover_bytes=sum(result.cover_bytes for result in succeeded),
+        elapsed=elapsed,
+    )
+
+
+__all__ = [
+    "BatchJob",
+    "BatchResult",
+    "BatchSummary",
+    "SecretSpec",
+    "embed_payload",
+    "list_covers",
+    "list_secrets",
+    "plan_batch",
+    "output_path_for",
+    "read_manifest",
+    "run_batch",
+    "run_job",
+    "run_parallel",
+    "summarize",
+    "worker_budget",
+    "worker_count",
+]
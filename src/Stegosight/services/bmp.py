@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+from .adaptive import embed_image_adaptive, extract_adaptive
+from .lsb import embed_lsb, extract_lsb
+from .profiling import span
+from .pvd import embed_pvd, extract_pvd
+from .risk import RiskTracker
+from .samples import SampleBuffer
+
+BI_RGB = 0
+BI_BITFIELDS = 3
+SUPPORTED_DEPTHS = {8: 1, 24: 3, 32: 4}
+# 8-bit pixels are palette indices; LSB/PVD only change them by small
+# amounts, which only look like small intensity changes on a grey ramp.
+PALETTE_ENTRIES = 256
+
+EMBEDDERS = {
+    "content_adaptive": embed_image_adaptive,
+    "lsb": embed_lsb,
+    "pvd": embed_pvd,
+}
+EXTRACTORS = {
+    "content_adaptive": extract_adaptive,
+    "lsb": extract_lsb,
+    "pvd": extract_pvd,
+}
+
+
+@dataclass(frozen=True)
+class BmpLayout:
+    """Geometry of an uncompressed BMP pixel array."""
+
+    width: int
+    height: int
+    bits_per_pixel: int
+    pixel_offset: int
+    stride: int
+    bottom_up: bool
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return self.bits_per_pixel // 8
+
+    @property
+    def channels(self) -> int:
+        """Colour channels used for embedding (alpha/padding byte excluded)."""
+
+        return 3 if self.bits_per_pixel == 32 else self.bytes_per_pixel
+
+    @property
+    def pixel_bytes(self) -> int:
+        return self.stride * self.height
+
+
+def read_bmp_layout(path: str) -> BmpLayout:
+    """Parse the BMP file and DIB headers without touching the pixel data."""
+
+    with open(path, "rb") as handle:
+        head = handle.read(14 + 40)
+    if len(head) < 26 or head[:2] != b"BM":
+        raise ValueError(f"{path} is not a BMP file")
+
+    pixel_offset = struct.unpack_from("<I", head, 10)[0]
+    dib_size = struct.unpack_from("<I", head, 14)[0]
+    if dib_size == 12:
+        width, height, _planes, bpp = struct.unpack_from("<HHHH", head, 18)
+        compression = BI_RGB
+    elif dib_size >= 40 and len(head) >= 54:
+        width, height, _planes, bpp, compression = struct.unpack_from("<iiHHI", head, 18)
+    else:
+        raise ValueError(f"unsupported BMP header size {dib_size}")
+
+    if bpp not in SUPPORTED_DEPTHS:
+        raise ValueError(f"unsupported BMP depth {bpp} bpp")
+    if compression not in (BI_RGB, BI_BITFIELDS) or (
+        compression == BI_BITFIELDS and bpp != 32
+    ):
+        raise ValueError("compressed BMP pixel arrays are not supported")
+
+    stride = ((width * bpp + 31) // 32) * 4
+    return BmpLayout(
+        width=width,
+        height=abs(height),
+        bits_per_pixel=bpp,
+        pixel_offset=pixel_offset,
+        stride=stride,
+        bottom_up=height > 0,
+    )
+
+
+def read_palette(path: str) -> np.ndarray:
+    """The colour table of an 8-bit BMP as ``(entries, 3)`` BGR values."""
+
+    with open(path, "rb") as handle:
+        head = handle.read(14 + 40)
+        pixel_offset = struct.unpack_from("<I", head, 10)[0]
+        dib_size = struct.unpack_from("<I", head, 14)[0]
+        entry = 3 if dib_size == 12 else 4
+        count = struct.unpack_from("<I", head, 46)[0] if dib_size >= 40 else 0
+        count = count or PALETTE_ENTRIES
+        handle.seek(14 + dib_size)
+        table = handle.read(min(count * entry, max(0, pixel_offset - 14 - dib_size)))
+    table = np.frombuffer(table[: len(table) // entry * entry], dtype=np.uint8)
+    return table.reshape(-1, entry)[:, :3]
+
+
+def is_grey_ramp(palette: np.ndarray) -> bool:
+    """Whether every index maps to a grey whose level never falls as the index rises."""
+
+    return (
+        len(palette) == PALETTE_ENTRIES
+        and bool((palette == palette[:, :1]).all())
+        and bool((np.diff(palette[:, 0].astype(np.int16)) >= 0).all())
+    )
+
+
+def open_bmp_samples(path: str, mode: str = "r") -> tuple[SampleBuffer, np.memmap]:
+    """Map the BMP pixel array of ``path`` as a :class:`SampleBuffer`.
+
+    ``mode`` follows :class:`numpy.memmap` (``"r"``, ``"r+"`` or the
+    copy-on-write ``"c"``).  Rows are exposed top-down regardless of the
+    on-disk order and row padding is sliced away, all as views over the map.
+    The memmap is returned too so callers can flush it.
+    """
+
+    layout = read_bmp_layout(path)
+    mapped = np.memmap(
+        path,
+        dtype=np.uint8,
+        mode=mode,
+        offset=layout.pixel_offset,
+        shape=(layout.height, layout.stride),
+    )
+    rows = mapped[:, : layout.width * layout.bytes_per_pixel]
+    if layout.bottom_up:
+        rows = rows[::-1]
+    pixels = rows.reshape(layout.height, layout.width, layout.bytes_per_pixel)
+    pixels = pixels[:, :, : layout.channels]
+
+    release = None
+    if mode in ("r", "r+"):
+        # Shared mappings can drop clean pages after a flush, which keeps
+        # the resident set flat while walking a multi-GB pixel array.
+        release = lambda: _release_pages(mapped)  # noqa: E731
+    return SampleBuffer(pixels, release=release), mapped
+
+
+def _release_pages(mapped: np.memmap) -> None:
+    if mapped.mode != "r":
+        mapped.flush()
+    raw = getattr(mapped, "_mmap", None)
+    advise = getattr(raw, "madvise", None)
+    if advise is not None and hasattr(mmap, "MADV_DONTNEED"):
+        advise(mmap.MADV_DONTNEED)
+
+
+def embed_bmp(
+    cover: str,
+    output: str,
+    payload: bytes,
+    method: str = "lsb",
+    *,
+    tracker: RiskTracker | None = None,
+    **options,
+) -> int:
+    """Copy ``cover`` to ``output`` and embed ``payload`` into it in place.
+
+    The copy is done by :func:`shutil.copyfile` (kernel-side on Linux) and
+    the engine then patches only the bytes it changes through the map.  A
+    ``tracker`` samples the cover histogram and then follows every write.
+    Returns the number of samples changed.
+    """
+
+    engine = EMBEDDERS.get(method)
+    if engine is None:
+        raise ValueError(f"method {method!r} is not available for BMP covers")
+    if read_bmp_layout(cover).bits_per_pixel == 8 and not is_grey_ramp(read_palette(cover)):
+        raise ValueError(
+            "8-bit BMP covers must use a 256-level greyscale palette; "
+            "changing indices of a colour palette shows as colour noise"
+        )
+
+    with span("bmp.copy", os.path.getsize(cover)):
+        shutil.copyfile(cover, output)
+    samples, mapped = open_bmp_samples(output, mode="r+")
+    if tracker is not None:
+        with span("risk.sample"):
+            tracker.begin(samples.rows, samples.width, samples.channels)
+            tracker.sample_cover(samples)
+        samples.observer = tracker.observer()
+    with span(f"{method}.embed", len(payload)):
+        changed = engine(samples, payload, **options)
+    with span("bmp.flush"):
+        mapped.flush()
+    return changed
+
+
+def extract_bmp(path: str, method: str = "lsb", **options) -> bytes:
+    """Read a payload embedded by :func:`embed_bmp`."""
+
+    engine = EXTRACTORS.get(method)
+    if engine is None:
+        raise ValueError(f"method {method!r} is not available for BMP covers")
+
+    samples, _mapped = open_bmp_samples(path, mode="r")
+    with span(f"{method}.extract"):
+        return engine(samples, **options)
+
+
+__all__ = [
+    "BmpLayout",
+    "embed_bmp",
+    "extract_bmp",
+    "is_grey_ramp",
+    "open_bmp_samples",
+    "read_bmp_layout",
+    "read_palette",
+]
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+from .header import HEADER_SIZE, MAGIC, PayloadError, frame_payload, parse_header
+from .profiling import span
+from .risk import RiskTracker
+from .tags import MIN_PADDING, Write, apply_writes, clone_file
+
+METHODS = ("video_metadata",)
+MP4_SUFFIXES = (".mp4", ".m4v", ".mov")
+MKV_SUFFIXES = (".mkv", ".webm")
+
+# MP4: boxes whose children are searched for reusable free space.
+MP4_CONTAINERS = {b"moov", b"udta"}
+MP4_FREE = {b"free", b"skip"}
+MAX_BOX = (1 << 32) - 1
+
+# Matroska element ids (marker bits included).
+EBML_SEGMENT = 0x18538067
+EBML_VOID = 0xEC
+EBML_TAGS = 0x1254C367
+EBML_TAG = 0x7373
+EBML_TARGETS = 0x63C0
+EBML_SIMPLE_TAG = 0x67C8
+EBML_TAG_NAME = 0x45A3
+EBML_TAG_BINARY = 0x4485
+TAG_NAME = b"STEGOSIGHT"
+SIZE_WIDTH = 8
+
+
+def _read_at(handle: BinaryIO, offset: int, size: int) -> bytes:
+    handle.seek(offset)
+    return handle.read(size)
+
+
+@dataclass(frozen=True)
+class Space:
+    """A top-level or nested element that may be overwritten in place."""
+
+    offset: int
+    length: int  # header included
+    ours: bool
+    parent: int  # offset of the enclosing box/element, -1 at top level
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+
+def _runs(spaces: list[Space]) -> list[list[Space]]:
+    """Adjacent spaces under the same parent, the run holding the old payload first."""
+
+    runs: list[list[Space]] = []
+    for space in spaces:
+        if runs and runs[-1][-1].end == space.offset and runs[-1][-1].parent == space.parent:
+            runs[-1].append(space)
+        else:
+            runs.append([space])
+    runs.sort(key=lambda run: not any(space.ours for space in run))
+    return runs
+
+
+def _fill_run(run: list[Space], fill, blank, ours: Space | None) -> list[Write] | None:
+    """Writes that place ``fill(total)`` over ``run`` and blank an old payload elsewhere."""
+
+    start, total = run[0].offset, run[-1].end - run[0].offset
+    data = fill(total)
+    if data is None:
+        return None
+    writes = [(start, data)]
+    if ours is not None and ours not in run:
+        writes.append((ours.offset, blank(ours.length)))
+    return writes
+
+
+# ----------------------------------------------------------------------
+# MP4 / QuickTime
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class Mp4Layout:
+    size: int
+    spaces: tuple[Space, ...]
+    open_ended: tuple[int, int] | None  # (offset, length) of a trailing size-0 box
+
+    @property
+    def ours(self) -> Space | None:
+        return next((space for space in self.spaces if space.ours), None)
+
+
+def _boxes(handle: BinaryIO, start: int, end: int) -> Iterator[tuple[bytes, int, int, int]]:
+    """``(type, offset, header, length)`` of the boxes in ``[start, end)``."""
+
+    position = start
+    while position + 8 <= end:
+        head = _read_at(handle, position, 8)
+        size, kind = struct.unpack(">I4s", head)
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read_at(handle, position + 8, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError("MP4 box runs past its parent")
+        yield kind, position, header, size
+        position += size
+
+
+def read_mp4(handle: BinaryIO) -> Mp4Layout:
+    """Find ``free``/``skip`` boxes at the top level and in ``moov``/``udta``.
+
+    Only box headers are read, so the cost does not depend on the ``mdat`` size.
+    """
+
+    size = os.fstat(handle.fileno()).st_size
+    spaces: list[Space] = []
+    open_ended = None
+
+    def walk(start: int, end: int, parent: int) -> None:
+        nonlocal open_ended
+        for kind, offset, header, length in _boxes(handle, start, end):
+            if kind in MP4_FREE:
+                ours = _read_at(handle, offset + header, len(MAGIC)) == MAGIC
+                spaces.append(Space(offset, length, ours, parent))
+            elif kind in MP4_CONTAINERS:
+                walk(offset + header, offset + length, offset)
+            if parent < 0 and header == 8 and _read_at(handle, offset, 4) == b"\0\0\0\0":
+                open_ended = (offset, length)
+
+    first = _read_at(handle, 4, 4)
+    if first not in (b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide"):
+        raise ValueError("not an MP4/QuickTime file")
+    walk(0, size, -1)
+    return Mp4Layout(size, tuple(spaces), open_ended)
+
+
+def _free_box(length: int, data: bytes = b"") -> bytes:
+    """A ``free`` box of exactly ``length`` bytes holding ``data`` then zeros."""
+
+    if length > MAX_BOX:
+        return struct.pack(">I4sQ", 1, b"free", length) + data + bytes(length - 16 - len(data))
+    return struct.pack(">I4s", length, b"free") + data + bytes(length - 8 - len(data))
+
+
+def _mp4_fill(data: bytes):
+    needed = 8 + len(data)
+
+    def fill(total: int) -> bytes | None:
+        if total == needed:
+            return _free_box(needed, data)
+        if total - needed >= 8:
+            return _free_box(needed, data) + _free_box(total - needed)
+        return None
+
+    return fill
+
+
+def _mp4_plan(layout: Mp4Layout, data: bytes) -> list[Write]:
+    if 8 + len(data) > MAX_BOX:
+        raise ValueError("payload is too large for an MP4 box")
+    fill = _mp4_fill(data)
+    for run in _runs(list(layout.spaces)):
+        writes = _fill_run(run, fill, _free_box, layout.ours)
+        if writes is not None:
+            return writes
+
+    # Boxes may follow mdat, so growing at the end moves no sample data and
+    # leaves stco/co64 untouched.
+    writes: list[Write] = []
+    if layout.open_ended is not None:
+        offset, length = layout.open_ended
+        if length > MAX_BOX:
+            raise ValueError("cannot append after an open-ended box over 4 GiB")
+        writes.append((offset, struct.pack(">I", length)))
+    reserve = max(MIN_PADDING, len(data))
+    writes.append((layout.size, _free_box(8 + len(data), data) + _free_box(reserve)))
+    if layout.ours is not None:
+        writes.append((layout.ours.offset, _free_box(layout.ours.length)))
+    return writes
+
+
+def _mp4_read(handle: BinaryIO, layout: Mp4Layout) -> bytes | None:
+    ours = layout.ours
+    if ours is None:
+        return None
+    header = 16 if struct.unpack(">I", _read_at(handle, ours.offset, 4))[0] == 1 else 8
+    head = _read_at(handle, ours.offset + header, HEADER_SIZE)
+    _flags, length = parse_header(head)
+    return head + _read_at(handle, ours.offset + header + HEADER_SIZE, length)
+
+
+# ----------------------------------------------------------------------
+# Matroska / WebM
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class MkvLayout:
+    size: int
+    segment_size: tuple[int, int] | None  # (offset, width) of a known size field
+    segment_data: int
+    at_end: bool
+    spaces: tuple[Space, ...]
+
+    @property
+    def ours(self) -> Space | None:
+        return next((space for space in self.spaces if space.ours), None)
+
+
+def _vint(handle: BinaryIO, offset: int, marker: bool) -> tuple[int, int]:
+    """``(value, width)`` of the EBML variable-length integer at ``offset``."""
+
+    first = _read_at(handle, offset, 1)
+    if not first or first[0] == 0:
+        raise ValueError("invalid EBML variable-length integer")
+    width = 9 - first[0].bit_length()
+    raw = first + _read_at(handle, offset + 1, width - 1)
+    value = int.from_bytes(raw, "big")
+    return (value if marker else value & ((1 << (7 * width)) - 1)), width
+
+
+def _encode_size(value: int, width: int | None = None) -> bytes:
+    if width is None:
+        width = next(w for w in range(1, 9) if value < (1 << (7 * w)) - 1)
+    if value >= (1 << (7 * width)) - 1:
+        raise ValueError("EBML size does not fit its field")
+    return (value | (1 << (7 * width))).to_bytes(width, "big")
+
+
+def _element(element: int, data: bytes, width: int | None = None) -> bytes:
+    return element.to_bytes((element.bit_length() + 7) // 8, "big") + _encode_size(len(data), width) + data
+
+
+def _elements(handle: BinaryIO, start: int, end: int) -> Iterator[tuple[int, int, int, int, int]]:
+    """``(id, offset, data_offset, data_size, size_width)`` of the children in ``[start, end)``."""
+
+    position = start
+    while position < end:
+        element, id_width = _vint(handle, position, True)
+        size, size_width = _vint(handle, position + id_width, False)
+        data = position + id_width + size_width
+        if size == (1 << (7 * size_width)) - 1:
+            if element != EBML_SEGMENT:
+                raise ValueError("unknown-size EBML elements are only supported for the Segment")
+            size = end - data
+        yield element, position, data, size, size_width
+        position = data + size
+
+
+def read_mkv(handle: BinaryIO) -> MkvLayout:
+    """Find Void elements and the STEGOSIGHT Tags at the Segment's top level.
+
+    Clusters are skipped by their size fields, so the walk reads a few bytes
+    per top-level element however large the file is.
+    """
+
+    size = os.fstat(handle.fileno()).st_size
+    if _read_at(handle, 0, 4) != bytes.fromhex("1a45dfa3"):
+        raise ValueError("not a Matroska file")
+    for element, offset, data, length, width in _elements(handle, 0, size):
+        if element != EBML_SEGMENT:
+            continue
+        unknown = _vint(handle, offset + 4, False)[0] == (1 << (7 * width)) - 1
+        spaces = []
+        for child, child_offset, child_data, child_size, _width in _elements(handle, data, data + length):
+            span_length = child_data + child_size - child_offset
+            if child == EBML_VOID:
+                spaces.append(Space(child_offset, span_length, False, offset))
+            elif child == EBML_TAGS and TAG_NAME in _read_at(handle, child_data, 64):
+                spaces.append(Space(child_offset, span_length, True, offset))
+        size_field = None if unknown else (offset + 4, width)
+        # Only a trailing Segment can grow in place.
+        return MkvLayout(size, size_field, data, data + length == size, tuple(spaces))
+    raise ValueError("Matroska file has no Segment")
+
+
+def _mkv_tags(data: bytes, total: int | None = None) -> bytes:
+    """A Tags element holding ``data``, padded to ``total`` bytes with a Void if given."""
+
+    simple = _element(EBML_TAG_NAME, TAG_NAME) + _element(EBML_TAG_BINARY, data)
+    tag = _element(EBML_TARGETS, b"") + _element(EBML_SIMPLE_TAG, simple)
+    body = _element(EBML_TAG, tag)
+    tags = _element(EBML_TAGS, body, SIZE_WIDTH - 1)
+    if total is None or total == len(tags):
+        return tags
+    if total == len(tags) + 1:
+        # No Void is one byte long; widen the size field instead.
+        return _element(EBML_TAGS, body, SIZE_WIDTH)
+    return tags + _void(total - len(tags))
+
+
+def _void(length: int) -> bytes:
+    """A Void element of exactly ``length`` (>= 2) bytes."""
+
+    for width in range(1, 9):
+        size = length - 1 - width
+        if 0 <= size < (1 << (7 * width)) - 1:
+            return b"\xec" + _encode_size(size, width) + bytes(size)
+    raise ValueError("Void element is too large")
+
+
+def _mkv_fill(data: bytes):
+    needed = len(_mkv_tags(data))
+
+    def fill(total: int) -> bytes | None:
+        return _mkv_tags(data, total) if total >= needed else None
+
+    return fill
+
+
+def _mkv_plan(layout: MkvLayout, data: bytes) -> list[Write]:
+    fill = _mkv_fill(data)
+    for run in _runs(list(layout.spaces)):
+        writes = _fill_run(run, fill, _void, layout.ours)
+        if writes is not None:
+            return writes
+
+    # Appending at the end of the Segment leaves every Cluster, Cue and
+    # SeekHead position where it was; only the Segment size changes.
+    if not layout.at_end:
+        raise ValueError("the Matroska Segment is not at the end of the file")
+    tail = _mkv_tags(data) + _void(max(MIN_PADDING, len(data)))
+    writes: list[Write] = [(layout.size, tail)]
+    if layout.segment_size is not None:
+        offset, width = layout.segment_size
+        writes.append((offset, _encode_size(layout.size + len(tail) - layout.segment_data, width)))
+    if layout.ours is not None:
+        writes.append((layout.ours.offset, _void(layout.ours.length)))
+    return writes
+
+
+def _mkv_read(handle: BinaryIO, layout: MkvLayout) -> bytes | None:
+    ours = layout.ours
+    if ours is None:
+        return None
+    pending = [(ours.offset, ours.end)]
+    while pending:
+        start, end = pending.pop()
+        for element, _offset, data, length, _width in _elements(handle, start, end):
+            if element in (EBML_TAGS, EBML_TAG, EBML_SIMPLE_TAG):
+                pending.append((data, data + length))
+            elif element == EBML_TAG_BINARY:
+                return _read_at(handle, data, length)
+    return None
+
+
+# ----------------------------------------------------------------------
+def _format(path: str) -> str:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in MP4_SUFFIXES:
+        return "mp4"
+    if suffix in MKV_SUFFIXES:
+        return "mkv"
+    raise ValueError(f"metadata tagging is not available for {os.path.basename(path)}")
+
+
+def read_container(handle: BinaryIO, kind: str) -> Mp4Layout | MkvLayout:
+    return read_mp4(handle) if kind == "mp4" else read_mkv(handle)
+
+
+def embed_container(
+    cover: str,
+    output: str,
+    payload: bytes,
+    method: str = "video_metadata",
+    *,
+    key: bytes | str | None = None,
+    tracker: RiskTracker | None = None,
+) -> int:
+    """Store ``payload`` in an MP4 ``free`` box or a Matroska Tags element.
+
+    Existing ``free``/``skip`` boxes (top level, ``moov`` or ``udta``) or
+    Void elements are reused in place, so chunk offsets (``stco``/``co64``)
+    and Cluster/Cue positions never change.  Without room the payload is
+    appended after the last box, or at the end of the Segment, with
+    :data:`~.tags.MIN_PADDING` or a payload's worth of free space reserved
+    for the next embed.  ``output`` is a kernel-side clone of ``cover``
+    unless they are the same file.  ``key`` and ``tracker`` are accepted for
+    a uniform engine signature.  Returns bytes written.
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"method {method!r} is not available for container tagging")
+    kind = _format(cover)
+    data = frame_payload(payload)
+    with open(cover, "rb") as handle, span(f"{kind}.parse"):
+        layout = read_container(handle, kind)
+        writes = _mp4_plan(layout, data) if kind == "mp4" else _mkv_plan(layout, data)
+
+    if not (os.path.exists(output) and os.path.samefile(cover, output)):
+        with span(f"{kind}.copy", os.path.getsize(cover)):
+            clone_file(cover, output)
+    try:
+        with span(f"{kind}.pwrite", sum(len(chunk) for _offset, chunk in writes)):
+            return apply_writes(output, writes)
+    except BaseException:
+        if not os.path.samefile(cover, output):
+            os.remove(output)
+        raise
+
+
+def extract_container(path: str, method: str = "video_metadata", **_options) -> bytes:
+    """Read a payload stored by :func:`embed_container`."""
+
+    if method not in METHODS:
+        raise ValueError(f"method {method!r} is not available for container tagging")
+    kind = _format(path)
+    with open(path, "rb") as handle, span(f"{kind}.parse"):
+        layout = read_container(handle, kind)
+        data = _mp4_read(handle, layout) if kind == "mp4" else _mkv_read(handle, layout)
+    if data is None:
+        raise PayloadError("no STEGOSIGHT metadata found")
+    _flags, length = parse_header(data)
+    payload = data[HEADER_SIZE : HEADER_SIZE + length]
+    if len(payload) != length:
+        raise PayloadError("metadata payload is truncated")
+    return payload
+
+
+def container_capacity(path: str) -> int:
+    """Largest payload one box or Tags element holds."""
+
+    _format(path)
+    return MAX_BOX - 64 - HEADER_SIZE
+
+
+__all__ = [
+    "MkvLayout",
+    "Mp4Layout",
+    "container_capacity",
+    "embed_container",
+    "extract_container",
+    "read_mkv",
+    "read_mp4",
+]
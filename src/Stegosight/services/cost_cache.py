@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable
+
+import numpy as np
+from appdirs import user_cache_dir
+
+APP_NAME = "Stegosight"
+DEFAULT_MAX_BYTES = 2 << 30
+HASH_CHUNK = 1 << 20
+# Temporary files this old belong to a put that was interrupted, not one in progress.
+STALE_TEMP_SECONDS = 24 * 3600
+
+
+def content_digest(path: str) -> str:
+    """BLAKE2b digest of a file's bytes, read in bounded chunks."""
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CostCache:
+    """Size-bounded on-disk LRU of cost maps stored as ``.npy`` files.
+
+    Entries are keyed by cover content, method and parameters, and are
+    loaded back as read-only memory maps so a hit costs no copy.  File
+    modification times double as the LRU clock: a hit touches the entry,
+    and inserts evict the stalest files until the cache fits ``max_bytes``.
+    """
+
+    def __init__(self, directory: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory or os.path.join(
+            user_cache_dir(APP_NAME, appauthor=False), "cost_maps"
+        )
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(digest: str, method: str, params: dict[str, Any] | None = None) -> str:
+        spec = json.dumps([digest, method, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key: str) -> np.ndarray | None:
+        path = self._path(key)
+        try:
+            costs = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        os.utime(path)
+        return costs
+
+    def put(self, key: str, costs: np.ndarray) -> np.ndarray:
+        """Store ``costs`` and return the cached memory-mapped copy."""
+
+        handle, temp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                np.save(stream, np.ascontiguousarray(costs))
+            os.replace(temp, self._path(key))
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        self.evict(keep=key)
+        return np.load(self._path(key), mmap_mode="r")
+
+    def get_or_compute(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        costs = self.get(key)
+        if costs is None:
+            costs = self.put(key, compute())
+        return costs
+
+    def get_or_fill(
+        self, key: str, shape: tuple[int, ...], fill: Callable[[np.ndarray], None]
+    ) -> np.ndarray:
+        """Like :meth:`get_or_compute`, but ``fill`` writes into an on-disk map.
+
+        The entry is created as a writable ``.npy`` memory map, so a cost
+        map larger than RAM never has to exist in memory.
+        """
+
+        costs = self.get(key)
+        if costs is not None:
+            return costs
+        handle, temp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        os.close(handle)
+        try:
+            target = np.lib.format.open_memmap(temp, mode="w+", dtype=np.float32, shape=shape)
+            fill(target)
+            target.flush()
+            del target
+            os.replace(temp, self._path(key))
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        self.evict(keep=key)
+        return np.load(self._path(key), mmap_mode="r")
+
+    def evict(self, keep: str | None = None) -> None:
+        """Drop least recently used entries until the cache fits ``max_bytes``.
+
+        Orphaned ``.tmp`` files of interrupted puts are removed on the way.
+        """
+
+        entries = []
+        stale = time.time() - STALE_TEMP_SECONDS
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".npy"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith(".tmp") and entry.stat().st_mtime < stale:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+        total = sum(size for _mtime, size, _path in entries)
+        kept = self._path(keep) if keep else None
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == kept:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".npy"):
+                    os.remove(entry.path)
+
+
+__all__ = ["CostCache", "content_digest"]
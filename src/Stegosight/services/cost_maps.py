@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import numpy as np
+
+# Ker-Böhme high-pass kernel used by HILL.
+_KB = np.array([[-1, 2, -1], [2, -4, 2], [-1, 2, -1]], dtype=np.float32) / 4.0
+# Rows of context a HILL tile needs: 3x3 residual, 3x3 and 15x15 averages.
+HILL_HALO = 1 + 1 + 7
+
+
+def _pad(image: np.ndarray, radius: int) -> np.ndarray:
+    spec = ((radius, radius), (radius, radius)) + ((0, 0),) * (image.ndim - 2)
+    mode = "reflect" if min(image.shape[:2]) > radius else "edge"
+    return np.pad(image, spec, mode=mode)
+
+
+def _filter3(image: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    padded = _pad(image, 1)
+    rows, cols = image.shape[:2]
+    out = np.zeros(image.shape, dtype=np.float32)
+    for dy in range(3):
+        for dx in range(3):
+            weight = kernel[dy, dx]
+            if weight:
+                out += weight * padded[dy : dy + rows, dx : dx + cols]
+    return out
+
+
+def box_filter(image: np.ndarray, size: int) -> np.ndarray:
+    """Mean over a ``size x size`` window using a summed-area table."""
+
+    radius = size // 2
+    padded = _pad(image.astype(np.float64), radius)
+    table = np.zeros(
+        (padded.shape[0] + 1, padded.shape[1] + 1) + padded.shape[2:], dtype=np.float64
+    )
+    np.cumsum(np.cumsum(padded, axis=0), axis=1, out=table[1:, 1:])
+    rows, cols = image.shape[:2]
+    total = (
+        table[size : size + rows, size : size + cols]
+        - table[:rows, size : size + cols]
+        - table[size : size + rows, :cols]
+        + table[:rows, :cols]
+    )
+    return (total / (size * size)).astype(np.float32)
+
+
+def hill_costs(pixels: np.ndarray) -> np.ndarray:
+    """HILL distortion costs for a ``(rows, width[, channels])`` image.
+
+    Low costs land in noisy, textured regions where ±1 changes are hard to
+    model; smooth areas get high costs.  Channels are treated independently.
+    """
+
+    image = np.asarray(pixels, dtype=np.float32)
+    residual = np.abs(_filter3(image, _KB))
+    local = box_filter(residual, 3)
+    cost = 1.0 / (local + 1e-10)
+    return box_filter(cost, 15)
+
+
+def hill_costs_tiled(pixels: np.ndarray, out: np.ndarray, tile_rows: int) -> np.ndarray:
+    """:func:`hill_costs` written into ``out`` ``tile_rows`` rows at a time.
+
+    Each tile is filtered with :data:`HILL_HALO` extra rows on both sides,
+    which covers the combined reach of the three filters, so interior rows
+    match the whole-image result and only one tile's temporaries are live.
+    ``out`` is typically a memory map.
+    """
+
+    rows = pixels.shape[0]
+    tile_rows = max(int(tile_rows), 1)
+    for start in range(0, rows, tile_rows):
+        stop = min(start + tile_rows, rows)
+        low = max(start - HILL_HALO, 0)
+        high = min(stop + HILL_HALO, rows)
+        costs = hill_costs(pixels[low:high])
+        out[start:stop] = costs[start - low : stop - low]
+    return out
+
+
+__all__ = ["HILL_HALO", "box_filter", "hill_costs", "hill_costs_tiled"]
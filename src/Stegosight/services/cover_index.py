@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import functools
+import itertools
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+from appdirs import user_data_dir
+from PIL import Image
+
+HASH_BITS = 64
+DCT_SIZE = 32  # pHash: low 8×8 frequencies of a 32×32 DCT
+DHASH_SIZE = (9, 8)  # dHash: sign of 8 horizontal gradients on 8 rows
+IMAGE_SUFFIXES = frozenset({".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"})
+# Multi-index hashing: four 16-bit substrings, each with a sorted lookup table.
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+# Entries added (or changed) since the tables were built are scanned linearly
+# until there are this many, then the tables are rebuilt.
+REBUILD_AFTER = 4096
+# Re-encoded or embedded copies of a cover stay within a few bits of it.  Up
+# to 7 bits, one substring must match within a single bit (17 probes each).
+DEFAULT_RADIUS = 7
+HASH_BATCH = 256
+INDEX_VERSION = 1
+APP_NAME = "Stegosight"
+
+
+def default_index_path() -> str:
+    """Where the reference corpus index is kept unless a path is given."""
+
+    return os.path.join(user_data_dir(APP_NAME, appauthor=False), "covers.npz")
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so ``D @ X @ D.T`` transforms a block."""
+
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    basis = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+_DCT = _dct_matrix(DCT_SIZE)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits per ``uint64``."""
+
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+        return np.bitwise_count(values)
+    return _POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """``(images, 64)`` booleans to one ``uint64`` per image, first bit most significant."""
+
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def _thumbnails(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Greyscale 32×32 and 9×8 thumbnails; JPEGs are decoded at reduced scale."""
+
+    with Image.open(path) as image:
+        image.draft("L", (DCT_SIZE * 2, DCT_SIZE * 2))
+        grey = image.convert("L")
+        small = np.asarray(grey.resize((DCT_SIZE, DCT_SIZE), Image.BOX), dtype=np.float32)
+        tiny = np.asarray(grey.resize(DHASH_SIZE, Image.BOX), dtype=np.float32)
+    return small, tiny
+
+
+def phash_batch(thumbnails: np.ndarray) -> np.ndarray:
+    """pHash of ``(images, 32, 32)`` greyscale thumbnails, transformed as one stack."""
+
+    low = (_DCT @ thumbnails @ _DCT.T)[:, :8, :8].reshape(len(thumbnails), HASH_BITS)
+    # The DC term only tracks brightness, so it is left out of the median.
+    return _pack(low > np.median(low[:, 1:], axis=1, keepdims=True))
+
+
+def dhash_batch(thumbnails: np.ndarray) -> np.ndarray:
+    """dHash of ``(images, 8, 9)`` greyscale thumbnails."""
+
+    return _pack((thumbnails[:, :, 1:] > thumbnails[:, :, :-1]).reshape(len(thumbnails), HASH_BITS))
+
+
+def image_hashes(path: str) -> tuple[int, int]:
+    """``(phash, dhash)`` of one image."""
+
+    small, tiny = _thumbnails(path)
+    return int(phash_batch(small[None])[0]), int(dhash_batch(tiny[None])[0])
+
+
+def _hash_files(paths: list[str]) -> list[tuple[str, int, int, int, int]]:
+    """``(path, size, mtime_ns, phash, dhash)`` for the readable images in ``paths``."""
+
+    kept: list[tuple[str, int, int]] = []
+    small: list[np.ndarray] = []
+    tiny: list[np.ndarray] = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            thumbnails = _thumbnails(path)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            continue  # unreadable or not an image: not indexed
+        kept.append((path, info.st_size, info.st_mtime_ns))
+        small.append(thumbnails[0])
+        tiny.append(thumbnails[1])
+    if not kept:
+        return []
+    phashes = phash_batch(np.stack(small))
+    dhashes = dhash_batch(np.stack(tiny))
+    return [(*entry, int(phash), int(dhash)) for entry, phash, dhash in zip(kept, phashes, dhashes)]
+
+
+def iter_images(folder: str) -> Iterator[str]:
+    """Image files under ``folder``, recursively; hidden files and folders are skipped."""
+
+    for root, folders, files in os.walk(folder):
+        folders[:] = sorted(name for name in folders if not name.startswith("."))
+        for name in sorted(files):
+            if not name.startswith(".") and os.path.splitext(name)[1].lower() in IMAGE_SUFFIXES:
+                yield os.path.join(root, name)
+
+
+@functools.lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> np.ndarray:
+    """Every ``CHUNK_BITS``-bit mask with at most ``radius`` bits set."""
+
+    masks = [0]
+    for count in range(1, radius + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), count):
+            masks.append(sum(1 << bit for bit in bits))
+    return np.array(masks, dtype=np.uint16)
+
+
+@dataclass(frozen=True)
+class CoverMatch:
+    """A reference image close to the suspect, nearest first."""
+
+    path: str
+    distance: int  # pHash bits that differ
+    dhash_distance: int
+
+
+class CoverIndex:
+    """Perceptual-hash index of a reference corpus, for finding a suspect's original cover.
+
+    Every image is keyed by its 64-bit pHash (with its dHash as a tie
+    breaker).  Lookups use multi-index hashing: the hash is split into
+    four 16-bit substrings with one bucketed table each, and any hash within
+    ``radius`` bits of the query matches at least one substring within
+    ``radius // 4`` bits, so only those few table ranges are probed.
+    Images added since the tables were built are compared linearly until
+    :data:`REBUILD_AFTER` accumulate.  :meth:`update` skips files whose
+    size and modification time are unchanged, so re-indexing a growing
+    corpus only hashes new files.
+    """
+
+    def __init__(self) -> None:
+        self._paths: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._phash = np.zeros(0, dtype=np.uint64)
+        self._dhash = np.zeros(0, dtype=np.uint64)
+        self._size = np.zeros(0, dtype=np.int64)
+        self._mtime = np.zeros(0, dtype=np.int64)
+        self._tables: list[tuple[np.ndarray, np.ndarray]] = []  # (bucket bounds, entries by substring)
+        self._indexed = 0  # entries covered by the tables
+        self._stale: set[int] = set()  # covered entries whose hash has changed since
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __contains__(self, path: str) -> bool:
+        return os.path.abspath(path) in self._positions
+
+    # -- building ---------------------------------------------------------
+    def _grow(self, needed: int) -> None:
+        capacity = self._phash.size
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        for name in ("_phash", "_dhash", "_size", "_mtime"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[: len(self._paths)] = array[: len(self._paths)]
+            setattr(self, name, grown)
+
+    def add(self, path: str, size: int, mtime_ns: int, phash: int, dhash: int) -> None:
+        """Add or replace one image's entry."""
+
+        self._put(path, size, mtime_ns, phash, dhash)
+        if len(self._paths) - self._indexed + len(self._stale) > REBUILD_AFTER:
+            self.rebuild()
+
+    def _put(self, path: str, size: int, mtime_ns: int, phash: int, dhash: int) -> None:
+        path = os.path.abspath(path)
+        position = self._positions.get(path)
+        if position is None:
+            position = len(self._paths)
+            self._grow(position + 1)
+            self._paths.append(path)
+            self._positions[path] = position
+        elif position < self._indexed:
+            self._stale.add(position)
+        self._phash[position] = phash
+        self._dhash[position] = dhash
+        self._size[position] = size
+        self._mtime[position] = mtime_ns
+
+    def needs_hashing(self, path: str) -> bool:
+        """Whether ``path`` is new or has changed since it was indexed."""
+
+        position = self._positions.get(os.path.abspath(path))
+        if position is None:
+            return True
+        try:
+            info = os.stat(path)
+        except OSError:
+            return False
+        return (info.st_size, info.st_mtime_ns) != (self._size[position], self._mtime[position])
+
+    def update(
+        self,
+        paths: Iterable[str],
+        *,
+        max_workers: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> int:
+        """Hash new or changed images among ``paths``; returns how many were (re)indexed.
+
+        ``progress(done, total)`` is called after each batch of
+        :data:`HASH_BATCH` files.
+        """
+
+        from .batch import run_parallel
+
+        pending = [os.path.abspath(path) for path in paths if self.needs_hashing(path)]
+        batches = [(pending[start : start + HASH_BATCH],) for start in range(0, len(pending), HASH_BATCH)]
+        done = added = 0
+        for entries in run_parallel(_hash_files, batches, max_workers):
+            for entry in entries:
+                self._put(*entry)
+            added += len(entries)
+            done += HASH_BATCH
+            if progress is not None:
+                progress(min(done, len(pending)), len(pending))
+        if added:
+            self.rebuild()  # once, rather than every REBUILD_AFTER files
+        return added
+
+    def update_folder(self, folder: str, **options) -> int:
+        return self.update(iter_images(folder), **options)
+
+    def prune(self) -> int:
+        """Drop entries whose files no longer exist; returns how many were dropped."""
+
+        keep = [position for position, path in enumerate(self._paths) if os.path.exists(path)]
+        dropped = len(self._paths) - len(keep)
+        if dropped:
+            self._restore(
+                [self._paths[position] for position in keep],
+                self._phash[keep],
+                self._dhash[keep],
+                self._size[keep],
+                self._mtime[keep],
+            )
+        return dropped
+
+    def rebuild(self) -> None:
+        """Sort one lookup table per 16-bit substring over every entry."""
+
+        count = len(self._paths)
+        hashes = self._phash[:count]
+        self._tables = []
+        for chunk in range(CHUNKS):
+            values = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.uint16)
+            order = np.argsort(values, kind="stable")
+            bounds = np.searchsorted(values[order], np.arange((1 << CHUNK_BITS) + 1), side="left")
+            self._tables.append((bounds, order))
+        self._indexed = count
+        self._stale.clear()
+
+    # -- searching --------------------------------------------------------
+    def _candidates(self, phash: int, radius: int) -> np.ndarray:
+        query = np.uint64(phash)
+        masks = _flip_masks(radius // CHUNKS)
+        found = [np.arange(self._indexed, len(self._paths)), np.fromiter(self._stale, dtype=np.int64)]
+        for chunk, (bounds, order) in enumerate(self._tables):
+            probes = (np.uint16((query >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(0xFFFF)) ^ masks).astype(np.intp)
+            starts = bounds[probes]
+            lengths = bounds[probes + 1] - starts
+            # Every table position in the probed buckets, without a Python loop per bucket.
+            firsts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            found.append(order[firsts + np.arange(firsts.size)])
+        return np.concatenate(found)  # may repeat entries; search() removes them
+
+    def search(self, phash: int, dhash: int = 0, *, k: int = 5, radius: int = DEFAULT_RADIUS) -> list[CoverMatch]:
+        """The ``k`` entries nearest to ``phash`` within ``radius`` bits.
+
+        Radii of 16 and above would probe every bucket, so every hash is
+        compared instead.
+        """
+
+        if not self._paths:
+            return []
+        if radius >= CHUNK_BITS or not self._tables:
+            candidates = np.arange(len(self._paths))
+        else:
+            candidates = self._candidates(phash, radius)
+        if candidates.size == 0:
+            return []
+        distance = popcount(self._phash[candidates] ^ np.uint64(phash)).astype(np.int64)
+        candidates, first = np.unique(candidates[distance <= radius], return_index=True)
+        distance = distance[distance <= radius][first]
+        if candidates.size == 0:
+            return []
+        secondary = popcount(self._dhash[candidates] ^ np.uint64(dhash)).astype(np.int64)
+        ranked = np.lexsort((secondary, distance))[:k]
+        return [
+            CoverMatch(self._paths[candidates[index]], int(distance[index]), int(secondary[index]))
+            for index in ranked
+        ]
+
+    def nearest(self, path: str, *, k: int = 5, radius: int = DEFAULT_RADIUS) -> list[CoverMatch]:
+        """Candidate originals for the image at ``path``, excluding ``path`` itself."""
+
+        phash, dhash = image_hashes(path)
+        own = os.path.abspath(path)
+        matches = self.search(phash, dhash, k=k + 1, radius=radius)
+        return [match for match in matches if match.path != own][:k]
+
+    # -- persistence ------------------------------------------------------
+    def _restore(self, paths: list[str], phash, dhash, size, mtime) -> None:
+        self._paths = list(paths)
+        self._positions = {path: position for position, path in enumerate(self._paths)}
+        self._phash = np.asarray(phash, dtype=np.uint64).copy()
+        self._dhash = np.asarray(dhash, dtype=np.uint64).copy()
+        self._size = np.asarray(size, dtype=np.int64).copy()
+        self._mtime = np.asarray(mtime, dtype=np.int64).copy()
+        self.rebuild()
+
+    def save(self, path: str) -> None:
+        """Write the index to ``path`` (``.npz``), replacing it atomically."""
+
+        count = len(self._paths)
+        names = "\0".join(self._paths).encode("utf-8", "surrogateescape")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        handle, temp = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                np.savez(
+                    stream,
+                    version=np.array(INDEX_VERSION),
+                    paths=np.frombuffer(names, dtype=np.uint8),
+                    phash=self._phash[:count],
+                    dhash=self._dhash[:count],
+                    size=self._size[:count],
+                    mtime=self._mtime[:count],
+                )
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> CoverIndex:
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"unsupported cover index version {int(data['version'])}")
+            names = data["paths"].tobytes().decode("utf-8", "surrogateescape")
+            index = cls()
+            index._restore(
+                names.split("\0") if names else [], data["phash"], data["dhash"], data["size"], data["mtime"]
+            )
+        return index
+
+    @classmethod
+    def open(cls, path: str) -> CoverIndex:
+        """The index saved at ``path``, or an empty one if there is none yet."""
+
+        return cls.load(path) if os.path.exists(path) else cls()
+
+
+__all__ = [
+    "CoverIndex",
+    "CoverMatch",
+    "default_index_path",
+    "dhash_batch",
+    "image_hashes",
+    "iter_images",
+    "phash_batch",
+    "popcount",
+]
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import TYPE_CHECKING
+
+from .profiling import span
+from .registry import AUTO, COST_CACHE, format_engine, get_method, methods
+
+if TYPE_CHECKING:
+    from .cost_cache import CostCache
+    from .keys import KeyCache
+    from .memory_plan import MemoryPlan
+
+# Engine, planner and payload modules are imported inside the functions that
+# need them, so importing this module (and listing methods) stays cheap.
+
+logger = logging.getLogger(__name__)
+
+
+def _suffix(path: str) -> str:
+    return os.path.splitext(path)[1].lower()
+
+
+def default_output_path(cover: str) -> str:
+    """``<name>_stego<ext>`` next to ``cover``."""
+
+    stem, ext = os.path.splitext(cover)
+    return f"{stem}_stego{ext}"
+
+
+def supported_methods(path: str) -> tuple[str, ...]:
+    """Embedding methods available for the format of ``path``."""
+
+    engine = format_engine(_suffix(path))
+    return engine.methods if engine is not None else ()
+
+
+def probe_shape(path: str) -> tuple[int, int, int]:
+    """``(rows, width, channels)`` of the embeddable samples, from headers only."""
+
+    suffix = _suffix(path)
+    if suffix == ".bmp":
+        from .bmp import read_bmp_layout
+
+        layout = read_bmp_layout(path)
+        return layout.height, layout.width, layout.channels
+    if suffix == ".png":
+        from .png_stream import read_png_info
+
+        info = read_png_info(path)
+        return info.height, info.width, info.colour_channels
+    if suffix == ".avi":
+        # All frames stacked, as the risk tracker sees the selected ones.
+        from .avi import read_avi_layout
+
+        layout = read_avi_layout(path)
+        return layout.frames * layout.height, layout.width, layout.channels
+    raise ValueError(f"no embedding engine for {os.path.basename(path)}")
+
+
+def probe_capacity(path: str, method: str) -> int:
+    """Payload bytes ``method`` can always fit into ``path`` (header probe only)."""
+
+    spec = get_method(method)
+    if spec.capacity is not None:
+        return spec.capacity(path)
+    from .header import HEADER_BITS, HEADER_SIZE
+    from .pvd import RANGE_BITS
+
+    rows, width, channels = probe_shape(path)
+    if method == "pvd":
+        # Every pair carries at least the bits of the smallest range.
+        bits = rows * (width // 2) * channels * int(RANGE_BITS[0])
+        return max(bits // 8 - HEADER_SIZE, 0)
+    if method == "content_adaptive":
+        return max((rows * width * channels - HEADER_BITS) // 8, 0)
+    return max(rows * width * channels // 8 - HEADER_SIZE, 0)
+
+
+def _apply_plan(plan: MemoryPlan, options: dict) -> dict:
+    """Engine options from ``plan`` underneath the caller's explicit ones."""
+
+    if plan.degraded:
+        logger.info("memory plan %s", plan.summary())
+    if not plan.fits:
+        logger.warning("job may exceed the memory budget: %s", plan.summary())
+    return {**plan.options, **options}
+
+
+def embed_file(
+    cover: str,
+    output: str,
+    payload: bytes,
+    method: str,
+    *,
+    cost_cache: CostCache | None = None,
+    memory_budget: int | None = None,
+    password: str | None = None,
+    salt: bytes | None = None,
+    **options,
+) -> int:
+    """Embed ``payload`` with the engine matching the cover's format.
+
+    Cost-based methods look their cost map up in ``cost_cache`` by the
+    cover's content digest, so retries on the same cover skip the analysis.
+    A header-only :func:`plan_embed` against ``memory_budget`` (default:
+    :func:`~.memory_plan.default_budget`) switches the engine to its tiled,
+    streaming or memory-mapped variant when the in-memory path would not fit.
+    A ``password`` seals the payload (:func:`~.keys.seal`, optionally with a
+    shared ``salt``) and keys the engine unless ``key`` is given as well.
+    """
+
+    engine = format_engine(_suffix(cover))
+    if engine is None:
+        raise ValueError(f"no embedding engine for {os.path.basename(cover)}")
+    from .memory_plan import plan_embed
+
+    if password:
+        from .keys import seal
+
+        payload = seal(payload, password, salt=salt)
+        options.setdefault("key", password)
+
+    with span("plan") as record:
+        plan = plan_embed(
+            cover,
+            method,
+            len(payload),
+            memory_budget,
+            workers=options.get("workers"),
+            keyed=bool(options.get("key")),
+        )
+        record.args.update(mode=plan.mode, estimate=plan.estimate, budget=plan.budget)
+    options = _apply_plan(plan, options)
+    if cost_cache is not None and COST_CACHE in get_method(method).capabilities:
+        from .cost_cache import content_digest
+
+        with span("digest", os.path.getsize(cover)):
+            options.update(cost_cache=cost_cache, cover_digest=content_digest(cover))
+    return engine.embed(cover, output, payload, method, **options)
+
+
+def extract_file(
+    path: str,
+    method: str,
+    *,
+    memory_budget: int | None = None,
+    password: str | None = None,
+    key_cache: KeyCache | None = None,
+    keep_sealed: bool = False,
+    **options,
+) -> bytes:
+    """Extract a payload with the engine matching the file's format.
+
+    ``method="auto"`` (or a card registered with the ``auto`` capability)
+    tries every method the format's engine implements and returns the first
+    payload whose header validates.  Each attempt is planned against
+    ``memory_budget``.  Sealed payloads are opened with ``password``; a
+    wrong password counts as a failed attempt, and with a password a sealed
+    payload wins over an unsealed one found earlier.  Pass one ``key_cache`` for
+    a whole job so the KDF runs once per salt rather than once per attempt.
+    ``keep_sealed`` returns sealed payloads untouched for the caller to open.
+    """
+
+    engine = format_engine(_suffix(path))
+    if engine is None:
+        raise ValueError(f"no extraction engine for {os.path.basename(path)}")
+    if method in {spec.key for spec in methods(capability=AUTO)}:
+        method = "auto"
+    from .keys import is_sealed, unseal
+    from .memory_plan import plan_extract
+
+    if password:
+        options.setdefault("key", password)
+
+    def run(candidate: str) -> tuple[bytes, bool]:
+        plan = plan_extract(path, candidate, memory_budget, keyed=bool(options.get("key")))
+        data = engine.extract(path, candidate, **_apply_plan(plan, options))
+        if is_sealed(data) and not keep_sealed:
+            return unseal(data, password, cache=key_cache), True
+        return data, False
+
+    if method != "auto":
+        return run(method)[0]
+
+    # With a password, only an authenticated payload ends the search early:
+    # methods sharing a key can validate each other's headers.
+    error: ValueError | None = None
+    fallback: bytes | None = None
+    for candidate in engine.methods:
+        try:
+            data, sealed = run(candidate)
+        except ValueError as exc:
+            error = exc
+            continue
+        if sealed or not password:
+            return data
+        if fallback is None:
+            fallback = data
+    if fallback is not None:
+        return fallback
+    from .header import PayloadError
+
+    raise PayloadError(f"no STEGOSIGHT payload found in {os.path.basename(path)}") from error
+
+
+__all__ = [
+    "default_output_path",
+    "embed_file",
+    "extract_file",
+    "probe_capacity",
+    "probe_shape",
+    "supported_methods",
+]
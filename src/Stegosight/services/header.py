@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import struct
+
+MAGIC = b"STGS"
+VERSION = 1
+HEADER = struct.Struct(">4sBBQ")
+HEADER_SIZE = HEADER.size
+HEADER_BITS = HEADER_SIZE * 8
+
+
+class PayloadError(ValueError):
+    """Raised when a recovered bitstream does not carry a valid payload."""
+
+
+def pack_header(length: int, flags: int = 0) -> bytes:
+    """Build the STEGOSIGHT header (magic, version, flags, length)."""
+
+    return HEADER.pack(MAGIC, VERSION, flags, length)
+
+
+def frame_payload(data: bytes, flags: int = 0) -> bytes:
+    """Prefix ``data`` with the STEGOSIGHT header."""
+
+    return pack_header(len(data), flags) + bytes(data)
+
+
+class FramedPayload:
+    """Header plus ``data`` as one byte sequence, without copying ``data``.
+
+    Slicing returns bytes for just the requested range, so a payload that is
+    memory-mapped from a spool file is only read window by window.
+    """
+
+    def __init__(self, data: bytes, flags: int = 0) -> None:
+        self.header = pack_header(len(data), flags)
+        self.body = data
+
+    def __len__(self) -> int:
+        return HEADER_SIZE + len(self.body)
+
+    def __getitem__(self, index: slice) -> bytes:
+        start, stop, _ = index.indices(len(self))
+        if stop <= start:
+            return b""
+        if stop <= HEADER_SIZE:
+            return self.header[start:stop]
+        if start >= HEADER_SIZE:
+            return bytes(self.body[start - HEADER_SIZE : stop - HEADER_SIZE])
+        return self.header[start:] + bytes(self.body[: stop - HEADER_SIZE])
+
+
+def parse_header(raw: bytes) -> tuple[int, int]:
+    """Return ``(flags, length)`` from the first :data:`HEADER_SIZE` bytes."""
+
+    if len(raw) < HEADER_SIZE:
+        raise PayloadError("bitstream is shorter than the payload header")
+    magic, version, flags, length = HEADER.unpack(bytes(raw[:HEADER_SIZE]))
+    if magic != MAGIC:
+        raise PayloadError("no STEGOSIGHT payload found")
+    if version != VERSION:
+        raise PayloadError(f"unsupported payload version {version}")
+    return flags, length
+
+
+__all__ = [
+    "FramedPayload",
+    "HEADER",
+    "HEADER_BITS",
+    "HEADER_SIZE",
+    "MAGIC",
+    "PayloadError",
+    "VERSION",
+    "frame_payload",
+    "pack_header",
+    "parse_header",
+]
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import hashlib
+import io
+import itertools
+import mmap
+import queue
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, TypeVar
+
+from .header import PayloadError
+from .profiling import profile_iter, span
+from .sink import ResultSink
+
+if TYPE_CHECKING:
+    from .keys import KeyCache
+
+T = TypeVar("T")
+
+CHUNK_SIZE = 1 << 20
+QUEUE_DEPTH = 4
+DEFLATE_LEVEL = 6
+# Deflate is skipped when a fast pass over the first chunk saves less than this.
+INCOMPRESSIBLE = 0.95
+# Packed secrets: magic and flags, the (possibly deflated) body, then the
+# original length and its BLAKE2b-128 digest.
+PACK_MAGIC = b"STGZ"
+PACK_HEAD = struct.Struct(">4sB")
+PACK_TRAILER = struct.Struct(">Q16s")
+FLAG_DEFLATE = 0x01
+
+
+def _digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def read_chunks(source: str | BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a path or binary file ``chunk_size`` bytes at a time."""
+
+    with contextlib.ExitStack() as stack:
+        handle = stack.enter_context(open(source, "rb")) if isinstance(source, str) else source
+        yield from profile_iter("ingest.read", iter(functools.partial(handle.read, chunk_size), b""), len)
+
+
+_DONE = object()
+
+
+def pipelined(items: Iterable[T], name: str, depth: int = QUEUE_DEPTH) -> Iterator[T]:
+    """Produce ``items`` on a background thread, handed over through a bounded queue.
+
+    Chaining stages this way overlaps them while at most ``depth`` items
+    wait between any two.  Producer exceptions are re-raised in the
+    consumer; closing the consumer stops the producer.
+    """
+
+    stop = threading.Event()
+    handoff: queue.Queue = queue.Queue(maxsize=depth)
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as exc:  # handed to the consumer
+            put(exc)
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        put(_DONE)
+
+    # Run in a copy of the caller's context so stage spans reach its profiler.
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(run,), name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = handoff.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class Packer:
+    """Wraps a stream of secret chunks in the packed format, deflating on the way.
+
+    The original bytes are hashed as they pass, and the length and digest
+    are appended as a trailer so extraction can verify what it restores.
+    ``compress=None`` decides from the first chunk whether deflate pays.
+    """
+
+    def __init__(self, compress: bool | None = None, level: int = DEFLATE_LEVEL) -> None:
+        self.compress = compress
+        self.level = level
+        self.source_bytes = 0
+        self.digest = b""
+
+    def _worth_deflating(self, sample: bytes) -> bool:
+        return bool(sample) and len(zlib.compress(sample, 1)) < INCOMPRESSIBLE * len(sample)
+
+    def stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        iterator = iter(chunks)
+        first = next(iterator, b"")
+        if self.compress is None:
+            self.compress = self._worth_deflating(first)
+        deflate = zlib.compressobj(self.level) if self.compress else None
+        hasher = _digest()
+        yield PACK_HEAD.pack(PACK_MAGIC, FLAG_DEFLATE if deflate else 0)
+
+        def body(chunk: bytes) -> bytes:
+            hasher.update(chunk)
+            self.source_bytes += len(chunk)
+            if deflate is None:
+                return chunk
+            with span("ingest.deflate", len(chunk)):
+                return deflate.compress(chunk)
+
+        for chunk in itertools.chain([first], iterator):
+            out = body(chunk)
+            if out:
+                yield out
+        if deflate is not None:
+            yield deflate.flush()
+        self.digest = hasher.digest()
+        yield PACK_TRAILER.pack(self.source_bytes, self.digest)
+
+
+def is_packed(data: bytes) -> bool:
+    return len(data) >= PACK_HEAD.size + PACK_TRAILER.size and data[:4] == PACK_MAGIC
+
+
+class UnpackWriter:
+    """File-like adapter that restores packed data on its way into ``sink``.
+
+    Data that does not start with the packed magic is passed through
+    unchanged.  :meth:`close` checks the trailer and raises
+    :class:`~.payload.PayloadError` on a length or digest mismatch; it does
+    not close ``sink``.
+    """
+
+    def __init__(self, sink: BinaryIO) -> None:
+        self._sink = sink
+        self._head = b""
+        self._packed: bool | None = None
+        self._tail = b""
+        self._inflate = None
+        self._hasher = _digest()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        if self._packed is None:
+            self._head += bytes(data)
+            if len(self._head) < PACK_HEAD.size and PACK_MAGIC.startswith(self._head[:4]):
+                return len(data)
+            self._packed = self._head.startswith(PACK_MAGIC)
+            data, self._head = self._head, b""
+            if self._packed:
+                _magic, flags = PACK_HEAD.unpack_from(data)
+                self._inflate = zlib.decompressobj() if flags & FLAG_DEFLATE else None
+                data = data[PACK_HEAD.size :]
+        if not self._packed:
+            self._emit(data)
+            return len(data)
+        # The trailer is only known to be the trailer once the data ends.
+        buffered = self._tail + bytes(data)
+        cut = max(len(buffered) - PACK_TRAILER.size, 0)
+        self._tail = buffered[cut:]
+        self._restore(buffered[:cut])
+        return len(data)
+
+    def _restore(self, data: bytes) -> None:
+        if self._inflate is not None and data:
+            with span("ingest.inflate", len(data)):
+                data = self._inflate.decompress(data)
+        self._hasher.update(data)
+        self._emit(data)
+
+    def _emit(self, data: bytes) -> None:
+        if data:
+            self._sink.write(data)
+            self.size += len(data)
+
+    def close(self) -> None:
+        if self._packed is None:
+            # Too short to be packed: pass it through as it is.
+            self._packed = False
+            self._emit(self._head)
+            return
+        if not self._packed:
+            return
+        if len(self._tail) < PACK_TRAILER.size:
+            raise PayloadError("packed payload is truncated")
+        if self._inflate is not None:
+            rest = self._inflate.flush()
+            self._hasher.update(rest)
+            self._emit(rest)
+            if not self._inflate.eof:
+                raise PayloadError("packed payload is truncated")
+        length, digest = PACK_TRAILER.unpack(self._tail)
+        if length != self.size or digest != self._hasher.digest():
+            raise PayloadError("restored payload failed its integrity check")
+
+
+def unpack(data: bytes) -> bytes:
+    """In-memory :class:`UnpackWriter`: the original bytes of a packed payload."""
+
+    restored = io.BytesIO()
+    writer = UnpackWriter(restored)
+    writer.write(data)
+    writer.close()
+    return restored.getvalue()
+
+
+@dataclass(frozen=True)
+class IngestedSecret:
+    """A secret spooled to disk, ready to embed."""
+
+    path: str
+    size: int
+    source_bytes: int
+    digest: str
+    compressed: bool
+    sealed: bool
+
+    @contextlib.contextmanager
+    def mapped(self) -> Iterator[mmap.mmap]:
+        """The spooled payload as a read-only memory map.
+
+        Engines slice it window by window, so the payload is paged in from
+        disk as it is embedded rather than held in memory.
+        """
+
+        with open(self.path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+
+def ingest_secret(
+    source: str | BinaryIO,
+    directory: str | None = None,
+    *,
+    password: str | None = None,
+    salt: bytes | None = None,
+    compress: bool | None = None,
+    level: int = DEFLATE_LEVEL,
+    key_cache: KeyCache | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> IngestedSecret:
+    """Stream ``source`` through read → deflate → encrypt into a spool file.
+
+    Each stage runs on its own thread with a bounded queue in between, so
+    reading, compressing, encrypting and writing overlap while only a few
+    chunks are in flight.  With a ``password`` the packed stream is sealed
+    with :func:`~.keys.seal_stream`; pass ``key=password`` rather than
+    ``password`` to :func:`~.embedding.embed_file` so it is not sealed twice.
+    The spool is written to ``directory`` (or the system temp directory)
+    and is the caller's to remove.
+    """
+
+    packer = Packer(compress, level)
+    chunks = pipelined(read_chunks(source, chunk_size), "ingest-read")
+    chunks = pipelined(packer.stream(chunks), "ingest-pack")
+    if password:
+        from .keys import seal_stream
+
+        chunks = pipelined(seal_stream(chunks, password, salt=salt, cache=key_cache), "ingest-seal")
+    with ResultSink(directory, prefix=".stegosight-secret-") as sink:
+        with span("ingest.spool"):
+            for chunk in chunks:
+                sink.write(chunk)
+    return IngestedSecret(
+        sink.path,
+        sink.size,
+        packer.source_bytes,
+        packer.digest.hex(),
+        bool(packer.compress),
+        bool(password),
+    )
+
+
+__all__ = [
+    "IngestedSecret",
+    "Packer",
+    "UnpackWriter",
+    "ingest_secret",
+    "is_packed",
+    "pipelined",
+    "read_chunks",
+    "unpack",
+]
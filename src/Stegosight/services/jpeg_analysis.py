@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .jpeg import JpegCoefficients, read_coefficients
+from .profiling import span
+from .risk import RISK_LEVELS, pov_pvalue
+
+HISTOGRAM_RANGE = 8
+PROFILE_STEPS = 20
+# Low-frequency modes whose |coefficient| histograms feed the F5 estimate.
+F5_MODES = (1, 8, 9)  # (0,1), (1,0), (1,1) in natural order
+CALIBRATION_SHIFT = 4
+# Cropping and requantising alone leave clean images this much blockier.
+BLOCKINESS_SLACK = 0.1
+MIN_BLOCKS = 4
+# Pixels whose coefficients are Huffman-decoded for analysis, from the top
+# of the image, where sequential embedders (JSteg) start writing.
+ANALYSIS_PIXELS = 2_000_000
+
+# Orthonormal 8-point DCT-II; JPEG's FDCT is ``D @ block @ D.T``.
+_U = np.arange(8)[:, None]
+_X = np.arange(8)[None, :]
+DCT = (np.where(_U == 0, np.sqrt(0.125), 0.5) * np.cos((2 * _X + 1) * _U * np.pi / 16)).astype(np.float32)
+
+
+@dataclass(frozen=True)
+class JpegAnalysis:
+    """DCT-domain detector outputs for one JPEG."""
+
+    blocks: int
+    histogram: np.ndarray  # luma AC counts for -HISTOGRAM_RANGE..HISTOGRAM_RANGE
+    chi_square_p: float  # pair-of-values test on the first prefix (JSteg/OutGuess)
+    chi_square_profile: np.ndarray  # p over growing prefixes of the coefficient stream
+    f5_beta: float  # estimated share of non-zero AC coefficients changed by F5
+    blockiness: float
+    calibrated_blockiness: float
+    score: int
+    level: str
+
+    @property
+    def embedded_share(self) -> float:
+        """Share of the coefficient stream over which pairs look equalised."""
+
+        return float((self.chi_square_profile > 0.5).mean()) if self.chi_square_profile.size else 0.0
+
+    @property
+    def blockiness_excess(self) -> float:
+        if self.calibrated_blockiness <= 0:
+            return 0.0
+        return self.blockiness / self.calibrated_blockiness - 1.0
+
+    def summary(self) -> str:
+        return (
+            f"Risk Score: {self.score} ({self.level}) · "
+            f"Chi-Square p={self.chi_square_p:.2f} · "
+            f"F5 β≈{self.f5_beta:.3f} · "
+            f"Blockiness {self.blockiness_excess:+.1%}"
+        )
+
+
+def coefficient_histogram(coefficients: np.ndarray, limit: int = HISTOGRAM_RANGE) -> np.ndarray:
+    """Counts of AC values ``-limit .. limit`` over ``(..., 64)`` coefficient blocks."""
+
+    ac = coefficients.reshape(-1, 64)[:, 1:].reshape(-1)
+    ac = ac[np.abs(ac) <= limit].astype(np.int64) + limit
+    return np.bincount(ac, minlength=2 * limit + 1)
+
+
+def _pair_histograms(values: np.ndarray, steps: int) -> np.ndarray:
+    """``(steps, bins)`` cumulative histograms of ``values`` with 0 and 1 left out.
+
+    Bins are offset by an even number so ``2k``/``2k+1`` (including the
+    ``-2``/``-1`` pair) are adjacent, as LSB replacement swaps them.
+    """
+
+    usable = values[(values != 0) & (values != 1)].astype(np.int64)
+    if usable.size == 0:
+        return np.zeros((steps, 2))
+    offset = 2 * ((-int(usable.min()) + 1) // 2)
+    bins = int(usable.max()) + offset + 2
+    bins += bins & 1
+    window = np.minimum(np.arange(usable.size) * steps // usable.size, steps - 1)
+    counts = np.bincount(window * bins + usable + offset, minlength=steps * bins)
+    return np.cumsum(counts.reshape(steps, bins), axis=0)
+
+
+def chi_square_profile(coefficients: np.ndarray, steps: int = PROFILE_STEPS) -> np.ndarray:
+    """Pair-of-values p-value over the first 1/steps, 2/steps, ... of the AC stream.
+
+    Sequential embedders (JSteg) show p close to 1 up to the end of the
+    message; scattered ones (OutGuess before correction) lift every prefix.
+    """
+
+    ac = coefficients.reshape(-1, 64)[:, 1:].reshape(-1)
+    return np.array([pov_pvalue(row) for row in _pair_histograms(ac, steps)])
+
+
+def _blocks_to_plane(blocks: np.ndarray) -> np.ndarray:
+    rows, cols = blocks.shape[:2]
+    return blocks.transpose(0, 2, 1, 3).reshape(rows * 8, cols * 8)
+
+
+def _plane_to_blocks(plane: np.ndarray) -> np.ndarray:
+    rows, cols = plane.shape[0] // 8, plane.shape[1] // 8
+    return plane[: rows * 8, : cols * 8].reshape(rows, 8, cols, 8).transpose(0, 2, 1, 3)
+
+
+def _spatial(blocks: np.ndarray, quant: np.ndarray) -> np.ndarray:
+    """Dequantise and inverse-DCT coefficient blocks into a level-shifted plane."""
+
+    values = blocks.astype(np.float32) * quant.reshape(8, 8).astype(np.float32)
+    return np.clip(_blocks_to_plane(DCT.T @ values @ DCT), -128.0, 127.0)
+
+
+def _quantise(plane: np.ndarray, quant: np.ndarray) -> np.ndarray:
+    return np.rint((DCT @ _plane_to_blocks(plane) @ DCT.T) / quant.reshape(8, 8)).astype(np.int32)
+
+
+def blockiness(plane: np.ndarray) -> float:
+    """Mean absolute step across 8x8 block edges over that inside blocks."""
+
+    across_rows = np.abs(np.diff(plane, axis=0))
+    across_cols = np.abs(np.diff(plane, axis=1))
+    edge_rows = np.arange(across_rows.shape[0]) % 8 == 7
+    edge_cols = np.arange(across_cols.shape[1]) % 8 == 7
+    edges = across_rows[edge_rows].sum() + across_cols[:, edge_cols].sum()
+    edge_count = edge_rows.sum() * plane.shape[1] + edge_cols.sum() * plane.shape[0]
+    inner = across_rows[~edge_rows].sum() + across_cols[:, ~edge_cols].sum()
+    inner_count = across_rows.size + across_cols.size - edge_count
+    if not edge_count or not inner_count or inner <= 0:
+        return 0.0
+    return float((edges / edge_count) / (inner / inner_count))
+
+
+def f5_beta(stego: np.ndarray, calibrated: np.ndarray) -> float:
+    """Fridrich's calibration estimate of the F5 change rate.
+
+    F5 shrinks |coefficients| toward zero, moving counts from 1 to 0.  The
+    calibrated histogram (cropped by 4 pixels and requantised) approximates
+    the cover, and β is fitted per low-frequency mode from the 0/1/2 bins.
+    """
+
+    estimates = []
+    for mode in F5_MODES:
+        observed = np.bincount(np.minimum(np.abs(stego[..., mode]).reshape(-1), 3), minlength=4)
+        cover = np.bincount(np.minimum(np.abs(calibrated[..., mode]).reshape(-1), 3), minlength=4)
+        h0, h1, h2 = (float(value) for value in cover[:3])
+        denominator = h1 * h1 + (h2 - h1) ** 2
+        if denominator <= 0:
+            continue
+        estimates.append((h1 * (observed[0] - h0) + (observed[1] - h1) * (h2 - h1)) / denominator)
+    return float(np.clip(np.mean(estimates), 0.0, 1.0)) if estimates else 0.0
+
+
+def analyze_coefficients(coefficients: JpegCoefficients) -> JpegAnalysis:
+    """Run every DCT-domain detector on decoded coefficients."""
+
+    luma = coefficients.luma
+    rows = -(-coefficients.height // 8)
+    cols = -(-coefficients.width // 8)
+    blocks = luma.blocks[:rows, :cols]
+    if blocks.shape[0] < MIN_BLOCKS or blocks.shape[1] < MIN_BLOCKS:
+        raise ValueError("image is too small for JPEG steganalysis")
+
+    with span("jpeg.histogram"):
+        histogram = coefficient_histogram(luma.coefficients)
+        every = np.concatenate([component.coefficients.reshape(-1, 64) for component in coefficients.components])
+        profile = chi_square_profile(every)
+
+    with span("jpeg.calibrate", blocks.size * 4):
+        plane = _spatial(blocks, luma.quant)
+        shifted = plane[CALIBRATION_SHIFT:, CALIBRATION_SHIFT:]
+        calibrated = _quantise(shifted, luma.quant)
+        beta = f5_beta(blocks.reshape(*blocks.shape[:2], 64), calibrated.reshape(*calibrated.shape[:2], 64))
+        stego_blockiness = blockiness(plane)
+        reference = _spatial(calibrated, luma.quant)
+        calibrated_blockiness = blockiness(reference)
+
+    excess = stego_blockiness / calibrated_blockiness - 1.0 if calibrated_blockiness > 0 else 0.0
+    # Embedding starts at the beginning of the stream, so the first prefix
+    # is the most sensitive; the profile shows how far it reaches.
+    chi = float(profile[0])
+    # Independent pieces of evidence: the score is the chance at least one fires.
+    evidence = (
+        0.8 * chi,
+        0.9 * min(1.0, 4.0 * beta),
+        0.5 * min(1.0, max(0.0, 4.0 * (excess - BLOCKINESS_SLACK))),
+    )
+    score = int(round(100 * (1.0 - float(np.prod([1.0 - value for value in evidence])))))
+    level = next(label for limit, label in RISK_LEVELS if score < limit)
+    return JpegAnalysis(
+        blocks=int(blocks.shape[0] * blocks.shape[1]),
+        histogram=histogram,
+        chi_square_p=chi,
+        chi_square_profile=profile,
+        f5_beta=beta,
+        blockiness=stego_blockiness,
+        calibrated_blockiness=calibrated_blockiness,
+        score=score,
+        level=level,
+    )
+
+
+def analyze_jpeg(path: str, max_pixels: int | None = ANALYSIS_PIXELS) -> JpegAnalysis:
+    """:func:`analyze_coefficients` straight from the entropy-coded data of ``path``.
+
+    Only the top ``max_pixels`` of the image are decoded (``None`` for all
+    of it), which bounds the pure-Python Huffman decode.
+    """
+
+    return analyze_coefficients(read_coefficients(path, max_pixels))
+
+
+__all__ = [
+    "JpegAnalysis",
+    "analyze_coefficients",
+    "analyze_jpeg",
+    "blockiness",
+    "chi_square_profile",
+    "coefficient_histogram",
+    "f5_beta",
+]
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from .header import PayloadError
+from .profiling import span
+
+SALT_SIZE = 16
+KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+DEFAULT_TTL = 60.0
+# Sealed payloads: magic, version, log2(n), r, p, salt, AES-256-GCM nonce,
+# ciphertext body, GCM tag at the end.
+SEAL_MAGIC = b"STGK"
+SEAL_VERSION = 2
+CIPHER_HEADER = struct.Struct(f">4sBBBB{SALT_SIZE}s{NONCE_SIZE}s")
+# Capacity reserved for the envelope.
+SEAL_OVERHEAD = CIPHER_HEADER.size + TAG_SIZE
+# KDF parameters are read back from untrusted headers, so one derivation
+# may touch at most 256 MiB (KdfParams.memory), with p == 1.
+MAX_KDF_MEMORY = 256 << 20
+MAX_LOG_N = 18
+MAX_R = 8
+MAX_P = 1
+
+
+@dataclass(frozen=True)
+class KdfParams:
+    """scrypt cost parameters; ``n`` must be a power of two."""
+
+    n: int = 1 << 15
+    r: int = 8
+    p: int = 1
+
+    @property
+    def memory(self) -> int:
+        """Bytes scrypt touches for one derivation."""
+
+        return 128 * self.n * self.r * self.p
+
+
+DEFAULT_KDF = KdfParams()
+
+
+def _password_bytes(password: bytes | str) -> bytes:
+    return password.encode("utf-8") if isinstance(password, str) else bytes(password)
+
+
+def derive_key(password: bytes | str, salt: bytes, params: KdfParams = DEFAULT_KDF) -> bytes:
+    """:data:`KEY_SIZE` bytes from scrypt; tens of milliseconds by design."""
+
+    with span("kdf.scrypt", params.memory):
+        return hashlib.scrypt(
+            _password_bytes(password),
+            salt=salt,
+            n=params.n,
+            r=params.r,
+            p=params.p,
+            maxmem=2 * params.memory,
+            dklen=KEY_SIZE,
+        )
+
+
+class KeyCache:
+    """Derived keys for one job, keyed by (password, salt, KDF parameters).
+
+    Auto-detection and multi-file extraction try one password many times;
+    with a cache the KDF runs once per distinct salt.  Passwords are not
+    stored: entries are looked up by a keyed BLAKE2 digest under a secret
+    that lives only as long as the cache.  Entries expire ``ttl`` seconds
+    after derivation, and :meth:`clear` (also run on leaving a ``with``
+    block) overwrites every stored key.  Python may still hold copies of
+    returned keys, so the wipe is best effort.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL) -> None:
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._entries: dict[tuple[bytes, bytes, KdfParams], tuple[float, bytearray]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._entries)
+
+    def __enter__(self) -> KeyCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.clear()
+
+    def _expire(self, now: float) -> None:
+        for entry in [entry for entry, (expires, _) in self._entries.items() if expires <= now]:
+            _, value = self._entries.pop(entry)
+            value[:] = bytes(len(value))
+
+    def derive(self, password: bytes | str, salt: bytes, params: KdfParams = DEFAULT_KDF) -> bytes:
+        """Cached :func:`derive_key`.
+
+        The lock is held through a derivation, so threads asking for the
+        same key wait for the first one instead of deriving it again.
+        """
+
+        lookup = hashlib.blake2b(_password_bytes(password), key=self._secret, digest_size=32).digest()
+        entry = (lookup, bytes(salt), params)
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            cached = self._entries.get(entry)
+            if cached is not None:
+                self.hits += 1
+                return bytes(cached[1])
+            self.misses += 1
+            key = derive_key(password, salt, params)
+            self._entries[entry] = (now + self.ttl, bytearray(key))
+            return key
+
+    def clear(self) -> None:
+        """Overwrite and drop every cached key."""
+
+        with self._lock:
+            for _, value in self._entries.values():
+                value[:] = bytes(len(value))
+            self._entries.clear()
+
+
+def is_sealed(data: bytes) -> bool:
+    return len(data) >= CIPHER_HEADER.size + TAG_SIZE and data[:4] == SEAL_MAGIC
+
+
+def _cipher(key: bytes, nonce: bytes, tag: bytes | None = None):
+    # Imported here so password-free embedding does not need ``cryptography``.
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    return Cipher(algorithms.AES(key), modes.GCM(nonce, tag))
+
+
+def _key_for(password: bytes | str, salt: bytes, params: KdfParams, cache: KeyCache | None) -> bytes:
+    return cache.derive(password, salt, params) if cache is not None else derive_key(password, salt, params)
+
+
+def seal_stream(
+    chunks: Iterable[bytes],
+    password: bytes | str,
+    *,
+    params: KdfParams = DEFAULT_KDF,
+    salt: bytes | None = None,
+    cache: KeyCache | None = None,
+) -> Iterator[bytes]:
+    """Encrypt ``chunks`` with AES-256-GCM under a scrypt-derived key.
+
+    Yields the envelope header, one ciphertext chunk per input chunk and
+    finally the GCM tag, so a payload of any size is sealed with bounded
+    memory.  The header is authenticated along with the body.
+    """
+
+    salt = os.urandom(SALT_SIZE) if salt is None else salt
+    if len(salt) != SALT_SIZE:
+        raise ValueError(f"salt must be {SALT_SIZE} bytes")
+    nonce = os.urandom(NONCE_SIZE)
+    key = _key_for(password, salt, params, cache)
+    head = CIPHER_HEADER.pack(SEAL_MAGIC, SEAL_VERSION, params.n.bit_length() - 1, params.r, params.p, salt, nonce)
+    encryptor = _cipher(key, nonce).encryptor()
+    encryptor.authenticate_additional_data(head)
+    yield head
+    for chunk in chunks:
+        with span("seal.encrypt", len(chunk)):
+            yield encryptor.update(chunk)
+    encryptor.finalize()
+    yield encryptor.tag
+
+
+def seal(
+    data: bytes,
+    password: bytes | str,
+    *,
+    params: KdfParams = DEFAULT_KDF,
+    salt: bytes | None = None,
+    cache: KeyCache | None = None,
+) -> bytes:
+    """Encrypt and authenticate ``data`` in one piece (see :func:`seal_stream`).
+
+    Extraction can then tell a wrong password from a damaged payload.
+    """
+
+    return b"".join(seal_stream([data], password, params=params, salt=salt, cache=cache))
+
+
+def _check_params(log_n: int, r: int, p: int) -> KdfParams:
+    if not (1 <= log_n <= MAX_LOG_N and 1 <= r <= MAX_R and 1 <= p <= MAX_P):
+        raise PayloadError("sealed payload has out-of-range KDF parameters")
+    params = KdfParams(1 << log_n, r, p)
+    if params.memory > MAX_KDF_MEMORY:
+        raise PayloadError("sealed payload has out-of-range KDF parameters")
+    return params
+
+
+def unseal(data: bytes, password: bytes | str | None, *, cache: KeyCache | None = None) -> bytes:
+    """Check, decrypt and strip the envelope written by :func:`seal`.
+
+    Raises :class:`~.payload.PayloadError` for a missing or wrong password.
+    """
+
+    if not is_sealed(data):
+        raise PayloadError("payload is not password-protected")
+    version = data[4]
+    if version != SEAL_VERSION:
+        raise PayloadError(f"unsupported sealed payload version {version}")
+    if password is None:
+        raise PayloadError("payload is password-protected")
+
+    _magic, _version, log_n, r, p, salt, nonce = CIPHER_HEADER.unpack_from(data)
+    key = _key_for(password, salt, _check_params(log_n, r, p), cache)
+    decryptor = _cipher(key, nonce, bytes(data[-TAG_SIZE:])).decryptor()
+    decryptor.authenticate_additional_data(bytes(data[: CIPHER_HEADER.size]))
+    from cryptography.exceptions import InvalidTag
+
+    with span("seal.decrypt", len(data)):
+        body = decryptor.update(bytes(data[CIPHER_HEADER.size : -TAG_SIZE]))
+        try:
+            decryptor.finalize()
+        except InvalidTag:
+            raise PayloadError("wrong password or damaged payload") from None
+    return body
+
+
+__all__ = [
+    "DEFAULT_KDF",
+    "KdfParams",
+    "KeyCache",
+    "SALT_SIZE",
+    "SEAL_OVERHEAD",
+    "derive_key",
+    "is_sealed",
+    "seal",
+    "seal_stream",
+    "unseal",
+]
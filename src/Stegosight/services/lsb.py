@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .payload import HEADER_SIZE, BitCollector, FramedPayload, bit_window
+from .permutation import KeyedPermutation, resolve_order
+from .samples import SampleBuffer
+
+DEFAULT_CHUNK = 1 << 22
+
+
+def lsb_capacity(samples: SampleBuffer) -> int:
+    """Number of payload bytes (excluding the header) that fit in ``samples``."""
+
+    return max(samples.size // 8 - HEADER_SIZE, 0)
+
+
+class LsbEmbedder:
+    """Writes a framed payload across one or more sample buffers in order.
+
+    Streaming callers (e.g. the PNG band pipeline) hand over successive
+    buffers; :func:`embed_lsb` is the single-buffer convenience wrapper.
+    Mismatching samples are moved by a random ±1 instead of having their LSB
+    overwritten, which avoids the pair-of-values artefacts of plain LSB
+    replacement.  Only the changed samples are written back.
+
+    With an ``order`` the bits are scattered over the buffer by that keyed
+    permutation instead of being written front to back.
+    """
+
+    def __init__(
+        self,
+        payload: bytes,
+        *,
+        seed: int | None = None,
+        order: KeyedPermutation | None = None,
+        chunk_size: int = DEFAULT_CHUNK,
+    ) -> None:
+        self.data = FramedPayload(payload)
+        self.total_bits = len(self.data) * 8
+        self.offset = 0
+        self.changed = 0
+        self.chunk_size = chunk_size
+        self.order = order
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def done(self) -> bool:
+        return self.offset >= self.total_bits
+
+    def embed(self, samples: SampleBuffer) -> None:
+        usable = min(samples.size, self.total_bits - self.offset)
+        for start in range(0, usable, self.chunk_size):
+            stop = min(start + self.chunk_size, usable)
+            bits = bit_window(self.data, self.offset + start, self.offset + stop)
+            self.changed += lsb_match(samples, _positions(self.order, start, stop), bits, self._rng)
+            samples.release()
+        self.offset += max(usable, 0)
+
+
+def lsb_match(
+    samples: SampleBuffer,
+    index: np.ndarray,
+    bits: np.ndarray,
+    rng: np.random.Generator,
+) -> int:
+    """Make the LSBs at ``index`` equal ``bits`` by ±1 steps; returns samples changed."""
+
+    values = samples.gather(index)
+    mismatch = (values & 1) != bits
+    target = values[mismatch].astype(np.int16)
+    step = rng.integers(0, 2, size=target.size, dtype=np.int16) * 2 - 1
+    step[target == 0] = 1
+    step[target == 255] = -1
+    samples.scatter(index[mismatch], (target + step).astype(values.dtype), values[mismatch])
+    return int(target.size)
+
+
+def _positions(order: KeyedPermutation | None, start: int, stop: int) -> np.ndarray:
+    if order is None:
+        return np.arange(start, stop, dtype=np.int64)
+    return order.range(start, stop)
+
+
+def embed_lsb(
+    samples: SampleBuffer,
+    payload: bytes,
+    *,
+    key: bytes | str | None = None,
+    seed: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> int:
+    """Embed ``payload`` with LSB matching; returns the number of samples changed.
+
+    A ``key`` scatters the payload with :class:`KeyedPermutation`.
+    """
+
+    embedder = LsbEmbedder(
+        payload,
+        seed=seed,
+        order=resolve_order(samples.size, key),
+        chunk_size=chunk_size,
+    )
+    if embedder.total_bits > samples.size:
+        raise ValueError(
+            f"payload needs {embedder.total_bits} samples but the cover only has {samples.size}"
+        )
+    embedder.embed(samples)
+    return embedder.changed
+
+
+def feed_lsb(
+    samples: SampleBuffer,
+    collector: BitCollector,
+    *,
+    order: KeyedPermutation | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> None:
+    """Feed LSBs from ``samples`` into ``collector`` until it is satisfied."""
+
+    position = 0
+    while not collector.complete and position < samples.size:
+        stop = min(position + max(collector.bits_needed, 1), position + chunk_size, samples.size)
+        values = samples.gather(_positions(order, position, stop))
+        collector.feed((values & 1).astype(np.uint8))
+        position = stop
+
+
+def extract_lsb(
+    samples: SampleBuffer,
+    *,
+    key: bytes | str | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> bytes:
+    """Recover a payload written by :func:`embed_lsb`."""
+
+    collector = BitCollector()
+    feed_lsb(samples, collector, order=resolve_order(samples.size, key), chunk_size=chunk_size)
+    return collector.payload()
+
+
+__all__ = ["LsbEmbedder", "embed_lsb", "extract_lsb", "feed_lsb", "lsb_capacity", "lsb_match"]
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from .bmp import read_bmp_layout
+from .cost_maps import HILL_HALO
+from .header import HEADER_BITS
+from .lsb import DEFAULT_CHUNK as LSB_CHUNK
+from .png_stream import DEFAULT_BAND_ROWS, read_png_info
+from .pvd import DEFAULT_CHUNK as PVD_CHUNK
+from .stc import DEFAULT_BLOCK_BITS, MAX_WIDTH, PATH_BUDGET, stc_layout
+
+BUDGET_ENV = "STEGOSIGHT_MEMORY_BUDGET"
+FALLBACK_BUDGET = 2 << 30
+# Share of currently available RAM one job may plan for by default.
+AVAILABLE_SHARE = 0.5
+
+# Peak bytes per unit of work, measured with tracemalloc on the engines.
+BASE_BYTES = 48 << 20  # interpreter, numpy, zlib state, file buffers
+WORKER_BYTES = 64 << 20  # one spawned STC worker process
+HILL_BYTES_PER_SAMPLE = 56
+# Includes the Viterbi traceback of the batch being coded.
+STC_BYTES_PER_POSITION = 44
+EXTRACT_BYTES_PER_POSITION = 40
+CHUNK_BYTES = {"lsb": 32, "pvd": 80}
+DEFAULT_CHUNKS = {"lsb": LSB_CHUNK, "pvd": PVD_CHUNK}
+# Decoded band, its filtered copy and the compressor's input, per band byte.
+PNG_BAND_FACTOR = 6
+MIN_CHUNK = 1 << 12
+
+_SIZE = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+
+
+def parse_size(text: str) -> int:
+    """``"512M"``, ``"1.5G"``, ``"2GiB"`` or plain bytes to a byte count."""
+
+    match = _SIZE.match(text)
+    if match is None:
+        raise ValueError(f"cannot read {text!r} as a memory size")
+    number, unit = match.groups()
+    return int(float(number) * (1 << (10 * " kmgt".index(unit.lower() or " "))))
+
+
+def available_memory() -> int | None:
+    """Memory the kernel reports as available to new allocations, if known."""
+
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_budget() -> int:
+    """``$STEGOSIGHT_MEMORY_BUDGET`` or half of the available RAM."""
+
+    configured = os.environ.get(BUDGET_ENV)
+    if configured:
+        return parse_size(configured)
+    available = available_memory()
+    return int(available * AVAILABLE_SHARE) if available else FALLBACK_BUDGET
+
+
+@dataclass(frozen=True)
+class MemoryPlan:
+    """How a job should run to stay inside ``budget`` bytes.
+
+    ``mode`` is ``"in_memory"``, ``"memmap"``, ``"streaming"`` or
+    ``"tiled"``; ``options`` are the engine keywords that select it.
+    """
+
+    method: str
+    mode: str
+    estimate: int
+    budget: int
+    options: dict[str, Any] = field(default_factory=dict)
+    in_memory_estimate: int = 0
+
+    @property
+    def fits(self) -> bool:
+        return self.estimate <= self.budget
+
+    @property
+    def degraded(self) -> bool:
+        """True when the planner moved away from the engine's default path."""
+
+        return bool(self.options)
+
+    def summary(self) -> str:
+        text = f"{self.method}: {self.mode}, ~{self.estimate >> 20} MB of {self.budget >> 20} MB"
+        if self.options:
+            text += " (" + ", ".join(f"{key}={value}" for key, value in self.options.items()) + ")"
+        return text
+
+
+@dataclass(frozen=True)
+class _Shape:
+    rows: int
+    width: int
+    channels: int
+    row_bytes: int
+    png: bool
+
+    @property
+    def samples(self) -> int:
+        return self.rows * self.width * self.channels
+
+    @property
+    def row_samples(self) -> int:
+        return self.width * self.channels
+
+
+def _probe(path: str) -> _Shape:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".bmp":
+        layout = read_bmp_layout(path)
+        return _Shape(layout.height, layout.width, layout.channels, layout.stride, False)
+    if suffix == ".png":
+        info = read_png_info(path)
+        return _Shape(info.height, info.width, info.colour_channels, info.row_bytes, True)
+    raise ValueError(f"no embedding engine for {os.path.basename(path)}")
+
+
+def _fit(room: int, unit: int, default: int, minimum: int = 1) -> int:
+    """Largest count of ``unit``-byte items in ``room``, capped at ``default``."""
+
+    return max(min(default, room // max(unit, 1)), minimum)
+
+
+def _plan_chunked(shape: _Shape, method: str, budget: int) -> MemoryPlan:
+    """LSB/PVD: a memory-mapped BMP or a streamed PNG, sized by chunk or band."""
+
+    per_item = CHUNK_BYTES[method]
+    room = budget - BASE_BYTES
+    options: dict[str, Any] = {}
+    if shape.png:
+        per_row = shape.row_bytes * PNG_BAND_FACTOR + shape.row_samples * per_item
+        band_rows = _fit(room, per_row, DEFAULT_BAND_ROWS)
+        if band_rows < DEFAULT_BAND_ROWS:
+            options["band_rows"] = band_rows
+        return MemoryPlan(method, "streaming", BASE_BYTES + band_rows * per_row, budget, options)
+
+    default = DEFAULT_CHUNKS[method]
+    chunk = _fit(room, per_item, default, MIN_CHUNK)
+    if chunk < default:
+        options["chunk_size"] = chunk
+    return MemoryPlan(method, "memmap", BASE_BYTES + chunk * per_item, budget, options)
+
+
+def _plan_decoded(shape: _Shape, method: str, budget: int) -> MemoryPlan:
+    """Keyed LSB/PVD on a PNG: the key scatters over the whole decoded image.
+
+    The decoded pixels stay on the heap unless they do not fit; then they
+    are spilled to a memory map and the chunk shrinks to the room left.
+    """
+
+    per_item = CHUNK_BYTES[method]
+    default = DEFAULT_CHUNKS[method]
+    heap_pixels = shape.rows * shape.row_bytes
+    # The re-encode filters and deflates one default band at a time.
+    band = DEFAULT_BAND_ROWS * shape.row_bytes * PNG_BAND_FACTOR
+    in_memory = BASE_BYTES + heap_pixels + band + default * per_item
+    if in_memory <= budget:
+        return MemoryPlan(method, "in_memory", in_memory, budget, {}, in_memory)
+
+    options: dict[str, Any] = {"spill": True}
+    chunk = _fit(budget - BASE_BYTES - band, per_item, default, MIN_CHUNK)
+    if chunk < default:
+        options["chunk_size"] = chunk
+    return MemoryPlan(method, "memmap", BASE_BYTES + band + chunk * per_item, budget, options, in_memory)
+
+
+def _plan_adaptive(
+    shape: _Shape,
+    positions: int,
+    length: int,
+    budget: int,
+    workers: int,
+    *,
+    costs: bool,
+) -> MemoryPlan:
+    """Content-adaptive: whole-image arrays, or tiled costs and batched STC."""
+
+    per_position = STC_BYTES_PER_POSITION if costs else EXTRACT_BYTES_PER_POSITION
+    heap_pixels = shape.rows * shape.row_bytes if shape.png else 0
+    # Extra STC worker processes, each holding up to one traceback budget.
+    pool = (workers - 1) * (PATH_BUDGET + WORKER_BYTES)
+    hill = shape.samples * HILL_BYTES_PER_SAMPLE if costs else 0
+    in_memory = BASE_BYTES + heap_pixels + pool + hill + positions * per_position
+    method = "content_adaptive"
+    if in_memory <= budget:
+        return MemoryPlan(method, "in_memory", in_memory, budget, {}, in_memory)
+
+    options: dict[str, Any] = {}
+    if shape.png:
+        options["spill"] = True
+    room = budget - BASE_BYTES
+    if pool > room // 4:
+        options["workers"] = 1
+        pool = 0
+    room -= pool
+    # Split what is left between one cost-map tile and one STC batch.
+    estimate = BASE_BYTES + pool
+    if costs:
+        per_row = shape.row_samples * HILL_BYTES_PER_SAMPLE
+        tile_rows = _fit(room // 2 - 2 * HILL_HALO * per_row, per_row, shape.rows)
+        options["tile_rows"] = tile_rows
+        estimate += (tile_rows + 2 * HILL_HALO) * per_row
+        room //= 2
+    block_batch = _fit(room, length * per_position, max(positions // max(length, 1), 1))
+    options["block_batch"] = block_batch
+    estimate += block_batch * length * per_position
+    return MemoryPlan(method, "tiled", estimate, budget, options, in_memory)
+
+
+def plan_embed(
+    path: str,
+    method: str,
+    payload_bytes: int,
+    budget: int | None = None,
+    *,
+    workers: int | None = None,
+    keyed: bool = False,
+) -> MemoryPlan:
+    """Choose how to embed ``payload_bytes`` into ``path`` within ``budget``.
+
+    Only the file header is read.  ``keyed`` says the engine gets a key,
+    which makes PNG covers decode in full.  When even the leanest variant
+    cannot fit, that variant is still returned (with :attr:`MemoryPlan.fits`
+    false) so the job degrades rather than being refused.
+    """
+
+    budget = budget or default_budget()
+    if method not in CHUNK_BYTES and method != "content_adaptive":
+        return MemoryPlan(method, "in_memory", 0, budget)
+    shape = _probe(path)
+    if method in CHUNK_BYTES:
+        if shape.png and keyed:
+            return _plan_decoded(shape, method, budget)
+        return _plan_chunked(shape, method, budget)
+    blocks, block_bits, width = stc_layout(payload_bytes * 8, shape.samples - HEADER_BITS)
+    length = block_bits * width
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    # stc_embed never starts more workers than there are blocks.
+    workers = max(min(workers, blocks), 1)
+    return _plan_adaptive(shape, blocks * length, length, budget, workers, costs=True)
+
+
+def plan_extract(path: str, method: str, budget: int | None = None, *, keyed: bool = False) -> MemoryPlan:
+    """Like :func:`plan_embed` for extraction, assuming the largest payload."""
+
+    budget = budget or default_budget()
+    if method not in CHUNK_BYTES and method != "content_adaptive":
+        return MemoryPlan(method, "in_memory", 0, budget)
+    shape = _probe(path)
+    if method in CHUNK_BYTES:
+        if shape.png and keyed:
+            return _plan_decoded(shape, method, budget)
+        plan = _plan_chunked(shape, method, budget)
+        # Unkeyed PNG extraction only decodes the bands it needs, at the default height.
+        return MemoryPlan(method, plan.mode, plan.estimate, budget, {} if shape.png else plan.options)
+    # The block length depends on the unknown payload; plan for the longest.
+    positions = max(shape.samples - HEADER_BITS, 0)
+    length = DEFAULT_BLOCK_BITS * MAX_WIDTH
+    return _plan_adaptive(shape, positions, length, budget, 1, costs=False)
+
+
+__all__ = [
+    "BUDGET_ENV",
+    "MemoryPlan",
+    "available_memory",
+    "default_budget",
+    "parse_size",
+    "plan_embed",
+    "plan_extract",
+]
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import numpy as np
+
+# The header and its error type live in a NumPy-free module so the GUI and
+# the daemon CLI can use them without importing NumPy.
+from .header import (
+    HEADER_BITS,
+    HEADER_SIZE,
+    FramedPayload,
+    PayloadError,
+    frame_payload,
+    pack_header,
+    parse_header,
+)
+
+
+def bytes_to_bits(data: bytes | np.ndarray) -> np.ndarray:
+    """Unpack bytes into a ``uint8`` array of bits, most significant bit first."""
+
+    return np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8))
+
+
+def bits_to_bytes(bits: np.ndarray) -> bytes:
+    """Pack a bit array (MSB first) back into bytes, zero-padding the tail."""
+
+    return np.packbits(np.asarray(bits, dtype=np.uint8)).tobytes()
+
+
+def bit_window(data: bytes | FramedPayload, start: int, stop: int) -> np.ndarray:
+    """Return bits ``[start, stop)`` of ``data``; bits past the end read as zero.
+
+    Only the bytes covering the window are unpacked, so engines can walk a
+    large payload chunk by chunk without materialising its full bit array.
+    ``data`` may be anything sliceable into bytes: a memory map or a
+    :class:`FramedPayload` is read one window at a time.
+    """
+
+    out = np.zeros(max(stop - start, 0), dtype=np.uint8)
+    total = len(data) * 8
+    if start >= total or stop <= start:
+        return out
+    first = start // 8
+    last = min((stop + 7) // 8, len(data))
+    bits = np.unpackbits(np.frombuffer(data[first:last], dtype=np.uint8))
+    skip = start - first * 8
+    available = bits[skip : skip + (stop - start)]
+    out[: available.size] = available
+    return out
+
+
+class BitCollector:
+    """Accumulates extracted bits until a framed payload is complete."""
+
+    def __init__(self) -> None:
+        self._chunks: list[np.ndarray] = []
+        self._count = 0
+        self.flags: int | None = None
+        self.length: int | None = None
+
+    @property
+    def bits_needed(self) -> int:
+        """Number of further bits required, or the header size while unknown."""
+
+        if self.length is None:
+            return max(HEADER_BITS - self._count, 0)
+        return max(HEADER_BITS + self.length * 8 - self._count, 0)
+
+    @property
+    def complete(self) -> bool:
+        return self.length is not None and self.bits_needed == 0
+
+    def feed(self, bits: np.ndarray) -> None:
+        if bits.size == 0 or self.complete:
+            return
+        self._chunks.append(np.asarray(bits, dtype=np.uint8))
+        self._count += bits.size
+        if self.length is None and self._count >= HEADER_BITS:
+            joined = np.concatenate(self._chunks)
+            self._chunks = [joined]
+            self.flags, self.length = parse_header(bits_to_bytes(joined[:HEADER_BITS]))
+
+    def payload(self) -> bytes:
+        if not self.complete:
+            raise PayloadError("bitstream ended before the payload was complete")
+        joined = np.concatenate(self._chunks)
+        assert self.length is not None
+        return bits_to_bytes(joined[HEADER_BITS : HEADER_BITS + self.length * 8])
+
+
+__all__ = [
+    "BitCollector",
+    "FramedPayload",
+    "HEADER_BITS",
+    "HEADER_SIZE",
+    "PayloadError",
+    "bit_window",
+    "bits_to_bytes",
+    "bytes_to_bits",
+    "frame_payload",
+    "pack_header",
+    "parse_header",
+]
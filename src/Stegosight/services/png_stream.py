@@ -0,0 +1,542 @@
+from __future__ import annotations
+
+import os
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator
+
+import numpy as np
+
+from .adaptive import embed_image_adaptive, extract_adaptive
+from .lsb import LsbEmbedder, embed_lsb, extract_lsb, feed_lsb
+from .payload import BitCollector
+from .profiling import profile_iter, span
+from .pvd import PvdEmbedder, embed_pvd, extract_pvd, feed_pvd
+from .risk import RiskTracker
+from .samples import SampleBuffer
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+DEFAULT_BAND_ROWS = 64
+IDAT_CHUNK_SIZE = 1 << 16
+INFLATE_STEP = 1 << 18
+# Decoded bytes un-filtered together (see _unfilter_wavefront).
+UNFILTER_BYTES = 1 << 23
+
+EMBEDDERS = {"lsb": LsbEmbedder, "pvd": PvdEmbedder}
+FEEDERS = {"lsb": feed_lsb, "pvd": feed_pvd}
+# Engines that need random access over the whole decoded image:
+# content_adaptive always, lsb/pvd when a key scatters the payload.
+DECODED_EMBEDDERS = {"content_adaptive": embed_image_adaptive, "lsb": embed_lsb, "pvd": embed_pvd}
+DECODED_EXTRACTORS = {"content_adaptive": extract_adaptive, "lsb": extract_lsb, "pvd": extract_pvd}
+# Streamed methods plus content_adaptive, which decodes the whole image.
+METHODS = ("content_adaptive", *EMBEDDERS)
+
+
+@dataclass(frozen=True)
+class PngInfo:
+    """Subset of the IHDR chunk the streaming codec needs."""
+
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+
+    @property
+    def channels(self) -> int:
+        return COLOR_CHANNELS[self.color_type]
+
+    @property
+    def colour_channels(self) -> int:
+        """Channels used for embedding (alpha excluded)."""
+
+        return self.channels - (1 if self.color_type in (4, 6) else 0)
+
+    @property
+    def bytes_per_sample(self) -> int:
+        return self.bit_depth // 8
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return self.channels * self.bytes_per_sample
+
+    @property
+    def row_bytes(self) -> int:
+        return self.width * self.bytes_per_pixel
+
+
+def _read_chunk(handle: BinaryIO) -> tuple[bytes, bytes]:
+    head = handle.read(8)
+    if len(head) < 8:
+        raise ValueError("truncated PNG stream")
+    length, ctype = struct.unpack(">I4s", head)
+    data = handle.read(length)
+    crc = handle.read(4)
+    if len(data) < length or len(crc) < 4:
+        raise ValueError("truncated PNG chunk")
+    return ctype, data
+
+
+def _write_chunk(handle: BinaryIO, ctype: bytes, data: bytes) -> None:
+    handle.write(struct.pack(">I", len(data)))
+    handle.write(ctype)
+    handle.write(data)
+    handle.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(ctype)) & 0xFFFFFFFF))
+
+
+def _parse_ihdr(data: bytes) -> PngInfo:
+    width, height, depth, color, _comp, _filter, interlace = struct.unpack(">IIBBBBB", data)
+    if color not in COLOR_CHANNELS:
+        raise ValueError("palette PNGs are not supported for streaming embedding")
+    if depth not in (8, 16):
+        raise ValueError(f"unsupported PNG bit depth {depth}")
+    if interlace:
+        raise ValueError("interlaced PNGs are not supported for streaming embedding")
+    return PngInfo(width, height, depth, color)
+
+
+def read_png_info(path: str) -> PngInfo:
+    with open(path, "rb") as handle:
+        if handle.read(8) != PNG_SIGNATURE:
+            raise ValueError(f"{path} is not a PNG file")
+        ctype, data = _read_chunk(handle)
+    if ctype != b"IHDR":
+        raise ValueError("PNG stream does not start with IHDR")
+    return _parse_ihdr(data)
+
+
+# ----------------------------------------------------------------------
+# Filtering
+def _unfilter_row(ftype: int, line: np.ndarray, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """Undo None, Sub or Up, which are vectorised within the row."""
+
+    if ftype == 0:
+        return line.copy()
+    if ftype == 1:
+        return np.add.accumulate(line.reshape(-1, bpp), axis=0, dtype=np.uint8).reshape(-1)
+    if ftype == 2:
+        return line + prev
+    raise ValueError(f"invalid PNG filter type {ftype}")
+
+
+def _unfilter_wavefront(types: np.ndarray, lines: np.ndarray, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """Undo any mix of filters over a block of rows at once.
+
+    Average and Paeth need the reconstructed left neighbour, so a row
+    cannot be vectorised on its own.  Pixel ``x`` of row ``r`` only needs
+    pixels of the same and the previous row at ``x`` or ``x - 1``, so all
+    pixels with the same ``x + r`` can be resolved together: rows are
+    skewed by one pixel each into ``grid[x + r + 1, r]`` and every step
+    computes one anti-diagonal, as numpy operations across the rows and the
+    ``bpp`` bytes of a pixel.  Steps run once per pixel column plus once per row.
+    """
+
+    rows, row_bytes = lines.shape
+    width = row_bytes // bpp
+    steps = width + rows + 1
+    # Lane 0 holds the row above the block; column x = -1 stays zero.
+    grid = np.zeros((steps, rows + 1, bpp), dtype=np.int16)
+    raw = np.zeros((steps, rows + 1, bpp), dtype=np.uint8)
+    grid[1 : width + 1, 0] = prev.reshape(width, bpp)
+    pixels = lines.reshape(rows, width, bpp)
+    for lane in range(1, rows + 1):
+        raw[lane + 1 : lane + 1 + width, lane] = pixels[lane - 1]
+
+    kinds = [kind for kind in range(5) if (types == kind).any()]
+    # Encoders mostly pick one filter for a whole image; skip the selects then.
+    masks = {kind: (types == kind)[:, None] for kind in kinds} if len(kinds) > 1 else {}
+    for step in range(2, width + rows + 1):
+        low, high = max(1, step - width), min(rows, step - 1) + 1
+        left = grid[step - 1, low:high]
+        up = grid[step - 1, low - 1 : high - 1]
+        up_left = grid[step - 2, low - 1 : high - 1]
+        predicted = 0
+        for kind in kinds:
+            if kind == 0:
+                continue
+            if kind == 1:
+                guess = left
+            elif kind == 2:
+                guess = up
+            elif kind == 3:
+                guess = (left + up) >> 1
+            else:
+                # p - a == b - c, p - b == a - c, p - c == (a - c) + (b - c)
+                from_up = up - up_left
+                from_left = left - up_left
+                pa, pb, pc = np.abs(from_up), np.abs(from_left), np.abs(from_up + from_left)
+                guess = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left))
+            predicted = np.where(masks[kind][low - 1 : high - 1], guess, predicted) if masks else guess
+        out = grid[step, low:high]
+        np.add(raw[step, low:high], predicted, out=out)
+        np.bitwise_and(out, 0xFF, out=out)
+
+    decoded = np.empty((rows, width, bpp), dtype=np.uint8)
+    for lane in range(1, rows + 1):
+        decoded[lane - 1] = grid[lane + 1 : lane + 1 + width, lane]
+    return decoded.reshape(rows, row_bytes)
+
+
+def _unfilter_block(filtered: np.ndarray, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """Undo the filters of ``(rows, 1 + row_bytes)`` filtered scanlines."""
+
+    types = filtered[:, 0]
+    lines = filtered[:, 1:]
+    if types.size and int(types.max()) > 4:
+        raise ValueError(f"invalid PNG filter type {int(types.max())}")
+    if (types >= 3).any():
+        return _unfilter_wavefront(types, lines, prev, bpp)
+    decoded = np.empty_like(lines)
+    for row in range(len(lines)):
+        prev = decoded[row] = _unfilter_row(int(types[row]), lines[row], prev, bpp)
+    return decoded
+
+
+def filter_band(band: np.ndarray, prev: np.ndarray, bpp: int) -> bytes:
+    """Filter a ``(rows, row_bytes)`` band, picking the best filter per row."""
+
+    cur = band.astype(np.int16)
+    up = np.empty_like(cur)
+    up[0] = prev
+    up[1:] = cur[:-1]
+    left = np.zeros_like(cur)
+    left[:, bpp:] = cur[:, :-bpp]
+    upleft = np.zeros_like(cur)
+    upleft[:, bpp:] = up[:, :-bpp]
+
+    p = left + up - upleft
+    pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - upleft)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+
+    candidates = np.stack(
+        [cur, cur - left, cur - up, cur - ((left + up) >> 1), cur - paeth]
+    ).astype(np.uint8)
+    # Minimum sum of absolute differences, the heuristic libpng uses.
+    score = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+    choice = score.argmin(axis=0)
+
+    rows = band.shape[0]
+    out = np.empty((rows, band.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = choice
+    out[:, 1:] = candidates[choice, np.arange(rows)]
+    return out.tobytes()
+
+
+# ----------------------------------------------------------------------
+# Streaming decode
+def _iter_idat(handle: BinaryIO, before: list[tuple[bytes, bytes]] | None = None) -> Iterator[bytes]:
+    """Yield IDAT payloads; chunks seen before the first IDAT go to ``before``."""
+
+    seen_idat = False
+    while True:
+        ctype, data = _read_chunk(handle)
+        if ctype == b"IDAT":
+            seen_idat = True
+            yield data
+            continue
+        if seen_idat:
+            # Hand the first trailing chunk back by rewinding over it.
+            handle.seek(-(12 + len(data)), os.SEEK_CUR)
+            return
+        if ctype == b"IEND":
+            raise ValueError("PNG stream has no image data")
+        if before is not None:
+            before.append((ctype, data))
+
+
+def _iter_bands(
+    handle: BinaryIO,
+    info: PngInfo,
+    band_rows: int,
+    before: list[tuple[bytes, bytes]] | None = None,
+) -> Iterator[np.ndarray]:
+    """Inflate and un-filter the image ``band_rows`` rows at a time.
+
+    Decompression is driven by ``zlib.decompressobj`` with a bounded
+    ``max_length`` so neither the compressed nor the raw image is ever held
+    in full.  Rows are un-filtered in blocks of about ``UNFILTER_BYTES``
+    (see :func:`_unfilter_wavefront`).  Each yielded band is a fresh
+    ``(rows, width, bytes_per_pixel)`` array the caller may modify.
+    """
+
+    stride = info.row_bytes + 1
+    bpp = info.bytes_per_pixel
+    # Rows are un-filtered a block of whole bands at a time; the wavefront
+    # gains nothing from blocks taller than the image is wide.
+    bands_per_block = min(UNFILTER_BYTES // max(1, band_rows * info.row_bytes), info.width // band_rows)
+    block_rows = band_rows * max(1, bands_per_block)
+    inflater = zlib.decompressobj()
+    pending = bytearray()
+    prev = np.zeros(info.row_bytes, dtype=np.uint8)
+    produced = 0
+
+    def emit(final: bool = False) -> Iterator[np.ndarray]:
+        nonlocal prev, produced
+        while True:
+            available = min(len(pending) // stride, info.height - produced)
+            if available == 0 or (
+                available < block_rows and not final and produced + available < info.height
+            ):
+                return
+            rows = min(available, block_rows)
+            filtered = np.frombuffer(bytes(pending[: rows * stride]), dtype=np.uint8).reshape(rows, stride)
+            del pending[: rows * stride]
+            decoded = _unfilter_block(filtered, prev, bpp)
+            prev = decoded[-1].copy()
+            produced += rows
+            for start in range(0, rows, band_rows):
+                yield decoded[start : start + band_rows].reshape(-1, info.width, bpp)
+
+    for data in _iter_idat(handle, before):
+        while data:
+            pending.extend(inflater.decompress(data, INFLATE_STEP))
+            data = inflater.unconsumed_tail
+            yield from emit()
+    pending.extend(inflater.flush())
+    yield from emit(final=True)
+    if produced < info.height:
+        raise ValueError("PNG image data ended early")
+
+
+def _embeddable(band: np.ndarray, info: PngInfo) -> SampleBuffer:
+    """Colour channels (least significant byte for 16-bit) of a decoded band."""
+
+    rows = band.shape[0]
+    samples = band.reshape(rows, info.width, info.channels, info.bytes_per_sample)
+    return SampleBuffer(samples[:, :, : info.colour_channels, -1])
+
+
+def iter_png_bands(path: str, band_rows: int = DEFAULT_BAND_ROWS) -> Iterator[np.ndarray]:
+    """Yield the decoded pixels of ``path`` in bands of ``band_rows`` rows."""
+
+    with open(path, "rb") as handle:
+        if handle.read(8) != PNG_SIGNATURE:
+            raise ValueError(f"{path} is not a PNG file")
+        ctype, data = _read_chunk(handle)
+        if ctype != b"IHDR":
+            raise ValueError("PNG stream does not start with IHDR")
+        info = _parse_ihdr(data)
+        yield from _iter_bands(handle, info, band_rows)
+
+
+# ----------------------------------------------------------------------
+# Embedding
+def _read_preamble(handle: BinaryIO) -> list[tuple[bytes, bytes]]:
+    """Read the chunks between IHDR and the first IDAT, leaving IDAT unread."""
+
+    chunks = []
+    while True:
+        ctype, data = _read_chunk(handle)
+        if ctype == b"IDAT":
+            handle.seek(-(12 + len(data)), os.SEEK_CUR)
+            return chunks
+        if ctype == b"IEND":
+            raise ValueError("PNG stream has no image data")
+        chunks.append((ctype, data))
+
+
+def _rewrite_png(
+    cover: str,
+    output: str,
+    produce: Callable[[BinaryIO, PngInfo], Iterator[np.ndarray]],
+    compress_level: int,
+) -> None:
+    """Copy ``cover`` to ``output`` with the image data replaced band by band.
+
+    ``produce(src, info)`` yields the new pixels in order; it must leave
+    ``src`` positioned after the IDAT run.  Every other chunk is copied.
+    """
+
+    try:
+        with open(cover, "rb") as src, open(output, "wb") as dst:
+            if src.read(8) != PNG_SIGNATURE:
+                raise ValueError(f"{cover} is not a PNG file")
+            dst.write(PNG_SIGNATURE)
+            ctype, data = _read_chunk(src)
+            if ctype != b"IHDR":
+                raise ValueError("PNG stream does not start with IHDR")
+            info = _parse_ihdr(data)
+            _write_chunk(dst, ctype, data)
+            for chunk in _read_preamble(src):
+                _write_chunk(dst, *chunk)
+
+            deflater = zlib.compressobj(compress_level)
+            pending = bytearray()
+            prev_out = np.zeros(info.row_bytes, dtype=np.uint8)
+            for band in produce(src, info):
+                with span("png.encode", band.nbytes):
+                    flat = band.reshape(band.shape[0], info.row_bytes)
+                    pending.extend(deflater.compress(filter_band(flat, prev_out, info.bytes_per_pixel)))
+                    prev_out = flat[-1].copy()
+                    while len(pending) >= IDAT_CHUNK_SIZE:
+                        _write_chunk(dst, b"IDAT", bytes(pending[:IDAT_CHUNK_SIZE]))
+                        del pending[:IDAT_CHUNK_SIZE]
+
+            pending.extend(deflater.flush())
+            if pending:
+                _write_chunk(dst, b"IDAT", bytes(pending))
+
+            while True:
+                ctype, data = _read_chunk(src)
+                _write_chunk(dst, ctype, data)
+                if ctype == b"IEND":
+                    break
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+
+
+def read_png_pixels(
+    path: str, band_rows: int = DEFAULT_BAND_ROWS, *, spill: bool = False
+) -> np.ndarray:
+    """Decode the whole image as a ``(height, width, bytes_per_pixel)`` array.
+
+    With ``spill`` the pixels go to a memory map over an anonymous temporary
+    file instead of the heap, so the OS can page them out under pressure.
+    """
+
+    info = read_png_info(path)
+    shape = (info.height, info.width, info.bytes_per_pixel)
+    if spill:
+        pixels = np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode="w+", shape=shape)
+    else:
+        pixels = np.empty(shape, dtype=np.uint8)
+    row = 0
+    for band in iter_png_bands(path, band_rows):
+        pixels[row : row + band.shape[0]] = band
+        row += band.shape[0]
+    return pixels
+
+
+def embed_png(
+    cover: str,
+    output: str,
+    payload: bytes,
+    method: str = "lsb",
+    *,
+    band_rows: int = DEFAULT_BAND_ROWS,
+    compress_level: int = 6,
+    spill: bool = False,
+    tracker: RiskTracker | None = None,
+    **options,
+) -> int:
+    """Embed ``payload`` into ``cover`` and write the result to ``output``.
+
+    Unkeyed ``lsb``/``pvd`` rows are decoded, embedded, re-filtered and
+    deflated one band at a time, so peak memory is a function of
+    ``band_rows``, ``UNFILTER_BYTES`` and the row width only.
+    ``content_adaptive`` needs the whole image for its cost map, and a
+    ``key`` needs it to scatter the payload, so those decode the image once
+    and stream only the re-encode; ``spill`` keeps that decoded copy in a
+    memory-mapped temporary file.  A ``tracker`` sees every decoded band as
+    cover data and then follows the engine's writes.  Returns the number of
+    samples changed.
+    """
+
+    if method == "content_adaptive" or (method in DECODED_EMBEDDERS and options.get("key")):
+        info = read_png_info(cover)
+        with span("png.decode", spill=spill) as record:
+            pixels = read_png_pixels(cover, band_rows, spill=spill)
+            record.bytes = pixels.nbytes
+        samples = _embeddable(pixels, info)
+        if tracker is not None:
+            with span("risk.sample"):
+                tracker.begin(samples.rows, samples.width, samples.channels)
+                tracker.observe_cover(samples.array)
+            samples.observer = tracker.observer()
+        with span(f"{method}.embed", len(payload)):
+            changed = DECODED_EMBEDDERS[method](samples, payload, **options)
+
+        def produce(src: BinaryIO, _info: PngInfo) -> Iterator[np.ndarray]:
+            for _ in _iter_idat(src):
+                pass
+            for row in range(0, info.height, band_rows):
+                yield pixels[row : row + band_rows]
+
+        _rewrite_png(cover, output, produce, compress_level)
+        return changed
+
+    factory = EMBEDDERS.get(method)
+    if factory is None:
+        raise ValueError(f"method {method!r} is not available for PNG covers")
+    options.pop("key", None)
+    embedder = factory(payload, **options)
+
+    def produce(src: BinaryIO, info: PngInfo) -> Iterator[np.ndarray]:
+        row = 0
+        bands = profile_iter("png.decode", _iter_bands(src, info, band_rows), lambda band: band.nbytes)
+        for band in bands:
+            samples = _embeddable(band, info)
+            if tracker is not None:
+                if row == 0:
+                    tracker.begin(info.height, info.width, info.colour_channels)
+                with span("risk.sample"):
+                    tracker.observe_cover(samples.array)
+                samples.observer = tracker.observer(row)
+            if not embedder.done:
+                with span(f"{method}.embed"):
+                    embedder.embed(samples)
+            row += band.shape[0]
+            yield band
+
+    _rewrite_png(cover, output, produce, compress_level)
+    if not embedder.done:
+        os.remove(output)
+        raise ValueError("payload exceeds the capacity of this cover")
+    return embedder.changed
+
+
+def extract_png(
+    path: str,
+    method: str = "lsb",
+    *,
+    band_rows: int = DEFAULT_BAND_ROWS,
+    key: bytes | str | None = None,
+    spill: bool = False,
+    block_batch: int | None = None,
+    chunk_size: int | None = None,
+) -> bytes:
+    """Recover a payload from ``path``, decoding only as many bands as needed.
+
+    ``content_adaptive`` and keyed ``lsb``/``pvd`` need the whole decoded
+    image; ``spill``, ``block_batch`` and ``chunk_size`` bound its memory.
+    """
+
+    if method == "content_adaptive" or (method in DECODED_EXTRACTORS and key):
+        info = read_png_info(path)
+        with span("png.decode", spill=spill) as record:
+            pixels = read_png_pixels(path, band_rows, spill=spill)
+            record.bytes = pixels.nbytes
+        if method == "content_adaptive":
+            options = {"block_batch": block_batch}
+        else:
+            options = {} if chunk_size is None else {"chunk_size": chunk_size}
+        with span(f"{method}.extract"):
+            return DECODED_EXTRACTORS[method](_embeddable(pixels, info), key=key, **options)
+
+    feeder = FEEDERS.get(method)
+    if feeder is None:
+        raise ValueError(f"method {method!r} is not available for PNG covers")
+
+    collector = BitCollector()
+    info = read_png_info(path)
+    for band in profile_iter("png.decode", iter_png_bands(path, band_rows), lambda band: band.nbytes):
+        with span(f"{method}.extract"):
+            feeder(_embeddable(band, info), collector)
+        if collector.complete:
+            break
+    return collector.payload()
+
+
+__all__ = [
+    "PngInfo",
+    "embed_png",
+    "extract_png",
+    "filter_band",
+    "iter_png_bands",
+    "read_png_info",
+    "read_png_pixels",
+]
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, Iterator, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar("T")
+
+_current: contextvars.ContextVar[Profiler | None] = contextvars.ContextVar(
+    "stegosight_profiler", default=None
+)
+
+
+def peak_rss() -> int:
+    """High-water resident set size of this process in bytes (0 if unknown)."""
+
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class Span:
+    """One timed stage; ``bytes`` may be filled in while the span is open."""
+
+    name: str
+    start: float = 0.0
+    wall: float = 0.0
+    cpu: float = 0.0
+    bytes: int = 0
+    peak_rss: int = 0
+    depth: int = 0
+    thread: int = 0
+    args: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class StageTotal:
+    name: str
+    calls: int
+    wall: float
+    cpu: float
+    bytes: int
+    peak_rss: int
+    depth: int = 0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / (1 << 20) / self.wall if self.wall > 0 and self.bytes else 0.0
+
+
+class _NullSpan:
+    """Stand-in returned by :func:`span` when no profiler is active."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> Span:
+        return Span("")
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler:
+    """Collects :class:`Span` records for one job.
+
+    Engines open spans through the module-level :func:`span`, which is a
+    no-op unless a profiler has been made current with :meth:`activate`, so
+    instrumentation costs nothing outside profiled jobs.  Wall time comes
+    from :func:`time.perf_counter`, CPU time from :func:`time.thread_time`
+    and memory is the process RSS high-water mark when each span closes.
+    """
+
+    def __init__(self, name: str = "job") -> None:
+        self.name = name
+        self.spans: list[Span] = []
+        self.origin = time.perf_counter()
+        self._depth = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator[Profiler]:
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def span(self, name: str, nbytes: int = 0, **args) -> Iterator[Span]:
+        depth = getattr(self._depth, "value", 0)
+        record = Span(name, bytes=nbytes, depth=depth, thread=threading.get_ident(), args=args)
+        self._depth.value = depth + 1
+        cpu = time.thread_time()
+        record.start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - record.start
+            record.cpu = time.thread_time() - cpu
+            record.start -= self.origin
+            record.peak_rss = peak_rss()
+            self._depth.value = depth
+            with self._lock:
+                self.spans.append(record)
+
+    def iterate(
+        self, name: str, items: Iterable[T], nbytes: Callable[[T], int] | None = None
+    ) -> Iterator[T]:
+        """Re-yield ``items`` with the production of each one timed as ``name``."""
+
+        iterator = iter(items)
+        while True:
+            with self.span(name) as record:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    record.args["exhausted"] = True
+                    return
+                if nbytes is not None:
+                    record.bytes = nbytes(item)
+            yield item
+
+    # ------------------------------------------------------------------
+    def totals(self) -> list[StageTotal]:
+        """Spans aggregated by name, in order of first appearance."""
+
+        grouped: dict[str, list[Span]] = {}
+        for record in sorted(self.spans, key=lambda item: item.start):
+            grouped.setdefault(record.name, []).append(record)
+        return [
+            StageTotal(
+                name,
+                len(records),
+                sum(record.wall for record in records),
+                sum(record.cpu for record in records),
+                sum(record.bytes for record in records),
+                max(record.peak_rss for record in records),
+                min(record.depth for record in records),
+            )
+            for name, records in grouped.items()
+        ]
+
+    def summary(self) -> str:
+        """One line per stage: wall, CPU, throughput and peak RSS."""
+
+        lines = []
+        for total in self.totals():
+            line = "  " * total.depth
+            line += f"{total.name}: {total.wall * 1000:.1f} ms (CPU {total.cpu * 1000:.1f} ms)"
+            if total.calls > 1:
+                line += f" ×{total.calls}"
+            rate = total.megabytes_per_second
+            if rate >= 1:
+                line += f" · {rate:.1f} MB/s"
+            elif rate:
+                line += f" · {rate * 1024:.1f} KB/s"
+            if total.peak_rss:
+                line += f" · RSS {total.peak_rss / (1 << 20):.0f} MB"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "stages": [asdict(total) for total in self.totals()]}
+
+    def to_trace(self) -> dict:
+        """Chrome trace-event JSON (``chrome://tracing``, Perfetto, Speedscope)."""
+
+        pid = os.getpid()
+        events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.name}}
+        ]
+        for record in sorted(self.spans, key=lambda item: item.start):
+            events.append(
+                {
+                    "name": record.name,
+                    "cat": record.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": record.start * 1e6,
+                    "dur": record.wall * 1e6,
+                    "pid": pid,
+                    "tid": record.thread,
+                    "args": {
+                        "cpu_ms": record.cpu * 1000,
+                        "bytes": record.bytes,
+                        "peak_rss_bytes": record.peak_rss,
+                        **record.args,
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.to_trace(), handle)
+
+
+def current_profiler() -> Profiler | None:
+    return _current.get()
+
+
+def span(name: str, nbytes: int = 0, **args):
+    """Time a stage on the active profiler; a shared no-op otherwise."""
+
+    profiler = _current.get()
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name, nbytes, **args)
+
+
+def profile_iter(
+    name: str, items: Iterable[T], nbytes: Callable[[T], int] | None = None
+) -> Iterable[T]:
+    """:meth:`Profiler.iterate` on the active profiler; ``items`` unchanged otherwise."""
+
+    profiler = _current.get()
+    if profiler is None:
+        return items
+    return profiler.iterate(name, items, nbytes)
+
+
+__all__ = [
+    "Profiler",
+    "Span",
+    "StageTotal",
+    "current_profiler",
+    "peak_rss",
+    "profile_iter",
+    "span",
+]
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .payload import BitCollector, FramedPayload, bit_window
+from .permutation import KeyedPermutation, resolve_order
+from .samples import SampleBuffer
+
+DEFAULT_CHUNK = 1 << 21
+
+# Wu–Tsai quantisation ranges for |p1 - p0|: lower bound and bits carried.
+RANGE_LOWER = np.array([0, 8, 16, 32, 64, 128], dtype=np.int16)
+RANGE_BITS = np.array([3, 3, 4, 5, 6, 7], dtype=np.int16)
+RANGE_UPPER = RANGE_LOWER + (1 << RANGE_BITS) - 1
+MAX_BITS = int(RANGE_BITS.max())
+
+
+def pair_count(samples: SampleBuffer) -> int:
+    """Number of horizontally adjacent same-channel pairs in ``samples``."""
+
+    return samples.rows * (samples.width // 2) * samples.channels
+
+
+def pair_positions(samples: SampleBuffer, pairs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Map pair indices to the flat positions of their left and right samples."""
+
+    per_row = (samples.width // 2) * samples.channels
+    row, rest = np.divmod(pairs, per_row)
+    column, channel = np.divmod(rest, samples.channels)
+    left = row * samples.row_size + (2 * column) * samples.channels + channel
+    return left, left + samples.channels
+
+
+def _decompose(p0: np.ndarray, p1: np.ndarray) -> tuple[np.ndarray, ...]:
+    """Integer mean/difference transform of a pair plus its range metadata.
+
+    The mean ``z`` is left untouched by embedding, so the falling-off check
+    below gives the same answer on the cover and on the stego pair.
+    """
+
+    d = p1.astype(np.int16) - p0.astype(np.int16)
+    z = p0.astype(np.int16) + np.floor_divide(d, 2)
+    level = np.searchsorted(RANGE_LOWER, np.abs(d), side="right") - 1
+    upper = RANGE_UPPER[level]
+    usable = (z - upper // 2 >= 0) & (z + (upper + 1) // 2 <= 255)
+    bits = np.where(usable, RANGE_BITS[level], 0)
+    return d, z, level, bits
+
+
+class PvdEmbedder:
+    """Writes a framed payload with PVD across successive sample buffers.
+
+    Pairs never straddle rows, so a cover may be handed over in row bands.
+    An ``order`` visits the pairs of each buffer in keyed-permutation order.
+    """
+
+    def __init__(
+        self,
+        payload: bytes,
+        *,
+        order: KeyedPermutation | None = None,
+        chunk_size: int = DEFAULT_CHUNK,
+    ) -> None:
+        self.data = FramedPayload(payload)
+        self.total_bits = len(self.data) * 8
+        self.offset = 0
+        self.changed = 0
+        self.chunk_size = chunk_size
+        self.order = order
+
+    @property
+    def done(self) -> bool:
+        return self.offset >= self.total_bits
+
+    def embed(self, samples: SampleBuffer) -> None:
+        total_pairs = pair_count(samples)
+        for start in range(0, total_pairs, self.chunk_size):
+            if self.done:
+                break
+            pairs = _pair_order(self.order, start, min(start + self.chunk_size, total_pairs))
+            self._embed_pairs(samples, pairs)
+            samples.release()
+
+    def _embed_pairs(self, samples: SampleBuffer, pairs: np.ndarray) -> None:
+        left, right = pair_positions(samples, pairs)
+        p0 = samples.gather(left)
+        p1 = samples.gather(right)
+        d, z, level, bits = _decompose(p0, p1)
+
+        starts = self.offset + np.cumsum(bits) - bits
+        active = (bits > 0) & (starts < self.total_bits)
+        self.offset += int(bits.sum())
+        if not active.any():
+            return
+        base = int(starts[0])
+        window = bit_window(self.data, base, int(starts[active][-1]) + MAX_BITS)
+        rel = (starts - base).astype(np.int64)
+
+        value = np.zeros(pairs.size, dtype=np.int16)
+        for j in range(MAX_BITS):
+            take = active & (j < bits)
+            bit = np.zeros(pairs.size, dtype=np.int16)
+            bit[take] = window[rel[take] + j]
+            value = np.where(take, (value << 1) | bit, value)
+
+        magnitude = RANGE_LOWER[level] + value
+        new_d = np.where(d >= 0, magnitude, -magnitude)
+        q0 = z - np.floor_divide(new_d, 2)
+        q1 = q0 + new_d
+
+        index = np.flatnonzero(active & (new_d != d))
+        samples.scatter(left[index], q0[index].astype(p0.dtype), p0[index])
+        samples.scatter(right[index], q1[index].astype(p1.dtype), p1[index])
+        self.changed += int(np.count_nonzero(q0[index] != p0[index]))
+        self.changed += int(np.count_nonzero(q1[index] != p1[index]))
+
+
+def _pair_order(order: KeyedPermutation | None, start: int, stop: int) -> np.ndarray:
+    if order is None:
+        return np.arange(start, stop, dtype=np.int64)
+    return order.range(start, stop)
+
+
+def embed_pvd(
+    samples: SampleBuffer,
+    payload: bytes,
+    *,
+    key: bytes | str | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> int:
+    """Embed ``payload`` with pixel-value differencing; returns samples changed.
+
+    A ``key`` scatters the payload over the pairs with :class:`KeyedPermutation`.
+    """
+
+    order = resolve_order(pair_count(samples), key)
+    embedder = PvdEmbedder(payload, order=order, chunk_size=chunk_size)
+    embedder.embed(samples)
+    if not embedder.done:
+        raise ValueError("payload exceeds the PVD capacity of this cover")
+    return embedder.changed
+
+
+def feed_pvd(
+    samples: SampleBuffer,
+    collector: BitCollector,
+    *,
+    order: KeyedPermutation | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> None:
+    """Feed PVD-decoded bits from ``samples`` into ``collector``."""
+
+    total_pairs = pair_count(samples)
+    shifts = np.arange(MAX_BITS - 1, -1, -1, dtype=np.int16)
+
+    position = 0
+    while not collector.complete and position < total_pairs:
+        wanted = min(chunk_size, collector.bits_needed // 3 + 1)
+        stop = min(position + wanted, total_pairs)
+        pairs = _pair_order(order, position, stop)
+        position = stop
+        left, right = pair_positions(samples, pairs)
+        d, _z, level, bits = _decompose(samples.gather(left), samples.gather(right))
+        value = np.abs(d) - RANGE_LOWER[level]
+        # Right-align each value in a MAX_BITS-wide field and keep the low ``bits``.
+        table = ((value[:, None] >> shifts[None, :]) & 1).astype(np.uint8)
+        keep = np.arange(MAX_BITS)[None, :] >= (MAX_BITS - bits)[:, None]
+        collector.feed(table[keep])
+
+
+def extract_pvd(
+    samples: SampleBuffer,
+    *,
+    key: bytes | str | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> bytes:
+    """Recover a payload written by :func:`embed_pvd`."""
+
+    collector = BitCollector()
+    order = resolve_order(pair_count(samples), key)
+    feed_pvd(samples, collector, order=order, chunk_size=chunk_size)
+    return collector.payload()
+
+
+__all__ = [
+    "PvdEmbedder",
+    "embed_pvd",
+    "extract_pvd",
+    "feed_pvd",
+    "pair_count",
+    "pair_positions",
+]
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable
+
+MEDIA_TYPES = ("image", "audio", "video")
+# Capability flags a method can declare.
+EMBED = "embed"  # listed in EmbedTab
+EXTRACT = "extract"  # listed in ExtractTab
+AUTO = "auto"  # the extraction card runs auto-detection instead of this method alone
+COST_CACHE = "cost_cache"  # cost maps are worth caching between embeds of one cover
+
+
+class EngineRef:
+    """``"module:attribute"`` imported on first use, so listing engines stays cheap."""
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self._resolved: Callable[..., Any] | None = None
+
+    def resolve(self) -> Callable[..., Any]:
+        if self._resolved is None:
+            module, _, name = self.target.partition(":")
+            self._resolved = getattr(importlib.import_module(module, __package__), name)
+        return self._resolved
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"EngineRef({self.target!r})"
+
+
+@dataclass(frozen=True)
+class FormatEngine:
+    """Embed/extract entry points for the cover formats in ``suffixes``.
+
+    ``methods`` are the method keys the engine implements, in the order
+    auto-detection tries them.
+    """
+
+    suffixes: tuple[str, ...]
+    embed: EngineRef
+    extract: EngineRef
+    methods: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class MethodSpec:
+    """One method card: what it is, where it runs and roughly what it costs.
+
+    ``capacity`` takes a cover path and returns payload bytes; without one,
+    :func:`~.embedding.probe_capacity` works it out from the sample shape.
+    ``speed`` (``fast``/``moderate``/``slow``) and ``memory`` (how the engine
+    holds the cover) are hints for the UI and planners, not measurements.
+    """
+
+    key: str
+    media: str
+    title: str
+    description: str
+    capabilities: frozenset[str] = frozenset({EMBED, EXTRACT})
+    capacity: EngineRef | None = None
+    speed: str = "fast"
+    memory: str = "in_memory"
+    extract_title: str | None = None
+    extract_description: str | None = None
+
+    @property
+    def suffixes(self) -> tuple[str, ...]:
+        """Cover formats with an engine for this method (empty: card only)."""
+
+        return tuple(
+            suffix for engine in _FORMATS for suffix in engine.suffixes if self.key in engine.methods
+        )
+
+    @property
+    def available(self) -> bool:
+        return bool(self.suffixes)
+
+    def card(self, operation: str = EMBED) -> dict[str, str]:
+        """``{"title", "desc"}`` for EmbedTab/ExtractTab method cards."""
+
+        if operation == EXTRACT:
+            return {
+                "title": self.extract_title or self.title,
+                "desc": self.extract_description or self.description,
+            }
+        return {"title": self.title, "desc": self.description}
+
+
+_METHODS: dict[str, MethodSpec] = {}
+_FORMATS: list[FormatEngine] = []
+
+
+def register_method(spec: MethodSpec) -> MethodSpec:
+    """Add (or replace) a method; plugins call this before the tabs are built."""
+
+    if spec.media not in MEDIA_TYPES:
+        raise ValueError(f"unknown media type {spec.media!r}")
+    _METHODS[spec.key] = spec
+    return spec
+
+
+def register_format(engine: FormatEngine) -> FormatEngine:
+    """Route ``engine.suffixes`` to ``engine``; later registrations win."""
+
+    _FORMATS[:] = [
+        existing
+        for existing in _FORMATS
+        if not set(existing.suffixes) <= set(engine.suffixes)
+    ]
+    _FORMATS.append(engine)
+    return engine
+
+
+def get_method(key: str) -> MethodSpec:
+    try:
+        return _METHODS[key]
+    except KeyError:
+        raise ValueError(f"unknown method {key!r}") from None
+
+
+def methods(media: str | None = None, capability: str | None = None) -> list[MethodSpec]:
+    """Registered methods in registration order, optionally filtered."""
+
+    return [
+        spec
+        for spec in _METHODS.values()
+        if (media is None or spec.media == media)
+        and (capability is None or capability in spec.capabilities)
+    ]
+
+
+def format_engine(suffix: str) -> FormatEngine | None:
+    """The engine for a lower-case ``suffix`` such as ``".png"``."""
+
+    for engine in reversed(_FORMATS):
+        if suffix in engine.suffixes:
+            return engine
+    return None
+
+
+def format_suffixes() -> tuple[str, ...]:
+    return tuple(suffix for engine in _FORMATS for suffix in engine.suffixes)
+
+
+def method_cards(operation: str = EMBED) -> dict[str, dict[str, dict[str, str]]]:
+    """``{media: {key: card}}`` for every method listed under ``operation``."""
+
+    return {
+        media: {spec.key: spec.card(operation) for spec in methods(media, operation)}
+        for media in MEDIA_TYPES
+    }
+
+
+# ----------------------------------------------------------------------
+# Built-in engines.  Modules are named, not imported: they load on first call.
+_IMAGE_METHODS = ("content_adaptive", "lsb", "pvd")
+
+register_format(FormatEngine((".bmp",), EngineRef(".bmp:embed_bmp"), EngineRef(".bmp:extract_bmp"), _IMAGE_METHODS))
+register_format(
+    FormatEngine((".png",), EngineRef(".png_stream:embed_png"), EngineRef(".png_stream:extract_png"), _IMAGE_METHODS)
+)
+register_format(FormatEngine((".avi",), EngineRef(".avi:embed_avi"), EngineRef(".avi:extract_avi"), ("video_adaptive",)))
+register_format(
+    FormatEngine(
+        (".mp3", ".flac"), EngineRef(".tags:embed_tags"), EngineRef(".tags:extract_tags"), ("audio_metadata",)
+    )
+)
+register_format(
+    FormatEngine(
+        (".mp4", ".m4v", ".mov", ".mkv", ".webm"),
+        EngineRef(".containers:embed_container"),
+        EngineRef(".containers:extract_container"),
+        ("video_metadata",),
+    )
+)
+
+register_method(
+    MethodSpec(
+        "adaptive",
+        "image",
+        "✨ ตรวจจับอัตโนมัติ (แนะนำ)",
+        "ลองถอดข้อมูลด้วยหลายเทคนิคเช่น LSB, PVD, DCT และ Tail Append",
+        capabilities=frozenset({EXTRACT, AUTO}),
+    )
+)
+register_method(
+    MethodSpec(
+        "content_adaptive",
+        "image",
+        "✨ Content-Adaptive (แนะนำ)",
+        "วิเคราะห์ขอบและพื้นผิวเพื่อเลือกพื้นที่ฝังที่แนบเนียน",
+        capabilities=frozenset({EMBED, COST_CACHE}),
+        speed="slow",
+        memory="tiled",
+    )
+)
+register_method(
+    MethodSpec(
+        "lsb",
+        "image",
+        "🔹 LSB Matching",
+        "ปรับ LSB เพื่อลดความผิดปกติทางสถิติ (เหมาะกับ PNG/BMP)",
+        memory="streaming",
+        extract_description="ดึงข้อมูลจากการฝังแบบ LSB (เหมาะกับ PNG/BMP)",
+    )
+)
+register_method(
+    MethodSpec(
+        "pvd",
+        "image",
+        "🔸 Pixel Value Differencing",
+        "กำหนดจำนวนบิตจากความต่างพิกเซล เพิ่มปริมาณข้อมูล",
+        memory="streaming",
+        extract_description="ใช้ความต่างของพิกเซลเพื่อตีความบิตที่ซ่อนอยู่",
+    )
+)
+register_method(
+    MethodSpec(
+        "dct",
+        "image",
+        "📊 Discrete Cosine Transform",
+        "ฝังข้อมูลในสัมประสิทธิ์ DCT สำหรับ JPEG ทนการบีบอัดซ้ำ",
+        extract_description="กู้ข้อมูลที่ฝังในสัมประสิทธิ์ DCT ของไฟล์ JPEG",
+    )
+)
+register_method(
+    MethodSpec(
+        "append",
+        "image",
+        "📎 ต่อท้ายไฟล์ (Tail Append)",
+        "พ่วง payload ต่อท้ายไฟล์ต้นฉบับ (เหมาะกับ PNG/BMP)",
+        extract_title="📎 Tail Append",
+        extract_description="ตรวจสอบข้อมูลที่อาจถูกต่อท้ายไฟล์",
+    )
+)
+register_method(
+    MethodSpec(
+        "audio_adaptive",
+        "audio",
+        "✨ Adaptive Audio",
+        "วิเคราะห์ไดนามิกเสียง เลือกตำแหน่งฝังที่แนบเนียน",
+        capabilities=frozenset({EMBED, EXTRACT, AUTO}),
+        extract_title="✨ ตรวจจับอัตโนมัติ",
+        extract_description="ทดลอง LSB และเทคนิคเฉพาะเสียงของ STEGOSIGHT",
+    )
+)
+register_method(
+    MethodSpec(
+        "audio_lsb",
+        "audio",
+        "🎧 LSB ในสัญญาณเสียง",
+        "ซ่อนข้อมูลด้วย LSB สำหรับ WAV/MP3/FLAC",
+        extract_description="ถอดข้อมูลที่ซ่อนในบิตต่ำสุดของสัญญาณ PCM",
+    )
+)
+register_method(
+    MethodSpec(
+        "audio_metadata",
+        "audio",
+        "🏷️ Metadata Tagging",
+        "ฝังข้อมูลใน Meta Tag (ID3/Tag สำหรับ MP3/FLAC)",
+        capacity=EngineRef(".tags:tag_capacity"),
+        memory="in_place",
+        extract_description="อ่านข้อมูลจาก ID3 PRIV หรือบล็อก APPLICATION ของ FLAC",
+    )
+)
+register_method(
+    MethodSpec(
+        "video_adaptive",
+        "video",
+        "✨ Adaptive Video",
+        "ประเมินเฟรมวิดีโอและเลือกพื้นที่ที่ยากต่อการสังเกต",
+        capabilities=frozenset({EMBED, EXTRACT, AUTO, COST_CACHE}),
+        capacity=EngineRef(".avi:probe_avi_capacity"),
+        speed="moderate",
+        memory="memory_mapped",
+        extract_title="✨ ตรวจจับอัตโนมัติ",
+        extract_description="ลองกู้ข้อมูลจากเฟรมวิดีโอโดยอัตโนมัติ",
+    )
+)
+register_method(
+    MethodSpec(
+        "video_lsb",
+        "video",
+        "🎞️ Frame LSB",
+        "ซ่อนข้อมูลทีละเฟรมด้วย LSB (รองรับ MP4/AVI/MKV/MOV)",
+        extract_description="ดึงข้อมูลจากบิตต่ำสุดของแต่ละพิกเซลในเฟรม",
+    )
+)
+register_method(
+    MethodSpec(
+        "video_metadata",
+        "video",
+        "🏷️ Metadata Tagging",
+        "ฝังข้อมูลในเมทาดาทาของไฟล์วิดีโอ (MP4/MKV/MOV)",
+        capacity=EngineRef(".containers:container_capacity"),
+        memory="in_place",
+        extract_description="อ่านข้อมูลจากกล่อง free ของ MP4 หรือ Tags ของ MKV",
+    )
+)
+
+
+__all__ = [
+    "AUTO",
+    "COST_CACHE",
+    "EMBED",
+    "EXTRACT",
+    "MEDIA_TYPES",
+    "EngineRef",
+    "FormatEngine",
+    "MethodSpec",
+    "format_engine",
+    "format_suffixes",
+    "get_method",
+    "method_cards",
+    "methods",
+    "register_format",
+    "register_method",
+]
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from .samples import SampleBuffer
+
+DEFAULT_BLOCK = 8
+COVER_SAMPLE_LIMIT = 1 << 22
+LEVELS = 256
+
+# Thresholds for the Thai labels used across the UI.
+RISK_LEVELS = ((35, "ต่ำ"), (65, "กลาง"), (101, "สูง"))
+
+Observer = Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], None]
+
+
+@dataclass(frozen=True)
+class RiskReport:
+    """Detectability estimate for one embedding run."""
+
+    score: int
+    level: str
+    change_rate: float
+    pov_p_value: float
+    histogram_shift: float
+    block_concentration: float
+
+    def summary(self) -> str:
+        return (
+            f"Risk Score: {self.score} ({self.level}) · "
+            f"แก้ไข {self.change_rate:.2%} ของตัวอย่าง · "
+            f"Chi-Square p={self.pov_p_value:.2f}"
+        )
+
+
+def chi_square_pvalue(statistic: float, dof: int) -> float:
+    """Upper-tail chi-square probability (Wilson–Hilferty approximation)."""
+
+    if dof <= 0:
+        return 0.0
+    if statistic <= 0:
+        return 1.0
+    scale = 2.0 / (9.0 * dof)
+    z = ((statistic / dof) ** (1.0 / 3.0) - (1.0 - scale)) / math.sqrt(scale)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+def pov_pvalue(histogram: np.ndarray, min_count: float = 5.0) -> float:
+    """Westfeld–Pfitzmann pair-of-values test on a value histogram.
+
+    Values close to 1 mean the ``2k``/``2k+1`` bins have been equalised,
+    the signature of LSB replacement.
+    """
+
+    values = np.asarray(histogram, dtype=np.float64)
+    pairs = values[: values.size // 2 * 2].reshape(-1, 2)
+    expected = pairs.sum(axis=1) / 2.0
+    used = expected > min_count
+    if np.count_nonzero(used) < 2:
+        return 0.0
+    statistic = float((((pairs[used, 0] - expected[used]) ** 2) / expected[used]).sum())
+    return chi_square_pvalue(statistic, int(np.count_nonzero(used)) - 1)
+
+
+class RiskTracker:
+    """Accumulates detectability statistics while an engine embeds.
+
+    The cover histogram is observed from the data the engine reads anyway
+    (or a strided sample of it); every write afterwards only updates a
+    histogram delta and per-block change counts from the changed positions,
+    so the score is ready when embedding ends without rescanning the stego
+    output.
+    """
+
+    def __init__(self, block: int = DEFAULT_BLOCK) -> None:
+        self.block = block
+        self.total = 0
+        self.changed = 0
+        self.channels = 1
+        self.histogram = np.zeros(LEVELS, dtype=np.float64)
+        self.delta = np.zeros(LEVELS, dtype=np.int64)
+        self.block_changes = np.zeros((0, 0), dtype=np.int64)
+
+    def begin(self, rows: int, width: int, channels: int) -> None:
+        """Size the block grid for a ``rows x width x channels`` cover."""
+
+        self.total = rows * width * channels
+        self.channels = channels
+        self.block_changes = np.zeros(
+            (-(-rows // self.block), -(-width // self.block)), dtype=np.int64
+        )
+
+    def observe_cover(self, values: np.ndarray, weight: float = 1.0) -> None:
+        """Add cover ``values`` to the histogram, each counting ``weight`` samples."""
+
+        values = np.asarray(values)
+        # bincount widens to intp; count in slices of the leading axis so a
+        # memory-mapped cover is never copied or widened in full.
+        step = max(COVER_SAMPLE_LIMIT // max(values[:1].size, 1), 1)
+        for start in range(0, len(values), step):
+            chunk = values[start : start + step].astype(np.uint8, copy=False).reshape(-1)
+            self.histogram += np.bincount(chunk, minlength=LEVELS) * weight
+
+    def sample_cover(self, samples: SampleBuffer, limit: int = COVER_SAMPLE_LIMIT) -> None:
+        """Estimate the cover histogram from evenly strided rows of ``samples``."""
+
+        wanted = max(limit // max(samples.row_size, 1), 1)
+        rows = samples.array[:: max(-(-samples.rows // wanted), 1)]
+        self.observe_cover(rows, samples.rows / rows.shape[0])
+
+    def observer(self, row_offset: int = 0) -> Observer:
+        """Callback for :attr:`SampleBuffer.observer`; rows are shifted by ``row_offset``."""
+
+        def record(row: np.ndarray, column: np.ndarray, before: np.ndarray, after: np.ndarray) -> None:
+            self.record(row + row_offset, column, before, after)
+
+        return record
+
+    def record(self, row: np.ndarray, column: np.ndarray, before: np.ndarray, after: np.ndarray) -> None:
+        """Fold one batch of writes into the running statistics."""
+
+        moved = before != after
+        if not moved.any():
+            return
+        before = before[moved].astype(np.intp)
+        after = np.asarray(after)[moved].astype(np.intp)
+        self.changed += before.size
+        self.delta -= np.bincount(before, minlength=LEVELS)[:LEVELS]
+        self.delta += np.bincount(after, minlength=LEVELS)[:LEVELS]
+        if self.block_changes.size:
+            np.add.at(
+                self.block_changes,
+                (row[moved] // self.block, column[moved] // self.block),
+                1,
+            )
+
+    def report(self) -> RiskReport:
+        """Combine the running statistics into a 0–100 score."""
+
+        total = max(self.total, 1)
+        change_rate = self.changed / total
+        stego = np.maximum(self.histogram + self.delta, 0.0)
+        p_cover = pov_pvalue(self.histogram)
+        p_stego = pov_pvalue(stego)
+        pov = max(0.0, (p_stego - p_cover) / max(1.0 - p_cover, 1e-9))
+        histogram_shift = 0.5 * float(np.abs(self.delta).sum()) / total
+
+        touched = self.block_changes[self.block_changes > 0]
+        if touched.size:
+            per_block = self.block * self.block * self.channels
+            concentration = float(touched.mean()) / per_block
+        else:
+            concentration = 0.0
+
+        raw = (
+            0.35 * (1.0 - math.exp(-10.0 * change_rate))
+            + 0.25 * min(1.0, 4.0 * concentration)
+            + 0.25 * pov
+            + 0.15 * min(1.0, 50.0 * histogram_shift)
+        )
+        score = int(round(100 * min(raw, 1.0)))
+        level = next(label for limit, label in RISK_LEVELS if score < limit)
+        return RiskReport(score, level, change_rate, p_stego, histogram_shift, concentration)
+
+
+__all__ = [
+    "RiskReport",
+    "RiskTracker",
+    "chi_square_pvalue",
+    "pov_pvalue",
+]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+
+
+class SampleBuffer:
+    """Flat, index-addressable view over the embeddable samples of a cover.
+
+    ``array`` is a ``(rows, width, channels)`` view that may be strided,
+    reversed or backed by a memory map; sample ``i`` is the ``i``-th value in
+    row-major order.  Engines only ever gather/scatter the positions they
+    touch, so the underlying buffer is never copied as a whole.
+
+    An ``observer`` is called as ``observer(row, column, before, after)`` for
+    every scatter, which lets statistics follow the writes incrementally.
+    """
+
+    def __init__(
+        self,
+        array: np.ndarray,
+        release: Callable[[], None] | None = None,
+        observer: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], None] | None = None,
+    ) -> None:
+        if array.ndim == 2:
+            array = array[:, :, np.newaxis]
+        if array.ndim != 3:
+            raise ValueError("sample array must be (rows, width[, channels])")
+        self.array = array
+        self.rows, self.width, self.channels = array.shape
+        self.row_size = self.width * self.channels
+        self.size = self.rows * self.row_size
+        self._release = release
+        self.observer = observer
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _unravel(self, index: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        row, rest = np.divmod(index, self.row_size)
+        column, channel = np.divmod(rest, self.channels)
+        return row, column, channel
+
+    def gather(self, index: np.ndarray) -> np.ndarray:
+        """Return the samples at the flat positions in ``index``."""
+
+        return self.array[self._unravel(np.asarray(index, dtype=np.int64))]
+
+    def scatter(
+        self,
+        index: np.ndarray,
+        values: np.ndarray,
+        before: np.ndarray | None = None,
+    ) -> None:
+        """Write ``values`` to the flat positions in ``index`` in place.
+
+        ``before`` are the current values at ``index`` if the caller already
+        has them; they are only needed when an observer is attached.
+        """
+
+        if len(index) == 0:
+            return
+        coords = self._unravel(np.asarray(index, dtype=np.int64))
+        if self.observer is not None:
+            if before is None:
+                before = self.array[coords]
+            self.observer(coords[0], coords[1], before, values)
+        self.array[coords] = values
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        return self.gather(np.arange(start, min(stop, self.size), dtype=np.int64))
+
+    def release(self) -> None:
+        """Hint that touched pages may be written back and dropped."""
+
+        if self._release is not None:
+            self._release()
+
+
+__all__ = ["SampleBuffer"]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+
+DEFAULT_SCALE = 8
+DEFAULT_BATCH = 32
+# Motion masks changes less reliably than texture (it is zero on static
+# shots), so it only tips the balance between similarly textured frames.
+MOTION_WEIGHT = 0.5
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _luma(batch: np.ndarray) -> np.ndarray:
+    """``(frames, rows, cols, channels)`` uint8 to float32 luma (grey is kept)."""
+
+    if batch.shape[-1] < 3:
+        return batch[..., 0].astype(np.float32)
+    return batch[..., :3].astype(np.float32) @ LUMA
+
+
+def frame_scores(
+    previews: Iterable[np.ndarray], batch: int = DEFAULT_BATCH
+) -> tuple[np.ndarray, np.ndarray]:
+    """Texture and motion per frame from small ``(rows, cols, channels)`` previews.
+
+    Previews are stacked ``batch`` at a time and scored with whole-batch
+    array operations: texture is the mean absolute horizontal plus vertical
+    gradient of the luma, motion the mean absolute difference from the
+    previous frame (zero for the first).
+    """
+
+    texture: list[np.ndarray] = []
+    motion: list[np.ndarray] = []
+    previous: np.ndarray | None = None
+    pending: list[np.ndarray] = []
+
+    def flush() -> None:
+        nonlocal previous
+        grey = _luma(np.stack(pending))
+        pending.clear()
+        texture.append(
+            np.abs(np.diff(grey, axis=1)).mean(axis=(1, 2)) + np.abs(np.diff(grey, axis=2)).mean(axis=(1, 2))
+        )
+        before = np.concatenate([grey[:1] if previous is None else previous[None], grey[:-1]])
+        motion.append(np.abs(grey - before).mean(axis=(1, 2)))
+        previous = grey[-1]
+
+    for preview in previews:
+        pending.append(preview)
+        if len(pending) == batch:
+            flush()
+    if pending:
+        flush()
+    if not texture:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    return np.concatenate(texture), np.concatenate(motion)
+
+
+def _normalise(values: np.ndarray) -> np.ndarray:
+    top = float(values.max()) if values.size else 0.0
+    return values / top if top > 0 else np.zeros_like(values)
+
+
+def select_frames(
+    texture: np.ndarray,
+    motion: np.ndarray,
+    count: int,
+    *,
+    exclude: Iterable[int] = (),
+) -> np.ndarray:
+    """Indices (ascending) of the ``count`` frames where changes hide best."""
+
+    score = _normalise(texture) + MOTION_WEIGHT * _normalise(motion)
+    score = score.astype(np.float64)
+    score[list(exclude)] = -np.inf
+    # Stable sort on the negated score keeps ties in frame order.
+    ranked = np.argsort(-score, kind="stable")
+    ranked = ranked[np.isfinite(score[ranked])]
+    return np.sort(ranked[:count])
+
+
+__all__ = ["DEFAULT_BATCH", "DEFAULT_SCALE", "frame_scores", "select_frames"]
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+from .batch import BatchJob, BatchResult, embed_payload, output_path_for, run_parallel, worker_budget
+from .embedding import extract_file, probe_capacity
+from .header import PayloadError
+from .ingest import IngestedSecret, read_chunks
+from .keys import SALT_SIZE, SEAL_OVERHEAD, KeyCache, is_sealed, unseal
+
+SHARD_MAGIC = b"STSH"
+# magic, set id, shard index, shard count, full payload length, payload digest
+SHARD_HEADER = struct.Struct(">4s16sIIQ16s")
+SHARD_HEADER_SIZE = SHARD_HEADER.size
+
+
+@dataclass(frozen=True)
+class ShardHeader:
+    set_id: bytes
+    index: int
+    total: int
+    length: int
+    digest: bytes
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def is_shard(data: bytes) -> bool:
+    return len(data) >= SHARD_HEADER_SIZE and data[:4] == SHARD_MAGIC
+
+
+def parse_shard(data: bytes) -> tuple[ShardHeader, bytes]:
+    """Split an extracted shard into its header and body."""
+
+    if not is_shard(data):
+        raise PayloadError("payload is not a STEGOSIGHT shard")
+    _magic, set_id, index, total, length, digest = SHARD_HEADER.unpack_from(data)
+    if not 0 <= index < total:
+        raise PayloadError("shard index is out of range")
+    return ShardHeader(set_id, index, total, length, digest), data[SHARD_HEADER_SIZE:]
+
+
+def shard_sizes(length: int, capacities: list[int]) -> list[int]:
+    """Body size of each shard when ``length`` bytes are spread over ``capacities``.
+
+    Shares are proportional to capacity so every cover is filled at the same
+    rate.  Every cover must have room for a shard header plus at least one
+    byte; smaller ones are rejected since the set needs all of its shards.
+    """
+
+    too_small = [index + 1 for index, capacity in enumerate(capacities) if capacity <= SHARD_HEADER_SIZE]
+    if too_small:
+        raise ValueError(f"covers {', '.join(map(str, too_small))} are too small to carry a shard")
+    usable = [capacity - SHARD_HEADER_SIZE for capacity in capacities]
+    room = sum(usable)
+    if not capacities or room < length:
+        raise ValueError("payload exceeds the combined capacity of the selected covers")
+
+    sizes = [length * share // room for share in usable]
+    remainder = length - sum(sizes)
+    for index, share in enumerate(usable):
+        if remainder == 0:
+            break
+        if sizes[index] < share:
+            sizes[index] += 1
+            remainder -= 1
+    return sizes
+
+
+def split_payload(payload: bytes, capacities: list[int]) -> list[bytes]:
+    """Split ``payload`` into one framed shard per cover capacity (see :func:`shard_sizes`)."""
+
+    sizes = shard_sizes(len(payload), capacities)
+    set_id = os.urandom(16)
+    digest = _digest(payload)
+    shards = []
+    offset = 0
+    for index, size in enumerate(sizes):
+        header = SHARD_HEADER.pack(SHARD_MAGIC, set_id, index, len(sizes), len(payload), digest)
+        shards.append(header + payload[offset : offset + size])
+        offset += size
+    return shards
+
+
+def embed_spooled_shard(
+    job: BatchJob, header: bytes, path: str, offset: int, size: int, memory_budget: int | None = None
+) -> BatchResult:
+    """Read one shard's slice of a spooled payload and embed it behind ``header``."""
+
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        body = handle.read(size)
+    return embed_payload(job, header + body, memory_budget)
+
+
+def embed_shards(
+    covers: list[str],
+    payload: bytes | IngestedSecret,
+    output_dir: str,
+    method: str,
+    *,
+    key: str | None = None,
+    max_workers: int | None = None,
+) -> Iterator[BatchResult]:
+    """Spread ``payload`` over ``covers`` and embed the shards in parallel.
+
+    Capacity is checked before returning; the embeds run as the returned
+    iterator is consumed, yielding results in completion order.  With a
+    ``key`` every shard is sealed under one salt, so reassembly derives the
+    key once.  A spooled :class:`~.ingest.IngestedSecret` is never loaded
+    whole: each worker reads its own slice of the spool file.
+    """
+
+    overhead = SEAL_OVERHEAD if key else 0
+    spooled = isinstance(payload, IngestedSecret)
+    length = payload.size if spooled else len(payload)
+    capacities = [probe_capacity(cover, method) - overhead for cover in covers]
+    too_small = [
+        os.path.basename(cover)
+        for cover, capacity in zip(covers, capacities)
+        if capacity <= SHARD_HEADER_SIZE
+    ]
+    if too_small:
+        raise ValueError(f"covers too small to carry a shard: {', '.join(too_small)}")
+    sizes = shard_sizes(length, capacities)
+    set_id = os.urandom(16)
+    if spooled:
+        hasher = hashlib.blake2b(digest_size=16)
+        for chunk in read_chunks(payload.path):
+            hasher.update(chunk)
+        digest = hasher.digest()
+    else:
+        digest = _digest(payload)
+    salt = os.urandom(SALT_SIZE) if key else None
+    os.makedirs(output_dir, exist_ok=True)
+    budget = worker_budget(len(covers), max_workers)
+    tasks = []
+    offset = 0
+    for index, (cover, size) in enumerate(zip(covers, sizes)):
+        header = SHARD_HEADER.pack(SHARD_MAGIC, set_id, index, len(sizes), length, digest)
+        label = f"shard {index + 1}/{len(sizes)}"
+        job = BatchJob(cover, label, output_path_for(cover, output_dir), method, key, salt)
+        if spooled:
+            tasks.append((job, header, payload.path, offset, size, budget))
+        else:
+            tasks.append((job, header + payload[offset : offset + size], budget))
+        offset += size
+    return run_parallel(embed_spooled_shard if spooled else embed_payload, tasks, max_workers)
+
+
+def extract_shard(
+    path: str, method: str, key: str | None = None, memory_budget: int | None = None
+) -> bytes:
+    """One shard's payload, still sealed: pool workers do not share a key cache."""
+
+    options = {"key": key} if key else {}
+    return extract_file(path, method, memory_budget=memory_budget, keep_sealed=True, **options)
+
+
+def reassemble_shards(
+    paths: list[str],
+    method: str,
+    sink: BinaryIO,
+    *,
+    key: str | None = None,
+    key_cache: KeyCache | None = None,
+    max_workers: int | None = None,
+) -> int:
+    """Extract shards from ``paths`` in parallel and stream them to ``sink``.
+
+    Shards are written as soon as every earlier one has arrived, so only
+    out-of-order shards are held in memory.  Sealed shards are opened here
+    with ``key``, through ``key_cache`` when given.  The set id, count,
+    length and digest are checked; returns the number of bytes written.
+    """
+
+    first: ShardHeader | None = None
+    waiting: dict[int, bytes] = {}
+    seen: set[int] = set()
+    hasher = hashlib.blake2b(digest_size=16)
+    written = 0
+    next_index = 0
+
+    budget = worker_budget(len(paths), max_workers)
+    tasks = [(path, method, key, budget) for path in paths]
+    for data in run_parallel(extract_shard, tasks, max_workers):
+        if is_sealed(data):
+            data = unseal(data, key, cache=key_cache)
+        header, body = parse_shard(data)
+        if first is None:
+            first = header
+            if header.total != len(paths):
+                raise PayloadError(f"shard set has {header.total} parts but {len(paths)} files were given")
+        elif (header.set_id, header.total) != (first.set_id, first.total):
+            raise PayloadError("files belong to different shard sets")
+        if header.index in seen:
+            raise PayloadError(f"shard {header.index + 1} was given twice")
+        seen.add(header.index)
+        waiting[header.index] = body
+        while next_index in waiting:
+            chunk = waiting.pop(next_index)
+            sink.write(chunk)
+            hasher.update(chunk)
+            written += len(chunk)
+            next_index += 1
+
+    if first is None or next_index != first.total:
+        raise PayloadError("shard set is incomplete")
+    if written != first.length or hasher.digest() != first.digest:
+        raise PayloadError("reassembled payload failed its integrity check")
+    return written
+
+
+__all__ = [
+    "SHARD_HEADER_SIZE",
+    "ShardHeader",
+    "embed_shards",
+    "embed_spooled_shard",
+    "extract_shard",
+    "is_shard",
+    "parse_shard",
+    "reassemble_shards",
+    "shard_sizes",
+    "split_payload",
+]
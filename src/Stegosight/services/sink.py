@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import codecs
+import os
+import shutil
+import tempfile
+
+WRITE_CHUNK = 1 << 20
+SNIFF_BYTES = 8 * 1024
+
+
+class ResultSink:
+    """Temporary file that receives an extracted payload until it is kept or dropped.
+
+    The file is created in ``directory`` when it is writable (next to the
+    stego file, so saving it nearby is a rename on the same filesystem) and
+    in the system temp directory otherwise.  Leaving a ``with`` block on an
+    exception removes it.
+    """
+
+    def __init__(self, directory: str | None = None, *, prefix: str = ".stegosight-", suffix: str = ".part") -> None:
+        handle = None
+        for candidate in (directory, None):
+            try:
+                handle = tempfile.NamedTemporaryFile(prefix=prefix, suffix=suffix, dir=candidate, delete=False)
+                break
+            except OSError:
+                if candidate is None:
+                    raise
+        self._handle = handle
+        self.path = handle.name
+        self.size = 0
+
+    def __enter__(self) -> ResultSink:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+    def write(self, data: bytes) -> int:
+        """Append ``data`` in :data:`WRITE_CHUNK` slices, without copying it."""
+
+        view = memoryview(data)
+        for start in range(0, len(view), WRITE_CHUNK):
+            self._handle.write(view[start : start + WRITE_CHUNK])
+        self.size += len(view)
+        return len(view)
+
+    def close(self) -> None:
+        if not self._handle.closed:
+            self._handle.close()
+
+    def discard(self) -> None:
+        self.close()
+        discard_file(self.path)
+
+
+def discard_file(path: str | None) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def keep_file(source: str, target: str) -> str:
+    """Move a finished sink file to ``target``: a rename when both share a filesystem."""
+
+    try:
+        os.replace(source, target)
+    except OSError:
+        # Different filesystem: the one case that has to copy.
+        shutil.move(source, target)
+    return target
+
+
+def looks_like_text(sample: bytes) -> bool:
+    """True when ``sample`` (a file's first bytes) decodes as UTF-8 without NULs."""
+
+    if b"\x00" in sample:
+        return False
+    try:
+        # Not final: a character cut off at the end of the sample is fine.
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def sniff_text(path: str, size: int = SNIFF_BYTES) -> bool:
+    with open(path, "rb") as handle:
+        return looks_like_text(handle.read(size))
+
+
+__all__ = ["ResultSink", "discard_file", "keep_file", "looks_like_text", "sniff_text"]
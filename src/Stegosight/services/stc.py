@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_CONSTRAINT = 7
+DEFAULT_BLOCK_BITS = 1024
+PATH_BUDGET = 32 << 20
+MAX_WIDTH = 16
+WET_COST = 1e8
+
+
+def submatrix(constraint: int, width: int) -> np.ndarray:
+    """Columns of the ``constraint x width`` STC submatrix as integers.
+
+    The matrix is drawn from a fixed seed so encoder and decoder agree.  The
+    first and last row of every column are set, which guarantees each
+    syndrome row can be satisfied and keeps the code from degenerating.
+    """
+
+    rng = np.random.default_rng(0x5354_4300 + 97 * constraint + width)
+    columns = rng.integers(0, 1 << constraint, size=width, dtype=np.int64)
+    return columns | 1 | (1 << (constraint - 1))
+
+
+def stc_layout(
+    message_bits: int,
+    cover_size: int,
+    block_bits: int = DEFAULT_BLOCK_BITS,
+) -> tuple[int, int, int]:
+    """Return ``(blocks, block_bits, width)`` for a message of ``message_bits``.
+
+    ``width`` is the number of cover elements per message bit; it is 0 when
+    the cover is too small.  Encoder and decoder derive the same layout from
+    the message length and cover size alone.
+    """
+
+    block_bits = max(min(block_bits, message_bits), 1)
+    blocks = max(math.ceil(message_bits / block_bits), 1)
+    width = min(MAX_WIDTH, cover_size // (blocks * block_bits))
+    return blocks, block_bits, width
+
+
+def _column_table(constraint: int, width: int, block_bits: int) -> np.ndarray:
+    """Submatrix column used at each trellis step, truncated at the block end."""
+
+    columns = submatrix(constraint, width)
+    rows_left = block_bits - np.arange(block_bits)
+    masks = (1 << np.minimum(rows_left, constraint)) - 1
+    return (masks[:, None] & columns[None, :]).reshape(-1)
+
+
+def _viterbi(
+    cover: np.ndarray,
+    costs: np.ndarray,
+    message: np.ndarray,
+    constraint: int,
+    width: int,
+) -> np.ndarray:
+    """Minimum-cost stego bits for a batch of independent blocks.
+
+    ``cover``/``costs`` are ``(blocks, block_bits * width)`` and ``message``
+    ``(blocks, block_bits)``; the trellis update is vectorised over every
+    state of every block in the batch at once.
+    """
+
+    blocks, length = cover.shape
+    block_bits = message.shape[1]
+    states = 1 << constraint
+    columns = _column_table(constraint, width, block_bits)
+    rows = np.arange(blocks)
+
+    # States are kept as a (2, 2, ..., 2, blocks) array with one axis per
+    # syndrome bit (first axis = highest bit) and the blocks contiguous.
+    # XOR-ing a column into the state is then a set of reversed axes, i.e. a
+    # strided view instead of a gather.
+    shape = (2,) * constraint + (blocks,)
+    flips = [
+        tuple(
+            slice(None, None, -1) if (int(column) >> bit) & 1 else slice(None)
+            for bit in range(constraint - 1, -1, -1)
+        )
+        for column in columns
+    ]
+    low = (slice(None),) * (constraint - 1)
+
+    cost = np.full(shape, np.inf, dtype=np.float32)
+    cost[(0,) * constraint] = 0.0
+    cost_zero = np.ascontiguousarray((costs * cover).T)
+    cost_one = np.ascontiguousarray((costs * (1 - cover)).T)
+    path = np.empty((length, (states * blocks + 7) // 8), dtype=np.uint8)
+
+    step = 0
+    for row in range(block_bits):
+        for _ in range(width):
+            stay = cost + cost_zero[step]
+            move = cost[flips[step]] + cost_one[step]
+            chosen = move < stay
+            cost = np.minimum(stay, move, out=stay)
+            path[step] = np.packbits(chosen.reshape(-1))
+            step += 1
+        # Row ``row`` is complete: keep states whose low bit matches the
+        # message bit and shift the window down by one row.
+        kept = np.where(message[:, row].astype(bool), cost[low + (1,)], cost[low + (0,)])
+        cost = np.full(shape, np.inf, dtype=np.float32)
+        cost[0] = kept
+
+    state = np.argmin(cost.reshape(states, blocks), axis=0)
+    stego = np.empty((blocks, length), dtype=np.uint8)
+    step = length - 1
+    for row in range(block_bits - 1, -1, -1):
+        state = 2 * state + message[:, row]
+        for _ in range(width):
+            flat = state * blocks + rows
+            bit = (path[step][flat >> 3] >> (7 - (flat & 7))) & 1
+            stego[:, step] = bit
+            state = np.where(bit == 1, state ^ columns[step], state)
+            step -= 1
+    return stego
+
+
+def _encode_batch(args: tuple[np.ndarray, np.ndarray, np.ndarray, int, int]) -> np.ndarray:
+    return _viterbi(*args)
+
+
+def stc_embed(
+    cover_bits: np.ndarray,
+    costs: np.ndarray,
+    message_bits: np.ndarray,
+    *,
+    constraint: int = DEFAULT_CONSTRAINT,
+    block_bits: int = DEFAULT_BLOCK_BITS,
+    workers: int | None = None,
+) -> np.ndarray:
+    """Return stego bits whose syndrome equals ``message_bits``.
+
+    The message is split into independent ``block_bits`` blocks; batches of
+    blocks are encoded in lockstep and spread across a process pool when
+    there is more than one batch.  Only the first ``len(result)`` cover
+    elements take part; the rest keep their bits.
+    """
+
+    blocks, block_bits, width = stc_layout(message_bits.size, cover_bits.size, block_bits)
+    if width < 1:
+        raise ValueError("payload exceeds the content-adaptive capacity of this cover")
+    length = block_bits * width
+
+    message = np.zeros(blocks * block_bits, dtype=np.int64)
+    message[: message_bits.size] = message_bits
+    message = message.reshape(blocks, block_bits)
+    cover = cover_bits[: blocks * length].astype(np.float32).reshape(blocks, length)
+    rho = np.minimum(costs[: blocks * length], WET_COST).astype(np.float32).reshape(blocks, length)
+
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    # Lockstep batches amortise the per-step overhead; cap each batch by the
+    # traceback memory and split evenly enough to keep every worker busy.
+    per_block = length * (1 << constraint) // 8
+    batch = max(1, min(PATH_BUDGET // per_block, math.ceil(blocks / workers)))
+    tasks = [
+        (cover[i : i + batch], rho[i : i + batch], message[i : i + batch], constraint, width)
+        for i in range(0, blocks, batch)
+    ]
+    if len(tasks) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_encode_batch, tasks))
+    else:
+        results = [_encode_batch(task) for task in tasks]
+    return np.concatenate(results).reshape(-1)
+
+
+def stc_extract(
+    stego_bits: np.ndarray,
+    message_length: int,
+    *,
+    constraint: int = DEFAULT_CONSTRAINT,
+    block_bits: int = DEFAULT_BLOCK_BITS,
+) -> np.ndarray:
+    """Compute the syndrome of ``stego_bits``; the first ``message_length`` bits."""
+
+    blocks, block_bits, width = stc_layout(message_length, stego_bits.size, block_bits)
+    if width < 1:
+        raise ValueError("cover is too small for the declared payload")
+    columns = submatrix(constraint, width)
+
+    y = stego_bits[: blocks * block_bits * width].astype(np.int64).reshape(blocks, block_bits, width)
+    syndrome = np.zeros((blocks, block_bits), dtype=np.int64)
+    for bit in range(constraint):
+        selector = (columns >> bit) & 1
+        parity = (y * selector[None, None, :]).sum(axis=2) & 1
+        # Row ``r`` of the parity-check matrix sees submatrix row ``bit`` of
+        # block-column ``r - bit``; rows past the block end are truncated.
+        syndrome[:, bit:] ^= parity[:, : block_bits - bit]
+    return syndrome.reshape(-1)[:message_length].astype(np.uint8)
+
+
+__all__ = [
+    "DEFAULT_BLOCK_BITS",
+    "DEFAULT_CONSTRAINT",
+    "stc_embed",
+    "stc_extract",
+    "stc_layout",
+    "submatrix",
+]
@@ -0,0 +1,483 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from .header import HEADER_SIZE, PayloadError, frame_payload, parse_header
+from .profiling import span
+from .risk import RiskTracker
+
+METHODS = ("audio_metadata",)
+
+# ID3v2: the payload lives in a PRIV frame under this owner identifier.
+ID3_OWNER = b"STEGOSIGHT\x00"
+ID3_UNSYNC = 0x80
+ID3_EXTENDED = 0x40
+ID3_FOOTER = 0x10
+ID3_MAX_SIZE = (1 << 28) - 1
+# FLAC: the payload lives in an APPLICATION block with this id.
+FLAC_APPLICATION_ID = b"STGS"
+FLAC_PADDING = 1
+FLAC_APPLICATION = 2
+FLAC_MAX_BLOCK = (1 << 24) - 1
+
+# Padding reserved when a file has to be rewritten: room for at least this
+# much, or for another payload as large as the current one.
+MIN_PADDING = 64 << 10
+COPY_CHUNK = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+Write = tuple[int, bytes]
+
+
+def _syncsafe(value: int) -> bytes:
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def _unsyncsafe(raw: bytes) -> int:
+    return (raw[0] << 21) | (raw[1] << 14) | (raw[2] << 7) | raw[3]
+
+
+def _read_at(handle: BinaryIO, offset: int, size: int) -> bytes:
+    handle.seek(offset)
+    return handle.read(size)
+
+
+def _reserve(size: int) -> int:
+    return max(MIN_PADDING, size)
+
+
+def copy_range(source: BinaryIO, target: int, offset: int, count: int) -> None:
+    """Append ``count`` bytes of ``source`` from ``offset`` to descriptor ``target``.
+
+    Uses :func:`os.copy_file_range` (the data never enters user space, and
+    copy-on-write filesystems may share the blocks) and falls back to a
+    buffered copy where the kernel or filesystem refuses it.
+    """
+
+    source_fd = source.fileno()
+    copy = getattr(os, "copy_file_range", None)
+    while count > 0 and copy is not None:
+        try:
+            done = copy(source_fd, target, min(count, 1 << 30), offset)
+        except OSError:
+            break
+        if done == 0:
+            return
+        offset += done
+        count -= done
+    while count > 0:
+        block = os.pread(source_fd, min(count, COPY_CHUNK), offset)
+        if not block:
+            return
+        os.write(target, block)
+        offset += len(block)
+        count -= len(block)
+
+
+def clone_file(source: str, target: str) -> None:
+    """Copy ``source`` to ``target`` with :func:`copy_range` (kernel-side)."""
+
+    with open(source, "rb") as handle:
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            copy_range(handle, fd, 0, os.fstat(handle.fileno()).st_size)
+        finally:
+            os.close(fd)
+
+
+def _write_zeros(target: int, count: int) -> None:
+    zeros = bytes(min(count, COPY_CHUNK))
+    while count > 0:
+        count -= os.write(target, zeros[: min(count, len(zeros))])
+
+
+# ----------------------------------------------------------------------
+# ID3v2 (MP3)
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class Id3Tag:
+    """Frame layout of the ID3v2.3/2.4 tag at the start of a file."""
+
+    version: int
+    flags: int
+    end: int  # first byte after the tag's declared size
+    frames_start: int
+    frames_end: int  # where padding begins
+    ours: tuple[int, int] | None  # (offset, length) of the payload frame
+    audio_start: int
+
+
+def read_id3(handle: BinaryIO) -> Id3Tag | None:
+    """Walk the frame headers of a leading ID3v2 tag (``None`` without one).
+
+    Frame bodies are skipped with seeks, so cover art is never read.
+    """
+
+    head = _read_at(handle, 0, 10)
+    if len(head) < 10 or head[:3] != b"ID3":
+        return None
+    version, flags = head[3], head[5]
+    if version not in (3, 4):
+        raise ValueError(f"ID3v2.{version} tags are not supported")
+    if flags & ID3_UNSYNC:
+        raise ValueError("unsynchronised ID3 tags are not supported")
+    end = 10 + _unsyncsafe(head[6:10])
+
+    position = 10
+    if flags & ID3_EXTENDED:
+        raw = _read_at(handle, position, 4)
+        # v2.4 counts the size field itself; v2.3 does not.
+        position += _unsyncsafe(raw) if version == 4 else 4 + struct.unpack(">I", raw)[0]
+    start = position
+
+    ours = None
+    while position + 10 <= end:
+        frame = _read_at(handle, position, 10)
+        if len(frame) < 10 or frame[0] == 0:
+            break
+        size = _unsyncsafe(frame[4:8]) if version == 4 else struct.unpack(">I", frame[4:8])[0]
+        if position + 10 + size > end:
+            raise ValueError("ID3 frame runs past the end of the tag")
+        if frame[:4] == b"PRIV" and _read_at(handle, position + 10, len(ID3_OWNER)) == ID3_OWNER:
+            ours = (position, 10 + size)
+        position += 10 + size
+    audio_start = end + (10 if flags & ID3_FOOTER else 0)
+    return Id3Tag(version, flags, end, start, position, ours, audio_start)
+
+
+def _id3_frame(version: int, data: bytes) -> bytes:
+    body = ID3_OWNER + data
+    size = _syncsafe(len(body)) if version == 4 else struct.pack(">I", len(body))
+    return b"PRIV" + size + b"\x00\x00" + body
+
+
+def _id3_patch(handle: BinaryIO, tag: Id3Tag, data: bytes) -> list[Write] | None:
+    """Writes that store ``data`` inside the existing tag, or ``None`` if it cannot fit."""
+
+    # A footer forbids padding and the v2.3 extended header records its size.
+    if tag.flags & (ID3_FOOTER | ID3_EXTENDED):
+        return None
+    frame = _id3_frame(tag.version, data)
+    if tag.ours is None:
+        start, tail = tag.frames_end, frame
+    else:
+        # Frames after the old payload frame move down over it.
+        start = tag.ours[0]
+        after = tag.ours[0] + tag.ours[1]
+        tail = _read_at(handle, after, tag.frames_end - after) + frame
+    if start + len(tail) > tag.end:
+        return None
+    writes = [(start, tail)]
+    stale = tag.frames_end - (start + len(tail))
+    if stale > 0:
+        writes.append((start + len(tail), bytes(stale)))
+    return writes
+
+
+def _id3_rewrite(source: BinaryIO, target: int, tag: Id3Tag | None, data: bytes) -> None:
+    """Stream a copy with the payload frame and fresh padding in a new tag."""
+
+    version = tag.version if tag is not None else 3
+    frame = _id3_frame(version, data)
+    kept: list[tuple[int, int]] = []
+    if tag is not None:
+        if tag.ours is None:
+            kept.append((tag.frames_start, tag.frames_end))
+        else:
+            kept.append((tag.frames_start, tag.ours[0]))
+            kept.append((tag.ours[0] + tag.ours[1], tag.frames_end))
+    frames = sum(stop - start for start, stop in kept) + len(frame)
+    padding = _reserve(len(frame))
+    if frames + padding > ID3_MAX_SIZE:
+        padding = ID3_MAX_SIZE - frames
+    if padding < 0:
+        raise ValueError("payload is too large for an ID3 tag")
+
+    # The rewritten tag has neither an extended header nor a footer.
+    flags = tag.flags & ~(ID3_EXTENDED | ID3_FOOTER) if tag is not None else 0
+    os.write(target, b"ID3" + bytes((version, 0, flags)) + _syncsafe(frames + padding))
+    for start, stop in kept:
+        copy_range(source, target, start, stop - start)
+    os.write(target, frame)
+    _write_zeros(target, padding)
+    audio_start = tag.audio_start if tag is not None else 0
+    copy_range(source, target, audio_start, os.fstat(source.fileno()).st_size - audio_start)
+
+
+def _id3_read(handle: BinaryIO) -> bytes | None:
+    tag = read_id3(handle)
+    if tag is None or tag.ours is None:
+        return None
+    offset, length = tag.ours
+    skip = 10 + len(ID3_OWNER)
+    return _read_at(handle, offset + skip, length - skip)
+
+
+# ----------------------------------------------------------------------
+# FLAC
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class FlacBlock:
+    offset: int
+    kind: int
+    length: int
+    last: bool
+    ours: bool
+
+    @property
+    def end(self) -> int:
+        return self.offset + 4 + self.length
+
+
+@dataclass(frozen=True)
+class FlacLayout:
+    """Metadata blocks of a FLAC stream, after any leading ID3 tag."""
+
+    start: int  # offset of ``fLaC``
+    blocks: tuple[FlacBlock, ...]
+
+    @property
+    def audio_start(self) -> int:
+        return self.blocks[-1].end
+
+    @property
+    def ours(self) -> FlacBlock | None:
+        return next((block for block in self.blocks if block.ours), None)
+
+
+def read_flac(handle: BinaryIO) -> FlacLayout:
+    """Walk the metadata block headers of a FLAC file with seeks."""
+
+    tag = read_id3(handle)
+    start = tag.audio_start if tag is not None else 0
+    if _read_at(handle, start, 4) != b"fLaC":
+        raise ValueError("not a FLAC stream")
+    blocks = []
+    position = start + 4
+    while True:
+        head = _read_at(handle, position, 4)
+        if len(head) < 4:
+            raise ValueError("FLAC metadata is truncated")
+        kind, length = head[0] & 0x7F, int.from_bytes(head[1:4], "big")
+        ours = kind == FLAC_APPLICATION and _read_at(handle, position + 4, 4) == FLAC_APPLICATION_ID
+        blocks.append(FlacBlock(position, kind, length, bool(head[0] & 0x80), ours))
+        position += 4 + length
+        if head[0] & 0x80:
+            return FlacLayout(start, tuple(blocks))
+
+
+def _flac_header(kind: int, length: int, last: bool) -> bytes:
+    return bytes((kind | (0x80 if last else 0),)) + length.to_bytes(3, "big")
+
+
+def _flac_block(data: bytes) -> bytes:
+    body = FLAC_APPLICATION_ID + data
+    if len(body) > FLAC_MAX_BLOCK:
+        raise ValueError("payload is too large for a FLAC metadata block")
+    return body
+
+
+def _flac_patch(layout: FlacLayout, data: bytes) -> list[Write] | None:
+    """Writes that put the payload block over padding (and/or its old copy)."""
+
+    body = _flac_block(data)
+    needed = 4 + len(body)
+    # Runs of adjacent blocks that may be overwritten: padding and our own.
+    runs: list[list[FlacBlock]] = []
+    for block in layout.blocks:
+        if block.kind != FLAC_PADDING and not block.ours:
+            continue
+        if runs and runs[-1][-1].end == block.offset:
+            runs[-1].append(block)
+        else:
+            runs.append([block])
+    # Prefer the run holding the old payload so it is overwritten rather than orphaned.
+    runs.sort(key=lambda run: not any(block.ours for block in run))
+
+    for run in runs:
+        start, total, last = run[0].offset, run[-1].end - run[0].offset, run[-1].last
+        left = total - needed - 4
+        if total == needed:
+            writes = [(start, _flac_header(FLAC_APPLICATION, len(body), last) + body)]
+        elif 0 <= left <= FLAC_MAX_BLOCK:
+            writes = [
+                (start, _flac_header(FLAC_APPLICATION, len(body), False) + body),
+                (start + needed, _flac_header(FLAC_PADDING, left, last)),
+            ]
+            # A single padding block is already zeros; anything else is not.
+            if len(run) > 1 or run[0].ours:
+                writes.append((start + needed + 4, bytes(left)))
+        else:
+            continue
+        old = layout.ours
+        if old is not None and old not in run:
+            writes.append((old.offset, _flac_header(FLAC_PADDING, old.length, old.last) + bytes(old.length)))
+        return writes
+    return None
+
+
+def _flac_rewrite(source: BinaryIO, target: int, layout: FlacLayout, data: bytes) -> None:
+    """Stream a copy with the payload block followed by fresh padding."""
+
+    body = _flac_block(data)
+    copy_range(source, target, 0, layout.start + 4)
+    for block in layout.blocks:
+        if block.ours or block.kind == FLAC_PADDING:
+            continue
+        os.write(target, _flac_header(block.kind, block.length, False))
+        copy_range(source, target, block.offset + 4, block.length)
+    padding = min(_reserve(len(body)), FLAC_MAX_BLOCK)
+    os.write(target, _flac_header(FLAC_APPLICATION, len(body), False) + body)
+    os.write(target, _flac_header(FLAC_PADDING, padding, True))
+    _write_zeros(target, padding)
+    audio_start = layout.audio_start
+    copy_range(source, target, audio_start, os.fstat(source.fileno()).st_size - audio_start)
+
+
+def _flac_read(handle: BinaryIO) -> bytes | None:
+    block = read_flac(handle).ours
+    if block is None:
+        return None
+    return _read_at(handle, block.offset + 8, block.length - 4)
+
+
+# ----------------------------------------------------------------------
+def _format(path: str) -> str:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in (".mp3", ".flac"):
+        raise ValueError(f"metadata tagging is not available for {os.path.basename(path)}")
+    return suffix
+
+
+def apply_writes(path: str, writes: list[Write]) -> int:
+    """``pwrite`` each ``(offset, data)``; offsets at or past the end append."""
+
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        for offset, data in writes:
+            os.pwrite(fd, data, offset)
+    finally:
+        os.close(fd)
+    return sum(len(data) for _offset, data in writes)
+
+
+def _rewrite(source: BinaryIO, output: str, suffix: str, layout, data: bytes) -> int:
+    fd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if suffix == ".flac":
+            _flac_rewrite(source, fd, layout, data)
+        else:
+            _id3_rewrite(source, fd, layout, data)
+        return os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+
+def embed_tags(
+    cover: str,
+    output: str,
+    payload: bytes,
+    method: str = "audio_metadata",
+    *,
+    key: bytes | str | None = None,
+    tracker: RiskTracker | None = None,
+) -> int:
+    """Store ``payload`` in an ID3 PRIV frame (MP3) or APPLICATION block (FLAC).
+
+    When the existing tag padding (or the previous payload's frame) has
+    room, only the tag bytes that change are written with :func:`os.pwrite`;
+    with ``output == cover`` that is the whole job.  Otherwise the file is
+    streamed once into a new tag with :data:`MIN_PADDING` or a payload's
+    worth of padding reserved, so the next embed fits in place.  Tags are
+    located by name, so ``key`` and ``tracker`` (no samples change) are
+    accepted only for a uniform engine signature.  Returns bytes written.
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"method {method!r} is not available for tag embedding")
+    suffix = _format(cover)
+    data = frame_payload(payload)
+    in_place = os.path.exists(output) and os.path.samefile(cover, output)
+
+    with open(cover, "rb") as source:
+        with span("tags.parse"):
+            if suffix == ".flac":
+                layout = read_flac(source)
+                writes = _flac_patch(layout, data)
+            else:
+                layout = read_id3(source)
+                writes = _id3_patch(source, layout, data) if layout is not None else None
+
+        if writes is not None:
+            if not in_place:
+                with span("tags.copy", os.path.getsize(cover)):
+                    clone_file(cover, output)
+            with span("tags.pwrite", sum(len(chunk) for _offset, chunk in writes)):
+                return apply_writes(output, writes)
+
+        logger.info("no room in the %s tag of %s; rewriting with padding", suffix, os.path.basename(cover))
+        with span("tags.rewrite", os.path.getsize(cover)):
+            if not in_place:
+                try:
+                    return _rewrite(source, output, suffix, layout, data)
+                except BaseException:
+                    if os.path.exists(output):
+                        os.remove(output)
+                    raise
+            fd, temporary = tempfile.mkstemp(suffix=suffix, dir=os.path.dirname(os.path.abspath(cover)))
+            os.close(fd)
+            try:
+                written = _rewrite(source, temporary, suffix, layout, data)
+                shutil.copymode(cover, temporary)
+                os.replace(temporary, cover)
+            except BaseException:
+                os.remove(temporary)
+                raise
+            return written
+
+
+def extract_tags(path: str, method: str = "audio_metadata", **_options) -> bytes:
+    """Read a payload stored by :func:`embed_tags`."""
+
+    if method not in METHODS:
+        raise ValueError(f"method {method!r} is not available for tag embedding")
+    suffix = _format(path)
+    with open(path, "rb") as handle, span("tags.parse"):
+        data = _flac_read(handle) if suffix == ".flac" else _id3_read(handle)
+    if data is None:
+        raise PayloadError("no STEGOSIGHT tag found")
+    _flags, length = parse_header(data)
+    payload = data[HEADER_SIZE : HEADER_SIZE + length]
+    if len(payload) != length:
+        raise PayloadError("tag payload is truncated")
+    return payload
+
+
+def tag_capacity(path: str) -> int:
+    """Largest payload one tag frame or block can hold."""
+
+    if _format(path) == ".flac":
+        return FLAC_MAX_BLOCK - len(FLAC_APPLICATION_ID) - HEADER_SIZE
+    return ID3_MAX_SIZE - 10 - len(ID3_OWNER) - HEADER_SIZE - MIN_PADDING
+
+
+__all__ = [
+    "FlacLayout",
+    "Write",
+    "Id3Tag",
+    "apply_writes",
+    "clone_file",
+    "copy_range",
+    "embed_tags",
+    "extract_tags",
+    "read_flac",
+    "read_id3",
+    "tag_capacity",
+]
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import contextvars
+import math
+import queue
+import threading
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import numpy as np
+
+from .audio_analysis import pair_ratio
+from .avi import AviFrames
+from .profiling import span
+from .risk import RISK_LEVELS, pov_pvalue
+
+DEFAULT_BUDGET = 64
+QUEUE_DEPTH = 4
+MIN_FRAMES = 8
+# Stop once the mean frame score is known to within this (95% interval).
+TOLERANCE = 0.05
+Z_95 = 1.96
+SUSPICIOUS_FRAME = 0.5
+
+
+@dataclass(frozen=True)
+class FrameStats:
+    """LSB detector outputs for one decoded frame."""
+
+    index: int
+    chi_square_p: float
+    pair_ratio: float
+    lsb_correlation: float
+    reference_correlation: float
+
+    @property
+    def score(self) -> float:
+        """Chance that at least one detector fires, as for audio and JPEG."""
+
+        evidence = (
+            0.8 * min(1.0, max(0.0, 1.0 - self.pair_ratio)),
+            0.6 * self.chi_square_p,
+        )
+        return 1.0 - float(np.prod([1.0 - value for value in evidence]))
+
+
+class RunningStats:
+    """Welford mean and variance, one observation at a time."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def margin(self) -> float:
+        """Half-width of the 95% interval around :attr:`mean`."""
+
+        if self.count < 2:
+            return 1.0
+        return Z_95 * math.sqrt(self.variance / self.count)
+
+
+@dataclass(frozen=True)
+class VideoAnalysis:
+    """Aggregated per-frame detector outputs for one video."""
+
+    frames: int  # frames in the file
+    sampled: int  # frames actually analysed
+    stopped_early: bool
+    mean_score: float
+    margin: float
+    chi_square_p: float  # mean over sampled frames
+    pair_ratio: float  # mean over sampled frames
+    lsb_correlation: float
+    suspicious_frames: tuple[int, ...]
+    worst_frame: int
+    worst_score: float
+    score: int
+    level: str
+
+    def summary(self) -> str:
+        return (
+            f"Risk Score: {self.score} ({self.level}) · "
+            f"{self.sampled}/{self.frames} frames · "
+            f"Chi-Square p={self.chi_square_p:.2f} (pair ratio {self.pair_ratio:.2f}) · "
+            f"suspicious {len(self.suspicious_frames)}"
+        )
+
+
+def sample_order(total: int, budget: int) -> np.ndarray:
+    """``budget`` evenly spaced frame indices, coarse to fine.
+
+    Indices are visited in bit-reversed (van der Corput) order so that every
+    prefix is itself spread across the whole video and an early stop does not
+    leave the second half unseen.
+    """
+
+    count = min(total, budget)
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    spaced = np.floor((np.arange(count) + 0.5) * total / count).astype(np.int64)
+    bits = max(1, (count - 1).bit_length())
+    slots = np.arange(1 << bits)
+    reversed_slots = np.zeros_like(slots)
+    for bit in range(bits):
+        reversed_slots |= ((slots >> bit) & 1) << (bits - 1 - bit)
+    reversed_slots = reversed_slots[reversed_slots < count]
+    return spaced[reversed_slots]
+
+
+def _plane_correlation(plane: np.ndarray) -> float:
+    """Horizontal lag-1 autocorrelation of a 0/1 bit plane."""
+
+    signs = plane.astype(np.int8) * 2 - 1
+    mean = float(signs.mean())
+    product = float((signs[:, 1:] * signs[:, :-1]).mean(dtype=np.float64))
+    return (product - mean * mean) / max(1.0 - mean * mean, 1e-12)
+
+
+def frame_stats(index: int, pixels: np.ndarray) -> FrameStats:
+    """Pair-of-values and bit-plane statistics of one ``(height, width, channels)`` frame."""
+
+    histogram = np.bincount(pixels.reshape(-1), minlength=256)
+    return FrameStats(
+        index=index,
+        chi_square_p=pov_pvalue(histogram),
+        pair_ratio=pair_ratio(histogram),
+        lsb_correlation=_plane_correlation(pixels & 1),
+        reference_correlation=_plane_correlation((pixels >> 1) & 1),
+    )
+
+
+def decode_frames(path: str, indices: np.ndarray, stop: threading.Event) -> Iterator[tuple[int, np.ndarray]]:
+    """Yield ``(index, pixels)`` for ``indices`` until ``stop`` is set.
+
+    Only uncompressed AVI can be decoded in-tree; other containers raise
+    :class:`ValueError` from :func:`~.avi.read_avi_layout`.
+    """
+
+    frames = AviFrames(path)
+    for index in indices:
+        if stop.is_set():
+            return
+        with span("video.decode", frames.layout.frame_bytes):
+            pixels = np.array(frames.pixels(int(index)))
+        yield int(index), pixels
+
+
+class _FrameQueue:
+    """Background decoder feeding a bounded queue, so decoding overlaps analysis."""
+
+    _DONE = object()
+
+    def __init__(self, frames: Iterator[tuple[int, np.ndarray]], stop: threading.Event, depth: int) -> None:
+        self._frames = frames
+        self._stop = stop
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        # Run in a copy of the caller's context so decoder spans reach its profiler.
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), name="video-decoder", daemon=True)
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        try:
+            for item in self._frames:
+                if not self._put(item):
+                    return
+        except BaseException as exc:  # handed to the consumer
+            self._put(exc)
+            return
+        self._put(self._DONE)
+
+    def __iter__(self) -> Iterator[tuple[int, np.ndarray]]:
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self._stop.set()
+            self._thread.join()
+
+
+def analyze_video(
+    path: str,
+    *,
+    budget: int = DEFAULT_BUDGET,
+    tolerance: float = TOLERANCE,
+    progress: Callable[[float], None] | None = None,
+) -> VideoAnalysis:
+    """Run the LSB detectors on up to ``budget`` evenly spaced frames of ``path``.
+
+    Frames are decoded on a background thread into a queue of
+    :data:`QUEUE_DEPTH` and folded into running statistics; sampling stops
+    once the mean frame score is known to within ``tolerance`` (after
+    :data:`MIN_FRAMES`).  ``progress`` gets the share of the budget used.
+    """
+
+    total = len(AviFrames(path))
+    if total == 0:
+        raise ValueError("video has no frames")
+    indices = sample_order(total, budget)
+    stop = threading.Event()
+    scores, chi, ratio, lsb = RunningStats(), RunningStats(), RunningStats(), RunningStats()
+    suspicious: list[int] = []
+    worst = (-1.0, 0)
+    decoded = iter(_FrameQueue(decode_frames(path, indices, stop), stop, QUEUE_DEPTH))
+    with closing(decoded):
+        for index, pixels in decoded:
+            with span("video.frame_stats", pixels.nbytes):
+                stats = frame_stats(index, pixels)
+            score = stats.score
+            scores.add(score)
+            chi.add(stats.chi_square_p)
+            ratio.add(stats.pair_ratio)
+            lsb.add(stats.lsb_correlation)
+            if score >= SUSPICIOUS_FRAME:
+                suspicious.append(index)
+            worst = max(worst, (score, index))
+            if progress is not None:
+                progress(scores.count / indices.size)
+            if scores.count >= MIN_FRAMES and scores.margin <= tolerance:
+                stop.set()
+                break
+
+    final = int(round(100 * scores.mean))
+    return VideoAnalysis(
+        frames=total,
+        sampled=scores.count,
+        stopped_early=scores.count < indices.size,
+        mean_score=scores.mean,
+        margin=scores.margin,
+        chi_square_p=chi.mean,
+        pair_ratio=ratio.mean,
+        lsb_correlation=lsb.mean,
+        suspicious_frames=tuple(sorted(suspicious)),
+        worst_frame=worst[1],
+        worst_score=worst[0],
+        score=final,
+        level=next(label for limit, label in RISK_LEVELS if final < limit),
+    )
+
+
+__all__ = [
+    "FrameStats",
+    "RunningStats",
+    "VideoAnalysis",
+    "analyze_video",
+    "decode_frames",
+    "frame_stats",
+    "sample_order",
+]
@@ -1,24 +1,40 @@
 from __future__ import annotations
 
+import codecs
+import os
+
 from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtGui import QFontDatabase, QPixmap, QTextCursor
 from PyQt5.QtWidgets import (
     QFileDialog,
     QFrame,
     QLabel,
+    QPlainTextEdit,
     QSizePolicy,
     QVBoxLayout,
     QWidget,
 )
 
+from ..services.sink import sniff_text
+from .utils import format_hex_dump
+
+TEXT_PAGE_BYTES = 64 * 1024
+HEX_PAGE_BYTES = 4 * 1024
+
 
 class FileDropArea(QLabel):
-    """Drop zone widget that also opens a file dialog on click."""
+    """Drop zone widget that also opens a file dialog on click.
+
+    With ``multiple`` every dropped or chosen file is reported through
+    ``filesSelected``; ``fileSelected`` still carries the first one.
+    """
 
     fileSelected = pyqtSignal(str)
+    filesSelected = pyqtSignal(list)
 
-    def __init__(self, prompt: str, parent: QWidget | None = None) -> None:
+    def __init__(self, prompt: str, parent: QWidget | None = None, *, multiple: bool = False) -> None:
         super().__init__(prompt, parent)
+        self._multiple = multiple
         self.setAcceptDrops(True)
         self.setAlignment(Qt.AlignCenter)
         self.setWordWrap(True)
@@ -42,21 +58,31 @@ class FileDropArea(QLabel):
         else:
             event.ignore()
 
+    def _emit_paths(self, paths: list[str]) -> None:
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        if not self._multiple:
+            paths = paths[:1]
+        self.fileSelected.emit(paths[0])
+        self.filesSelected.emit(paths)
+
     def dropEvent(self, event):  # type: ignore[override]
-        urls = event.mimeData().urls()
-        if urls:
-            local_path = urls[0].toLocalFile()
-            if local_path:
-                print(f"[UI] File dropped: {local_path}")
-                self.fileSelected.emit(local_path)
+        paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        if any(paths):
+            print(f"[UI] File dropped: {', '.join(path for path in paths if path)}")
+            self._emit_paths(paths)
         event.acceptProposedAction()
 
     def mousePressEvent(self, event):  # type: ignore[override]
         if event.button() == Qt.LeftButton:
             print("[UI] Drop area clicked – opening file dialog")
-            file_path, _ = QFileDialog.getOpenFileName(self, "เลือกไฟล์")
-            if file_path:
-                self.fileSelected.emit(file_path)
+            if self._multiple:
+                paths, _ = QFileDialog.getOpenFileNames(self, "เลือกไฟล์")
+            else:
+                path, _ = QFileDialog.getOpenFileName(self, "เลือกไฟล์")
+                paths = [path]
+            self._emit_paths(paths)
         super().mousePressEvent(event)
 
 
@@ -178,9 +204,98 @@ class MethodCard(QFrame):
         super().mousePressEvent(event)
 
 
+class PagedTextView(QPlainTextEdit):
+    """Read-only view of a file that loads one page at a time.
+
+    Only the first page is read when a file is opened; the next one is
+    appended as the scroll bar nears the bottom.  Text is decoded
+    incrementally as UTF-8, binary data is shown as a hex dump.  No file
+    handle is kept open between pages, so the file can be renamed while
+    it is shown (see :meth:`set_source`).
+    """
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self._text_font = self.font()
+        self._path: str | None = None
+        self._size = 0
+        self._offset = 0
+        self._hex = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
+    @property
+    def hex_mode(self) -> bool:
+        return self._hex
+
+    def open(self, path: str | None, hex_view: bool | None = None) -> None:
+        """Show ``path`` from the start; ``hex_view=None`` picks by content."""
+
+        self._path = path
+        self._size = os.path.getsize(path) if path else 0
+        if hex_view is None:
+            hex_view = bool(path) and not sniff_text(path)
+        self._hex = hex_view
+        self._reload()
+
+    def set_source(self, path: str) -> None:
+        """Follow the shown file to ``path`` after it was moved."""
+
+        self._path = path
+
+    def setHexMode(self, enabled: bool) -> None:
+        if enabled != self._hex:
+            self._hex = enabled
+            self._reload()
+
+    def clear(self) -> None:  # type: ignore[override]
+        self._path = None
+        self._size = self._offset = 0
+        super().clear()
+
+    def _reload(self) -> None:
+        super().clear()
+        self._offset = 0
+        self._decoder.reset()
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont) if self._hex else self._text_font)
+        self._load_page()
+
+    def _load_page(self) -> None:
+        if self._path is None or self._offset >= self._size:
+            return
+        page = HEX_PAGE_BYTES if self._hex else TEXT_PAGE_BYTES
+        try:
+            with open(self._path, "rb") as handle:
+                handle.seek(self._offset)
+                data = handle.read(page)
+        except OSError:
+            return
+        start = self._offset
+        self._offset += len(data)
+        if not data:
+            self._size = self._offset
+            return
+        if self._hex:
+            text = format_hex_dump(data, start) + "\n"
+        else:
+            text = self._decoder.decode(data, final=self._offset >= self._size)
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def _on_scrolled(self, value: int) -> None:
+        bar = self.verticalScrollBar()
+        if value >= bar.maximum() - bar.pageStep():
+            self._load_page()
+
+
 __all__ = [
     "FileDropArea",
     "PreviewImageLabel",
     "RiskScoreWidget",
     "MethodCard",
+    "PagedTextView",
 ]
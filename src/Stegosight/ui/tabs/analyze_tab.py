@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import os
+import sqlite3
+import time
+from typing import TYPE_CHECKING
 
+from appdirs import user_data_dir
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QCheckBox,
+    QComboBox,
+    QFileDialog,
     QFrame,
     QGroupBox,
     QHeaderView,
@@ -21,7 +27,33 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+from ...services.profiling import Profiler
 from ..components import FileDropArea, RiskScoreWidget
+from ..workers import TaskWorker
+
+if TYPE_CHECKING:
+    from ...services.audio_analysis import AudioAnalysis
+    from ...services.cover_index import CoverIndex
+    from ...services.jpeg_analysis import JpegAnalysis
+    from ...services.video_analysis import VideoAnalysis
+
+JPEG_SUFFIXES = {".jpg", ".jpeg"}
+AUDIO_SUFFIXES = {".wav", ".wave"}
+VIDEO_SUFFIXES = {".avi"}
+# Every finished analysis is kept here, in the screening daemon's result format.
+HISTORY_PATH = os.path.join(user_data_dir("Stegosight", appauthor=False), "history.db")
+HISTORY_LIMIT = 200
+HISTORY_RANGES = [
+    ("ทั้งหมด", None),
+    ("24 ชั่วโมงล่าสุด", 1),
+    ("7 วันล่าสุด", 7),
+    ("30 วันล่าสุด", 30),
+]
+HISTORY_DETECTORS = {
+    "jpeg_analysis": "JPEG DCT",
+    "audio_analysis": "Audio",
+    "video_analysis": "Video",
+}
 
 
 class AnalyzeTab(QWidget):
@@ -41,8 +73,27 @@ class AnalyzeTab(QWidget):
         self.chi_square_checkbox: QCheckBox | None = None
         self.histogram_checkbox: QCheckBox | None = None
         self.file_structure_checkbox: QCheckBox | None = None
+        self.jpeg_dct_checkbox: QCheckBox | None = None
+        self.audio_checkbox: QCheckBox | None = None
+        self.video_checkbox: QCheckBox | None = None
+        self.analyze_profiler: Profiler | None = None
+        self._analyze_worker: TaskWorker | None = None
+        self.history_path = HISTORY_PATH
+        self.history_table: QTableWidget | None = None
+        self.history_range_combo: QComboBox | None = None
+        self.history_high_risk_checkbox: QCheckBox | None = None
+        self._history_worker: TaskWorker | None = None
+        # Set when the filters change mid-query; the query re-runs once it ends.
+        self._history_stale = False
+        self.cover_index: CoverIndex | None = None
+        self.cover_status_label: QLabel | None = None
+        self.cover_table: QTableWidget | None = None
+        self.cover_add_button: QPushButton | None = None
+        self.cover_find_button: QPushButton | None = None
+        self._cover_worker: TaskWorker | None = None
 
         self._build_ui()
+        self.refresh_history()
 
     # ------------------------------------------------------------------
     def _build_ui(self) -> None:
@@ -85,10 +136,16 @@ class AnalyzeTab(QWidget):
         self.chi_square_checkbox = QCheckBox("Chi-Square Attack")
         self.histogram_checkbox = QCheckBox("Histogram Analysis")
         self.file_structure_checkbox = QCheckBox("File Structure Analysis")
+        self.jpeg_dct_checkbox = QCheckBox("JPEG DCT Analysis (Histogram, Chi-Square, Calibration)")
+        self.audio_checkbox = QCheckBox("Audio Analysis (LSB Chi-Square, Spectrum)")
+        self.video_checkbox = QCheckBox("Video Frame Sampling (LSB Chi-Square ต่อเฟรม)")
         for checkbox in (
             self.chi_square_checkbox,
             self.histogram_checkbox,
             self.file_structure_checkbox,
+            self.jpeg_dct_checkbox,
+            self.audio_checkbox,
+            self.video_checkbox,
         ):
             checkbox.setChecked(True)
             label = checkbox.text()
@@ -100,13 +157,43 @@ class AnalyzeTab(QWidget):
             technique_layout.addWidget(checkbox)
 
         technique_hint = QLabel(
-            "สามารถเลือกหลายเทคนิคพร้อมกันเพื่อเพิ่มความแม่นยำของผลลัพธ์"
+            "สามารถเลือกหลายเทคนิคพร้อมกันเพื่อเพิ่มความแม่นยำของผลลัพธ์ "
+            "ไฟล์ JPEG จะถูกวิเคราะห์จากสัมประสิทธิ์ DCT โดยตรงโดยไม่ถอดรหัสพิกเซล "
+            "ไฟล์ WAV จะถูกอ่านแบบสตรีมทีละบล็อกจึงรองรับไฟล์เสียงยาวหลายชั่วโมง "
+            "และวิดีโอจะสุ่มตรวจเฟรมที่กระจายทั่วทั้งไฟล์แล้วหยุดเมื่อผลนิ่งพอ"
         )
         technique_hint.setWordWrap(True)
         technique_layout.addWidget(technique_hint)
 
         control_layout.addWidget(technique_group)
 
+        cover_group = QGroupBox("ค้นหาไฟล์ต้นฉบับสำหรับเปรียบเทียบ")
+        cover_layout = QVBoxLayout(cover_group)
+        cover_layout.setSpacing(10)
+        self.cover_status_label = QLabel(
+            "เพิ่มโฟลเดอร์ภาพอ้างอิงเพื่อสร้างดัชนี แล้วค้นหาภาพต้นฉบับที่ใกล้เคียงกับไฟล์ที่เลือกด้วย Perceptual Hash"
+        )
+        self.cover_status_label.setWordWrap(True)
+        cover_layout.addWidget(self.cover_status_label)
+        cover_buttons = QHBoxLayout()
+        self.cover_add_button = QPushButton("📁 เพิ่มโฟลเดอร์ต้นฉบับ...")
+        self.cover_add_button.clicked.connect(self.on_add_cover_folder)
+        cover_buttons.addWidget(self.cover_add_button)
+        self.cover_find_button = QPushButton("🔎 ค้นหาต้นฉบับ")
+        self.cover_find_button.clicked.connect(self.on_find_cover)
+        cover_buttons.addWidget(self.cover_find_button)
+        cover_layout.addLayout(cover_buttons)
+        self.cover_table = QTableWidget(0, 2)
+        self.cover_table.setHorizontalHeaderLabels(["ไฟล์ต้นฉบับที่เป็นไปได้", "ระยะ pHash"])
+        self.cover_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.cover_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.cover_table.verticalHeader().setVisible(False)
+        self.cover_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.cover_table.setMinimumHeight(120)
+        cover_layout.addWidget(self.cover_table)
+
+        control_layout.addWidget(cover_group)
+
         control_layout.addStretch(1)
 
         button_row = QHBoxLayout()
@@ -197,6 +284,38 @@ class AnalyzeTab(QWidget):
 
         result_layout.addWidget(log_group)
 
+        history_group = QGroupBox("ประวัติการวิเคราะห์")
+        history_layout = QVBoxLayout(history_group)
+        history_layout.setSpacing(12)
+
+        filter_row = QHBoxLayout()
+        self.history_range_combo = QComboBox()
+        for label, _days in HISTORY_RANGES:
+            self.history_range_combo.addItem(label)
+        self.history_range_combo.setCurrentIndex(2)
+        self.history_range_combo.currentIndexChanged.connect(self.refresh_history)
+        filter_row.addWidget(self.history_range_combo)
+        self.history_high_risk_checkbox = QCheckBox("เฉพาะความเสี่ยงสูง (≥ 65)")
+        self.history_high_risk_checkbox.toggled.connect(self.refresh_history)
+        filter_row.addWidget(self.history_high_risk_checkbox)
+        filter_row.addStretch(1)
+        refresh_button = QPushButton("รีเฟรช")
+        refresh_button.clicked.connect(self.refresh_history)
+        filter_row.addWidget(refresh_button)
+        history_layout.addLayout(filter_row)
+
+        self.history_table = QTableWidget(0, 5)
+        self.history_table.setHorizontalHeaderLabels(["เวลา", "ไฟล์", "Detector", "Score", "Chi-Square p"])
+        self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.history_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.history_table.verticalHeader().setVisible(False)
+        self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.history_table.setMinimumHeight(200)
+        history_layout.addWidget(self.history_table)
+
+        result_layout.addWidget(history_group)
+
         splitter.addWidget(result_panel)
         splitter.setStretchFactor(0, 1)
         splitter.setStretchFactor(1, 2)
@@ -241,9 +360,38 @@ class AnalyzeTab(QWidget):
                 )
             return
 
+        suffix = os.path.splitext(self.analyze_selected_path)[1].lower()
+        notice = None
+        if (
+            suffix in JPEG_SUFFIXES
+            and self.jpeg_dct_checkbox is not None
+            and self.jpeg_dct_checkbox.isChecked()
+        ):
+            coding = self._jpeg_coding(self.analyze_selected_path)
+            if coding == "sequential":
+                self._start_jpeg_analysis(self.analyze_selected_path)
+                return
+            notice = f"[WARN] ไฟล์ JPEG แบบ {coding} ยังไม่รองรับการวิเคราะห์ DCT จึงใช้การวิเคราะห์ทั่วไปแทน"
+        if (
+            suffix in AUDIO_SUFFIXES
+            and self.audio_checkbox is not None
+            and self.audio_checkbox.isChecked()
+        ):
+            self._start_audio_analysis(self.analyze_selected_path)
+            return
+        if (
+            suffix in VIDEO_SUFFIXES
+            and self.video_checkbox is not None
+            and self.video_checkbox.isChecked()
+        ):
+            self._start_video_analysis(self.analyze_selected_path)
+            return
+
         if self.analyze_log_console is not None:
             self.analyze_log_console.clear()
             self.analyze_log_console.appendPlainText("[INFO] เริ่มการวิเคราะห์ไฟล์...")
+            if notice is not None:
+                self.analyze_log_console.appendPlainText(notice)
             self.analyze_log_console.appendPlainText(
                 "[RUN] กำลังประมวลผลเทคนิค: Chi-Square, Histogram, Structure"
             )
@@ -294,5 +442,478 @@ class AnalyzeTab(QWidget):
 
         print("[Result] การวิเคราะห์เสร็จสมบูรณ์")
 
+    # ------------------------------------------------------------------
+    def _jpeg_coding(self, path: str) -> str:
+        """The frame coding of ``path``; unreadable headers go to the DCT path to be reported."""
+
+        from ...services.jpeg import jpeg_coding
+
+        try:
+            return jpeg_coding(path)
+        except (OSError, ValueError):
+            return "sequential"
+
+    def _start_jpeg_analysis(self, path: str) -> None:
+        if self.analyze_log_console is not None:
+            self.analyze_log_console.clear()
+            self.analyze_log_console.appendPlainText("[INFO] เริ่มการวิเคราะห์ไฟล์ JPEG...")
+            self.analyze_log_console.appendPlainText(
+                "[RUN] อ่านสัมประสิทธิ์ DCT จาก Entropy Coding: Histogram, Chi-Square, F5 Calibration, Blockiness"
+            )
+        profiler = Profiler(f"analyze:{os.path.basename(path)}")
+
+        def task() -> JpegAnalysis:
+            from ...services.jpeg_analysis import analyze_jpeg
+
+            started = time.perf_counter()
+            with profiler.activate():
+                analysis = analyze_jpeg(path)
+            self._record_history(path, "jpeg_analysis", analysis, time.perf_counter() - started)
+            return analysis
+
+        self._run_analysis(task, profiler, self._complete_jpeg_analysis)
+
+    def _start_audio_analysis(self, path: str) -> None:
+        if self.analyze_log_console is not None:
+            self.analyze_log_console.clear()
+            self.analyze_log_console.appendPlainText("[INFO] เริ่มการวิเคราะห์ไฟล์เสียง...")
+            self.analyze_log_console.appendPlainText(
+                "[RUN] อ่าน PCM แบบสตรีม: Chi-Square คู่ค่า, Autocorrelation ของบิต LSB, สเปกตรัมย่านสูง"
+            )
+        profiler = Profiler(f"analyze:{os.path.basename(path)}")
+
+        def task(report) -> AudioAnalysis:
+            last = -1
+
+            def progress(fraction: float) -> None:
+                nonlocal last
+                percent = int(fraction * 100)
+                if percent != last:
+                    last = percent
+                    report(percent)
+
+            from ...services.audio_analysis import analyze_audio
+
+            started = time.perf_counter()
+            with profiler.activate():
+                analysis = analyze_audio(path, progress=progress)
+            self._record_history(path, "audio_analysis", analysis, time.perf_counter() - started)
+            return analysis
+
+        self._run_analysis(task, profiler, self._complete_audio_analysis, with_progress=True)
+
+    def _start_video_analysis(self, path: str) -> None:
+        if self.analyze_log_console is not None:
+            self.analyze_log_console.clear()
+            self.analyze_log_console.appendPlainText("[INFO] เริ่มการวิเคราะห์ไฟล์วิดีโอ...")
+            self.analyze_log_console.appendPlainText(
+                "[RUN] สุ่มเฟรมที่กระจายทั่วไฟล์: Chi-Square คู่ค่า, Histogram, Autocorrelation ของบิต LSB"
+            )
+        profiler = Profiler(f"analyze:{os.path.basename(path)}")
+
+        def task(report) -> VideoAnalysis:
+            from ...services.video_analysis import analyze_video
+
+            started = time.perf_counter()
+            with profiler.activate():
+                analysis = analyze_video(path, progress=lambda fraction: report(int(fraction * 100)))
+            self._record_history(path, "video_analysis", analysis, time.perf_counter() - started)
+            return analysis
+
+        self._run_analysis(task, profiler, self._complete_video_analysis, with_progress=True)
+
+    def _run_analysis(self, task, profiler: Profiler, on_success, *, with_progress: bool = False) -> None:
+        self.analyze_profiler = profiler
+        if self.analyze_button is not None:
+            self.analyze_button.setEnabled(False)
+        self._analyze_worker = TaskWorker(task, self, with_progress=with_progress)
+        self._analyze_worker.succeeded.connect(on_success)
+        self._analyze_worker.succeeded.connect(lambda _analysis: self.refresh_history())
+        self._analyze_worker.failed.connect(self._fail_analysis)
+        if with_progress:
+            self._analyze_worker.progress.connect(self._show_analysis_progress)
+        self._analyze_worker.start()
+
+    def _show_analysis_progress(self, percent: int) -> None:
+        if self.analyze_summary_label is not None:
+            self.analyze_summary_label.setText(f"กำลังวิเคราะห์... {percent}%")
+
+    def _fill_results(self, results: list[tuple[str, str, str]]) -> None:
+        if self.analyze_results_table is None:
+            return
+        self.analyze_results_table.setRowCount(len(results))
+        for row_index, row in enumerate(results):
+            for column_index, value in enumerate(row):
+                item = QTableWidgetItem(value)
+                if column_index == 2:
+                    item.setTextAlignment(Qt.AlignCenter)
+                self.analyze_results_table.setItem(row_index, column_index, item)
+
+    def _complete_jpeg_analysis(self, analysis: JpegAnalysis) -> None:
+        from ...services.jpeg_analysis import BLOCKINESS_SLACK
+
+        if self.analyze_button is not None:
+            self.analyze_button.setEnabled(True)
+
+        if analysis.score >= 65:
+            verdict = "พบสัญญาณชัดเจนว่าสัมประสิทธิ์ DCT ถูกแก้ไข"
+        elif analysis.score >= 35:
+            verdict = "พบรูปแบบที่อาจบ่งชี้ถึงการซ่อนข้อมูล ควรตรวจสอบเพิ่มเติม"
+        else:
+            verdict = "ไม่พบร่องรอยการแก้ไขสัมประสิทธิ์ DCT ที่ชัดเจน"
+        if self.analyze_risk_widget is not None:
+            self.analyze_risk_widget.update_score(analysis.score, analysis.level, verdict)
+
+        if self.analyze_summary_label is not None:
+            summary_lines = [
+                f"คะแนนความเสี่ยงโดยรวม {analysis.score}/100 (ระดับ{analysis.level})",
+                f"วิเคราะห์ {analysis.blocks:,} บล็อก 8×8 ของช่องความสว่าง",
+                analysis.summary(),
+            ]
+            self.analyze_summary_label.setText("\n".join(summary_lines))
+
+        histogram = analysis.histogram
+        middle = histogram.size // 2
+        ones = int(histogram[middle - 1] + histogram[middle + 1])
+        twos = int(histogram[middle - 2] + histogram[middle + 2])
+        excess = analysis.blockiness_excess
+        results = [
+            (
+                "DCT Coefficient Histogram",
+                f"0: {int(histogram[middle]):,} · ±1: {ones:,} · ±2: {twos:,}",
+                "-",
+            ),
+            (
+                "Chi-Square (JSteg/OutGuess)",
+                f"p={analysis.chi_square_p:.2f} · ครอบคลุม {analysis.embedded_share:.0%} ของสตรีม",
+                f"{analysis.chi_square_p:.0%}",
+            ),
+            (
+                "F5 Calibration",
+                f"สัดส่วนสัมประสิทธิ์ที่ถูกแก้ไข β≈{analysis.f5_beta:.3f}",
+                f"{min(1.0, 4.0 * analysis.f5_beta):.0%}",
+            ),
+            (
+                "Blockiness",
+                f"{excess:+.1%} เทียบกับภาพสอบเทียบ",
+                f"{min(1.0, max(0.0, 4.0 * (excess - BLOCKINESS_SLACK))):.0%}",
+            ),
+        ]
+        self._fill_results(results)
+
+        if self.analyze_guidance_label is not None:
+            guidance_html = """
+                <ul>
+                    <li>ค่า Chi-Square สูงบ่งชี้การแทนที่ LSB ของสัมประสิทธิ์ (JSteg, OutGuess)</li>
+                    <li>ค่า β ของ F5 ประมาณสัดส่วนสัมประสิทธิ์ AC ที่ถูกลดค่าเข้าหาศูนย์</li>
+                    <li>เปรียบเทียบกับภาพต้นฉบับหรือภาพจากกล้องเดียวกันเพื่อยืนยันผล</li>
+                </ul>
+            """
+            self.analyze_guidance_label.setText(guidance_html.strip())
+
+        if self.analyze_log_console is not None:
+            if self.analyze_profiler is not None:
+                self.analyze_log_console.appendPlainText(f"[PROFILE]\n{self.analyze_profiler.summary()}")
+            self.analyze_log_console.appendPlainText("[DONE] การวิเคราะห์ JPEG เสร็จสิ้น")
+        print("[Result] การวิเคราะห์เสร็จสมบูรณ์")
+
+    def _complete_audio_analysis(self, analysis: AudioAnalysis) -> None:
+        if self.analyze_button is not None:
+            self.analyze_button.setEnabled(True)
+
+        if analysis.score >= 65:
+            verdict = "พบสัญญาณชัดเจนว่าบิต LSB ของเสียงถูกแทนที่"
+        elif analysis.score >= 35:
+            verdict = "พบรูปแบบที่อาจบ่งชี้ถึงการซ่อนข้อมูล ควรตรวจสอบเพิ่มเติม"
+        else:
+            verdict = "ไม่พบร่องรอยการแก้ไขบิต LSB ของเสียงที่ชัดเจน"
+        if self.analyze_risk_widget is not None:
+            self.analyze_risk_widget.update_score(analysis.score, analysis.level, verdict)
+
+        if self.analyze_summary_label is not None:
+            summary_lines = [
+                f"คะแนนความเสี่ยงโดยรวม {analysis.score}/100 (ระดับ{analysis.level})",
+                f"วิเคราะห์ {analysis.seconds:,.1f} วินาที · {analysis.channels} ช่อง · "
+                f"{analysis.sample_width * 8} บิต · {analysis.rate:,} Hz",
+                analysis.summary(),
+            ]
+            self.analyze_summary_label.setText("\n".join(summary_lines))
+
+        results = [
+            (
+                "Chi-Square (คู่ค่า 2k/2k+1)",
+                f"p={analysis.chi_square_p:.2f} · อัตราส่วนคู่ค่า {analysis.pair_ratio:.2f}",
+                f"{min(1.0, max(0.0, 1.0 - analysis.pair_ratio)):.0%}",
+            ),
+            (
+                "LSB Autocorrelation",
+                f"บิต 0: {analysis.lsb_correlation:+.3f} · บิต 1: {analysis.reference_correlation:+.3f}",
+                "-",
+            ),
+            (
+                "High-band Spectrum",
+                f"{analysis.high_band_level:+.1f} dB เหนือระดับ Quantisation · "
+                f"Flatness {analysis.high_band_flatness:.2f}",
+                "-",
+            ),
+        ]
+        self._fill_results(results)
+
+        if self.analyze_guidance_label is not None:
+            guidance_html = """
+                <ul>
+                    <li>อัตราส่วนคู่ค่าใกล้ 0 บ่งชี้การแทนที่ LSB ของตัวอย่างเสียง</li>
+                    <li>ย่านความถี่สูงที่แบนและดังกว่าพื้นเสียงควอนไทซ์ราว 8 dB สอดคล้องกับสัญญาณรบกวนจาก LSB</li>
+                    <li>ไฟล์ที่บันทึกจากไมโครโฟนจริงมักมีเสียงรบกวนกลบ LSB จึงควรเทียบกับต้นฉบับเพื่อยืนยันผล</li>
+                </ul>
+            """
+            self.analyze_guidance_label.setText(guidance_html.strip())
+
+        if self.analyze_log_console is not None:
+            if self.analyze_profiler is not None:
+                self.analyze_log_console.appendPlainText(f"[PROFILE]\n{self.analyze_profiler.summary()}")
+            self.analyze_log_console.appendPlainText("[DONE] การวิเคราะห์ไฟล์เสียงเสร็จสิ้น")
+        print("[Result] การวิเคราะห์เสร็จสมบูรณ์")
+
+    def _complete_video_analysis(self, analysis: VideoAnalysis) -> None:
+        if self.analyze_button is not None:
+            self.analyze_button.setEnabled(True)
+
+        if analysis.score >= 65:
+            verdict = "พบสัญญาณชัดเจนว่าบิต LSB ของเฟรมวิดีโอถูกแทนที่"
+        elif analysis.score >= 35 or analysis.suspicious_frames:
+            verdict = "พบเฟรมที่อาจบ่งชี้ถึงการซ่อนข้อมูล ควรตรวจสอบเพิ่มเติม"
+        else:
+            verdict = "ไม่พบร่องรอยการแก้ไขบิต LSB ในเฟรมที่สุ่มตรวจ"
+        if self.analyze_risk_widget is not None:
+            self.analyze_risk_widget.update_score(analysis.score, analysis.level, verdict)
+
+        stop_reason = (
+            f"หยุดก่อนกำหนดเมื่อคะแนนเฉลี่ยนิ่งที่ ±{analysis.margin:.3f}"
+            if analysis.stopped_early
+            else f"ใช้งบประมาณเฟรมครบ (±{analysis.margin:.3f})"
+        )
+        if self.analyze_summary_label is not None:
+            summary_lines = [
+                f"คะแนนความเสี่ยงโดยรวม {analysis.score}/100 (ระดับ{analysis.level})",
+                f"ตรวจ {analysis.sampled:,} จาก {analysis.frames:,} เฟรม · {stop_reason}",
+                analysis.summary(),
+            ]
+            self.analyze_summary_label.setText("\n".join(summary_lines))
+
+        shown = ", ".join(str(index) for index in analysis.suspicious_frames[:8])
+        if len(analysis.suspicious_frames) > 8:
+            shown += ", ..."
+        results = [
+            (
+                "Chi-Square (เฉลี่ยต่อเฟรม)",
+                f"p={analysis.chi_square_p:.2f} · อัตราส่วนคู่ค่า {analysis.pair_ratio:.2f}",
+                f"{analysis.mean_score:.0%}",
+            ),
+            (
+                "LSB Autocorrelation",
+                f"ค่าเฉลี่ยบิต 0: {analysis.lsb_correlation:+.3f}",
+                "-",
+            ),
+            (
+                "เฟรมที่น่าสงสัย",
+                f"{len(analysis.suspicious_frames)} เฟรม{': ' + shown if shown else ''} · "
+                f"สูงสุดที่เฟรม {analysis.worst_frame}",
+                f"{analysis.worst_score:.0%}",
+            ),
+        ]
+        self._fill_results(results)
+
+        if self.analyze_guidance_label is not None:
+            guidance_html = """
+                <ul>
+                    <li>ผลนี้มาจากเฟรมที่สุ่มตรวจ การฝังเฉพาะบางเฟรมอาจหลุดจากการสุ่ม</li>
+                    <li>ตรวจเฟรมที่น่าสงสัยเพิ่มเติม หรือดึงข้อมูลด้วยวิธี video_adaptive ในแท็บ Extract</li>
+                    <li>เปรียบเทียบกับวิดีโอต้นฉบับเพื่อยืนยันผล</li>
+                </ul>
+            """
+            self.analyze_guidance_label.setText(guidance_html.strip())
+
+        if self.analyze_log_console is not None:
+            if self.analyze_profiler is not None:
+                self.analyze_log_console.appendPlainText(f"[PROFILE]\n{self.analyze_profiler.summary()}")
+            self.analyze_log_console.appendPlainText("[DONE] การวิเคราะห์วิดีโอเสร็จสิ้น")
+        print("[Result] การวิเคราะห์เสร็จสมบูรณ์")
+
+    # ------------------------------------------------------------------
+    def _record_history(self, path: str, detector: str, analysis, seconds: float) -> None:
+        """Add a finished analysis to the history database (runs on the worker thread)."""
+
+        from ...daemon.screening import ScreenResult, file_digest
+        from ...daemon.store import SqliteStore
+
+        try:
+            result = ScreenResult.from_analysis(
+                path, file_digest(path), os.path.getsize(path), detector, analysis, seconds
+            )
+            with SqliteStore(self.history_path) as store:
+                store.add(result)
+        except (OSError, sqlite3.Error) as exc:
+            # History is a convenience; the analysis itself still succeeded.
+            print(f"[Warn] บันทึกประวัติการวิเคราะห์ไม่สำเร็จ: {exc}")
+
+    def refresh_history(self, *_args) -> None:
+        """Reload the history table on a worker thread, so a large database never blocks the UI.
+
+        A call made while a query is running re-runs once that query ends, so
+        a filter change is never dropped.
+        """
+
+        if self.history_table is None:
+            return
+        if self._history_worker is not None:
+            self._history_stale = True
+            return
+        self._history_stale = False
+        days = HISTORY_RANGES[self.history_range_combo.currentIndex()][1] if self.history_range_combo else None
+        high_risk = self.history_high_risk_checkbox is not None and self.history_high_risk_checkbox.isChecked()
+        path = self.history_path
+
+        def task():
+            from ...daemon.store import query_results
+
+            return query_results(
+                path,
+                min_score=65 if high_risk else None,
+                since=time.time() - days * 86400 if days is not None else None,
+                limit=HISTORY_LIMIT,
+            )
+
+        self._history_worker = TaskWorker(task, self)
+        self._history_worker.succeeded.connect(self._fill_history)
+        self._history_worker.failed.connect(lambda message: print(f"[Warn] โหลดประวัติไม่สำเร็จ: {message}"))
+        self._history_worker.finished.connect(self._history_finished)
+        self._history_worker.start()
+
+    def _history_finished(self) -> None:
+        self._history_worker = None
+        if self._history_stale:
+            self.refresh_history()
+
+    def _fill_history(self, results) -> None:
+        if self.history_table is None:
+            return
+        self.history_table.setRowCount(len(results))
+        for row_index, result in enumerate(results):
+            row = (
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(result.screened_at)),
+                os.path.basename(result.path),
+                HISTORY_DETECTORS.get(result.detector, result.detector or "-"),
+                "-" if result.score is None else f"{result.score} ({result.level})",
+                "-" if result.chi_square is None else f"{result.chi_square:.2f}",
+            )
+            for column_index, value in enumerate(row):
+                item = QTableWidgetItem(value)
+                if column_index == 1:
+                    item.setToolTip(result.path)
+                elif column_index >= 3:
+                    item.setTextAlignment(Qt.AlignCenter)
+                self.history_table.setItem(row_index, column_index, item)
+
+    # ------------------------------------------------------------------
+    def on_add_cover_folder(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "เลือกโฟลเดอร์ภาพต้นฉบับ")
+        if not folder:
+            return
+        index = self.cover_index
+
+        def task(report):
+            from ...services.cover_index import CoverIndex, default_index_path
+
+            loaded = index if index is not None else CoverIndex.open(default_index_path())
+            added = loaded.update_folder(folder, progress=lambda done, total: report((done, total)))
+            loaded.save(default_index_path())
+            return loaded, added
+
+        self._run_cover_task(task, self._complete_cover_indexing, with_progress=True)
+
+    def on_find_cover(self) -> None:
+        path = self.analyze_selected_path
+        if not path or not os.path.exists(path):
+            if self.cover_status_label is not None:
+                self.cover_status_label.setText("กรุณาเลือกไฟล์ภาพที่ต้องการค้นหาต้นฉบับก่อน")
+            return
+        index = self.cover_index
+
+        def task():
+            from ...services.cover_index import CoverIndex, default_index_path
+
+            loaded = index if index is not None else CoverIndex.open(default_index_path())
+            return loaded, loaded.nearest(path) if len(loaded) else []
+
+        self._run_cover_task(task, self._complete_cover_search)
+
+    def _run_cover_task(self, task, on_success, *, with_progress: bool = False) -> None:
+        for button in (self.cover_add_button, self.cover_find_button):
+            if button is not None:
+                button.setEnabled(False)
+        self._cover_worker = TaskWorker(task, self, with_progress=with_progress)
+        self._cover_worker.succeeded.connect(on_success)
+        self._cover_worker.failed.connect(self._fail_cover_task)
+        if with_progress:
+            self._cover_worker.progress.connect(self._show_cover_progress)
+        self._cover_worker.start()
+
+    def _finish_cover_task(self) -> None:
+        for button in (self.cover_add_button, self.cover_find_button):
+            if button is not None:
+                button.setEnabled(True)
+
+    def _show_cover_progress(self, progress: tuple[int, int]) -> None:
+        done, total = progress
+        if self.cover_status_label is not None:
+            self.cover_status_label.setText(f"กำลังสร้างดัชนี... {done:,}/{total:,} ภาพ")
+
+    def _complete_cover_indexing(self, outcome) -> None:
+        self.cover_index, added = outcome
+        self._finish_cover_task()
+        if self.cover_status_label is not None:
+            self.cover_status_label.setText(
+                f"ดัชนีต้นฉบับ: {len(self.cover_index):,} ภาพ (เพิ่ม/ปรับปรุง {added:,} ภาพ)"
+            )
+
+    def _complete_cover_search(self, outcome) -> None:
+        self.cover_index, matches = outcome
+        self._finish_cover_task()
+        if self.cover_status_label is not None:
+            if not len(self.cover_index):
+                self.cover_status_label.setText("ยังไม่มีดัชนีต้นฉบับ กรุณาเพิ่มโฟลเดอร์ภาพอ้างอิงก่อน")
+            elif matches:
+                self.cover_status_label.setText(
+                    f"พบ {len(matches)} ภาพที่ใกล้เคียงจาก {len(self.cover_index):,} ภาพในดัชนี"
+                )
+            else:
+                self.cover_status_label.setText("ไม่พบภาพต้นฉบับที่ใกล้เคียงในดัชนี")
+        if self.cover_table is None:
+            return
+        self.cover_table.setRowCount(len(matches))
+        for row_index, match in enumerate(matches):
+            name = QTableWidgetItem(os.path.basename(match.path))
+            name.setToolTip(match.path)
+            self.cover_table.setItem(row_index, 0, name)
+            distance = QTableWidgetItem(f"{match.distance} บิต")
+            distance.setTextAlignment(Qt.AlignCenter)
+            self.cover_table.setItem(row_index, 1, distance)
+
+    def _fail_cover_task(self, message: str) -> None:
+        print(f"[Error] ค้นหาต้นฉบับล้มเหลว: {message}")
+        self._finish_cover_task()
+        if self.cover_status_label is not None:
+            self.cover_status_label.setText(f"ค้นหาต้นฉบับล้มเหลว: {message}")
+
+    def _fail_analysis(self, message: str) -> None:
+        print(f"[Error] การวิเคราะห์ล้มเหลว: {message}")
+        if self.analyze_button is not None:
+            self.analyze_button.setEnabled(True)
+        if self.analyze_log_console is not None:
+            self.analyze_log_console.appendPlainText(f"[ERROR] {message}")
+        if self.analyze_summary_label is not None:
+            self.analyze_summary_label.setText(f"การวิเคราะห์ล้มเหลว: {message}")
+
 
 __all__ = ["AnalyzeTab"]
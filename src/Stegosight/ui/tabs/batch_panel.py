@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Callable, Iterator
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QCheckBox,
+    QFileDialog,
+    QGroupBox,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ...services.batch import (
+    BatchResult,
+    BatchSummary,
+    list_covers,
+    list_secrets,
+    plan_batch,
+    read_manifest,
+    run_batch,
+    summarize,
+)
+from ...services.ingest import ingest_secret
+from ...services.shards import embed_shards
+from ...services.sink import discard_file
+from ..utils import format_file_size
+from ..workers import TaskWorker
+
+
+class BatchEmbedPanel(QGroupBox):
+    """Folder-to-folder embedding across a process pool with per-file status."""
+
+    def __init__(
+        self,
+        method_provider: Callable[[], str],
+        key_provider: Callable[[], str | None],
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__("โหมดแบตช์: ซ่อนข้อมูลหลายไฟล์พร้อมกัน", parent)
+        self._method_provider = method_provider
+        self._key_provider = key_provider
+        self._worker: TaskWorker | None = None
+        self._rows: dict[str, int] = {}
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(8)
+
+        self.covers_input = self._path_row(layout, "โฟลเดอร์ไฟล์ต้นฉบับ", self._browse_covers)
+        self.secrets_input = self._path_row(layout, "โฟลเดอร์ข้อมูลลับ / Manifest", self._browse_secrets)
+        manifest_button = QPushButton("เลือก Manifest (JSON) หรือไฟล์ลับเดียว")
+        manifest_button.clicked.connect(self._browse_manifest)
+        layout.addWidget(manifest_button)
+        self.output_input = self._path_row(layout, "โฟลเดอร์ผลลัพธ์", self._browse_output)
+        self.shard_checkbox = QCheckBox("แบ่งไฟล์ลับเดียวกระจายไปทุกไฟล์ต้นฉบับ (Sharding)")
+        layout.addWidget(self.shard_checkbox)
+
+        self.start_button = QPushButton("▶️ เริ่มงานแบตช์")
+        self.start_button.clicked.connect(self.on_start_clicked)
+        layout.addWidget(self.start_button)
+
+        self.status_table = QTableWidget(0, 4)
+        self.status_table.setHorizontalHeaderLabels(["Secret", "Cover", "Status", "Risk"])
+        self.status_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.status_table.verticalHeader().setVisible(False)
+        self.status_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.status_table.setMinimumHeight(160)
+        layout.addWidget(self.status_table)
+
+        self.throughput_label = QLabel("ยังไม่มีงานแบตช์")
+        self.throughput_label.setWordWrap(True)
+        self.throughput_label.setStyleSheet("color: #546e7a; font-size: 12px;")
+        layout.addWidget(self.throughput_label)
+
+    # ------------------------------------------------------------------
+    def _path_row(self, layout: QVBoxLayout, placeholder: str, browse: Callable[[], None]) -> QLineEdit:
+        row = QHBoxLayout()
+        line = QLineEdit()
+        line.setPlaceholderText(placeholder)
+        button = QPushButton("...")
+        button.setFixedWidth(36)
+        button.clicked.connect(browse)
+        row.addWidget(line)
+        row.addWidget(button)
+        layout.addLayout(row)
+        return line
+
+    def _browse_covers(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "เลือกโฟลเดอร์ไฟล์ต้นฉบับ")
+        if folder:
+            self.covers_input.setText(folder)
+
+    def _browse_secrets(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "เลือกโฟลเดอร์ข้อมูลลับ")
+        if folder:
+            self.secrets_input.setText(folder)
+
+    def _browse_manifest(self) -> None:
+        path, _ = QFileDialog.getOpenFileName(self, "เลือก Manifest หรือไฟล์ลับ")
+        if path:
+            self.secrets_input.setText(path)
+
+    def _browse_output(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "เลือกโฟลเดอร์ผลลัพธ์")
+        if folder:
+            self.output_input.setText(folder)
+
+    # ------------------------------------------------------------------
+    def on_start_clicked(self) -> None:
+        covers_dir = self.covers_input.text().strip()
+        secrets_source = self.secrets_input.text().strip()
+        output_dir = self.output_input.text().strip()
+        if not (os.path.isdir(covers_dir) and os.path.exists(secrets_source) and output_dir):
+            QMessageBox.warning(self, "STEGOSIGHT", "กรุณาระบุโฟลเดอร์ต้นฉบับ ข้อมูลลับ และผลลัพธ์ให้ครบ")
+            return
+
+        self._rows = {}
+        self.status_table.setRowCount(0)
+        try:
+            if self.shard_checkbox.isChecked():
+                results, count = self._prepare_shards(covers_dir, secrets_source, output_dir)
+            else:
+                results, count = self._prepare_batch(covers_dir, secrets_source, output_dir)
+        except (OSError, ValueError) as exc:
+            QMessageBox.critical(self, "STEGOSIGHT", f"ไม่สามารถเตรียมงานแบตช์ได้\n{exc}")
+            return
+
+        def task(report: Callable[[object], None]) -> BatchSummary:
+            started = time.perf_counter()
+            collected = []
+            for result in results():
+                collected.append(result)
+                report(result)
+            return summarize(collected, time.perf_counter() - started)
+
+        self.start_button.setEnabled(False)
+        self.throughput_label.setText(f"กำลังประมวลผล {count} ไฟล์...")
+        self._worker = TaskWorker(task, self, with_progress=True)
+        self._worker.progress.connect(self._show_result)
+        self._worker.succeeded.connect(self._finish)
+        self._worker.failed.connect(self._fail)
+        self._worker.start()
+
+    def _prepare_batch(
+        self, covers_dir: str, secrets_source: str, output_dir: str
+    ) -> tuple[Callable[[], Iterator[BatchResult]], int]:
+        secrets = (
+            list_secrets(secrets_source)
+            if os.path.isdir(secrets_source)
+            else read_manifest(secrets_source)
+        )
+        jobs, rejected = plan_batch(
+            list_covers(covers_dir),
+            secrets,
+            output_dir,
+            self._method_provider(),
+            self._key_provider(),
+        )
+        for job in jobs:
+            self._set_row(job.secret, job.cover, "รอคิว", "")
+        for result in rejected:
+            self._show_result(result)
+        return lambda: run_batch(jobs), len(jobs)
+
+    def _prepare_shards(
+        self, covers_dir: str, secret: str, output_dir: str
+    ) -> tuple[Callable[[], Iterator[BatchResult]], int]:
+        if not os.path.isfile(secret):
+            raise ValueError("โหมด Sharding ต้องเลือกไฟล์ลับเพียงไฟล์เดียว")
+        covers = list_covers(covers_dir)
+        method, key = self._method_provider(), self._key_provider()
+
+        def results() -> Iterator[BatchResult]:
+            # Streamed to a spool file on the worker thread; every shard is
+            # sealed on its own, so the spool is only packed here.
+            spooled = ingest_secret(secret, output_dir)
+            try:
+                yield from embed_shards(covers, spooled, output_dir, method, key=key)
+            finally:
+                discard_file(spooled.path)
+
+        for index, cover in enumerate(covers):
+            self._set_row(f"shard {index + 1}/{len(covers)}", cover, "รอคิว", "")
+        return results, len(covers)
+
+    def _set_row(self, secret: str, cover: str | None, status: str, risk: str) -> None:
+        row = self._rows.get(secret)
+        if row is None:
+            row = self.status_table.rowCount()
+            self.status_table.insertRow(row)
+            self._rows[secret] = row
+        values = (os.path.basename(secret), os.path.basename(cover) if cover else "-", status, risk)
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(value)
+            if column == 3:
+                item.setTextAlignment(Qt.AlignCenter)
+            self.status_table.setItem(row, column, item)
+
+    def _show_result(self, result: BatchResult) -> None:
+        if result.ok:
+            status = f"สำเร็จ ({result.seconds:.2f} s)"
+        elif result.status == "unmatched":
+            status = "ไม่มีไฟล์ต้นฉบับที่จุพอ"
+        else:
+            status = f"ล้มเหลว: {result.message}"
+        risk = "" if result.risk_score is None else str(result.risk_score)
+        self._set_row(result.secret, result.cover, status, risk)
+
+    def _finish(self, summary: BatchSummary) -> None:
+        self.start_button.setEnabled(True)
+        self.throughput_label.setText(
+            f"สำเร็จ {summary.succeeded}/{summary.files} ไฟล์ใน {summary.elapsed:.1f} s · "
+            f"{summary.files_per_second:.2f} ไฟล์/s · {summary.megabytes_per_second:.1f} MB/s · "
+            f"ข้อมูลลับรวม {format_file_size(summary.payload_bytes)}"
+        )
+
+    def _fail(self, message: str) -> None:
+        self.start_button.setEnabled(True)
+        self.throughput_label.setText(f"งานแบตช์ล้มเหลว: {message}")
+
+
+__all__ = ["BatchEmbedPanel"]
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import io
 import os
+import shutil
+from typing import TYPE_CHECKING, BinaryIO
 
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import (
     QCheckBox,
+    QFileDialog,
     QFrame,
     QGroupBox,
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QMessageBox,
     QPlainTextEdit,
     QProgressBar,
     QPushButton,
@@ -23,8 +28,19 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+from ...services.embedding import default_output_path, embed_file, probe_capacity, supported_methods
+from ...services.ingest import ingest_secret
+from ...services.profiling import Profiler, span
+from ...services.registry import EMBED, method_cards
+from ...services.sink import discard_file
 from ..components import FileDropArea, MethodCard, PreviewImageLabel
 from ..utils import estimate_capacity, format_file_size, infer_media_type_from_suffix
+from ..workers import TaskWorker
+from .batch_panel import BatchEmbedPanel
+
+if TYPE_CHECKING:
+    from ...services.cost_cache import CostCache
+    from ...services.risk import RiskReport
 
 
 class EmbedTab(QWidget):
@@ -37,6 +53,7 @@ class EmbedTab(QWidget):
         self.embed_file_info_label: QLabel | None = None
         self.embed_progress_bar: QProgressBar | None = None
         self.embed_risk_label: QLabel | None = None
+        self.embed_profile_label: QLabel | None = None
         self.embed_method_summary_label: QLabel | None = None
         self.embed_hint_label: QLabel | None = None
         self.cover_support_label: QLabel | None = None
@@ -75,6 +92,15 @@ class EmbedTab(QWidget):
             "video": "เทคนิคสำหรับไฟล์วิดีโอ ครอบคลุมการปรับอัตโนมัติ LSB และ Metadata",
         }
         self._embed_preview_source: str | None = None
+        self.embed_cover_path: str | None = None
+        self.embed_secret_path: str | None = None
+        self.embed_output_path: str | None = None
+        self.embed_profiler: Profiler | None = None
+        self._embed_worker: TaskWorker | None = None
+        # Shared across retries so re-embedding the same cover reuses its cost
+        # map; created by the first embed so NumPy stays out of GUI startup.
+        self.embed_cost_cache: CostCache | None = None
+        self.batch_panel: BatchEmbedPanel | None = None
 
         self._build_ui()
 
@@ -212,6 +238,11 @@ class EmbedTab(QWidget):
         step4_layout.addWidget(self.embed_hint_label)
         control_layout.addWidget(step4_group)
 
+        self.batch_panel = BatchEmbedPanel(
+            lambda: self.embed_selected_method, self._batch_key
+        )
+        control_layout.addWidget(self.batch_panel)
+
         control_layout.addStretch(1)
 
         self.embed_button = QPushButton("🔒 เริ่มการซ่อนข้อมูล")
@@ -301,18 +332,27 @@ class EmbedTab(QWidget):
         self.embed_risk_label = QLabel("Risk Score: -")
         self.embed_risk_label.setAlignment(Qt.AlignCenter)
         self.embed_risk_label.setObjectName("EmbedRiskLabel")
+        self.embed_profile_label = QLabel("")
+        self.embed_profile_label.setObjectName("EmbedProfileLabel")
+        self.embed_profile_label.setWordWrap(True)
+        self.embed_profile_label.setStyleSheet("color: #546e7a; font-size: 11px;")
         card_layout.addWidget(success_label)
         card_layout.addWidget(self.embed_risk_label)
+        card_layout.addWidget(self.embed_profile_label)
 
         action_layout = QHBoxLayout()
         save_button = QPushButton("💾 บันทึกไฟล์")
-        save_button.clicked.connect(lambda: print("[UI] Save stego file"))
+        save_button.clicked.connect(self.on_save_stego_clicked)
         analyze_button = QPushButton("วิเคราะห์เชิงลึก")
         analyze_button.clicked.connect(
             lambda: print("[UI] Requesting deep analysis")
         )
+        trace_button = QPushButton("บันทึก Trace (JSON)")
+        trace_button.setToolTip("เปิดได้ใน chrome://tracing หรือ ui.perfetto.dev")
+        trace_button.clicked.connect(self.on_save_trace_clicked)
         action_layout.addWidget(save_button)
         action_layout.addWidget(analyze_button)
+        action_layout.addWidget(trace_button)
         card_layout.addLayout(action_layout)
 
         layout.addWidget(card)
@@ -321,58 +361,7 @@ class EmbedTab(QWidget):
 
     # ------------------------------------------------------------------
     def _build_embed_method_definitions(self) -> dict[str, dict[str, dict[str, str]]]:
-        return {
-            "image": {
-                "content_adaptive": {
-                    "title": "✨ Content-Adaptive (แนะนำ)",
-                    "desc": "วิเคราะห์ขอบและพื้นผิวเพื่อเลือกพื้นที่ฝังที่แนบเนียน",
-                },
-                "lsb": {
-                    "title": "🔹 LSB Matching",
-                    "desc": "ปรับ LSB เพื่อลดความผิดปกติทางสถิติ (เหมาะกับ PNG/BMP)",
-                },
-                "pvd": {
-                    "title": "🔸 Pixel Value Differencing",
-                    "desc": "กำหนดจำนวนบิตจากความต่างพิกเซล เพิ่มปริมาณข้อมูล",
-                },
-                "dct": {
-                    "title": "📊 Discrete Cosine Transform",
-                    "desc": "ฝังข้อมูลในสัมประสิทธิ์ DCT สำหรับ JPEG ทนการบีบอัดซ้ำ",
-                },
-                "append": {
-                    "title": "📎 ต่อท้ายไฟล์ (Tail Append)",
-                    "desc": "พ่วง payload ต่อท้ายไฟล์ต้นฉบับ (เหมาะกับ PNG/BMP)",
-                },
-            },
-            "audio": {
-                "audio_adaptive": {
-                    "title": "✨ Adaptive Audio",
-                    "desc": "วิเคราะห์ไดนามิกเสียง เลือกตำแหน่งฝังที่แนบเนียน",
-                },
-                "audio_lsb": {
-                    "title": "🎧 LSB ในสัญญาณเสียง",
-                    "desc": "ซ่อนข้อมูลด้วย LSB สำหรับ WAV/MP3/FLAC",
-                },
-                "audio_metadata": {
-                    "title": "🏷️ Metadata Tagging",
-                    "desc": "ฝังข้อมูลใน Meta Tag (ID3/Tag สำหรับ MP3/FLAC)",
-                },
-            },
-            "video": {
-                "video_adaptive": {
-                    "title": "✨ Adaptive Video",
-                    "desc": "ประเมินเฟรมวิดีโอและเลือกพื้นที่ที่ยากต่อการสังเกต",
-                },
-                "video_lsb": {
-                    "title": "🎞️ Frame LSB",
-                    "desc": "ซ่อนข้อมูลทีละเฟรมด้วย LSB (รองรับ MP4/AVI/MKV/MOV)",
-                },
-                "video_metadata": {
-                    "title": "🏷️ Metadata Tagging",
-                    "desc": "ฝังข้อมูลในเมทาดาทาของไฟล์วิดีโอ (MP4/MKV/MOV)",
-                },
-            },
-        }
+        return method_cards(EMBED)
 
     def _populate_embed_method_cards(self, media_type: str) -> None:
         layout = self.embed_method_container_layout
@@ -462,6 +451,7 @@ class EmbedTab(QWidget):
     # ------------------------------------------------------------------
     def on_cover_file_selected(self, path: str) -> None:
         print(f"[Action] Cover file selected: {path}")
+        self.embed_cover_path = path
         media_type = infer_media_type_from_suffix(os.path.splitext(path)[1])
         if media_type:
             self._set_embed_media_type(media_type)
@@ -471,21 +461,133 @@ class EmbedTab(QWidget):
 
     def on_secret_file_selected(self, path: str) -> None:
         print(f"[Action] Secret file selected: {path}")
+        self.embed_secret_path = path
+        if self.secret_file_drop is not None and os.path.exists(path):
+            # Only the size is read here; the content is streamed when embedding.
+            self.secret_file_drop.setPrompt(
+                f"📄 {os.path.basename(path)} ({format_file_size(os.path.getsize(path))})"
+            )
+
+    def _secret_source(self) -> str | BinaryIO | None:
+        """The typed text, else the chosen secret file's path; never read whole here."""
+
+        text = self.secret_text_edit.toPlainText() if self.secret_text_edit else ""
+        if text:
+            return io.BytesIO(text.encode("utf-8"))
+        path = self.embed_secret_path
+        if path and os.path.exists(path) and os.path.getsize(path) > 0:
+            return path
+        return None
+
+    def _batch_key(self) -> str | None:
+        if self.encrypt_checkbox is None or not self.encrypt_checkbox.isChecked():
+            return None
+        return (self.password_input.text() if self.password_input else "") or None
 
     def on_embed_clicked(self) -> None:
         print(
             f"[Action] เริ่มการซ่อนข้อมูล... (method={self.embed_selected_method})"
         )
+        cover = self.embed_cover_path
+        if not cover or not os.path.exists(cover):
+            QMessageBox.warning(self, "STEGOSIGHT", "กรุณาเลือกไฟล์ต้นฉบับก่อน")
+            return
+        source = self._secret_source()
+        if source is None:
+            QMessageBox.warning(self, "STEGOSIGHT", "กรุณาระบุข้อมูลลับที่ต้องการซ่อน")
+            return
+        key = ""
+        if self.encrypt_checkbox is not None and self.encrypt_checkbox.isChecked():
+            key = self.password_input.text() if self.password_input else ""
+            confirm = self.confirm_password_input.text() if self.confirm_password_input else ""
+            if key != confirm:
+                QMessageBox.warning(self, "STEGOSIGHT", "รหัสผ่านและการยืนยันไม่ตรงกัน")
+                return
+
+        method = self.embed_selected_method
+        output = default_output_path(cover)
+        # The pipeline seals the secret itself; the engine only needs the key.
+        options = {"key": key} if key else {}
+
+        profiler = Profiler(f"embed:{method}")
+
+        def task() -> RiskReport:
+            from ...services.cost_cache import CostCache
+            from ...services.risk import RiskTracker
+
+            if self.embed_cost_cache is None:
+                self.embed_cost_cache = CostCache()
+            tracker = RiskTracker()
+            with profiler.activate():
+                secret = ingest_secret(source, os.path.dirname(os.path.abspath(output)), password=key or None)
+                try:
+                    with secret.mapped() as payload:
+                        embed_file(
+                            cover,
+                            output,
+                            payload,
+                            method,
+                            tracker=tracker,
+                            cost_cache=self.embed_cost_cache,
+                            **options,
+                        )
+                finally:
+                    discard_file(secret.path)
+                with span("risk.report"):
+                    return tracker.report()
+
+        self.embed_output_path = output
+        self.embed_profiler = profiler
+        if self.embed_button is not None:
+            self.embed_button.setEnabled(False)
         if self.embed_context_stack is not None:
             self.embed_context_stack.setCurrentIndex(2)
-        QTimer.singleShot(1500, self._complete_embedding)
+        self._embed_worker = TaskWorker(task, self)
+        self._embed_worker.succeeded.connect(self._complete_embedding)
+        self._embed_worker.failed.connect(self._fail_embedding)
+        self._embed_worker.start()
 
-    def _complete_embedding(self) -> None:
+    def _complete_embedding(self, report: RiskReport) -> None:
         print("[Result] การซ่อนข้อมูลเสร็จสมบูรณ์")
+        if self.embed_button is not None:
+            self.embed_button.setEnabled(True)
         if self.embed_context_stack is not None:
             self.embed_context_stack.setCurrentIndex(3)
         if self.embed_risk_label is not None:
-            self.embed_risk_label.setText("Risk Score: 18 (ต่ำ)")
+            self.embed_risk_label.setText(report.summary())
+        if self.embed_profile_label is not None and self.embed_profiler is not None:
+            self.embed_profile_label.setText(self.embed_profiler.summary())
+            print(f"[Profile]\n{self.embed_profiler.summary()}")
+
+    def _fail_embedding(self, message: str) -> None:
+        print(f"[Error] การซ่อนข้อมูลล้มเหลว: {message}")
+        self.embed_output_path = None
+        if self.embed_button is not None:
+            self.embed_button.setEnabled(True)
+        if self.embed_context_stack is not None:
+            self.embed_context_stack.setCurrentIndex(1)
+        QMessageBox.critical(self, "STEGOSIGHT", f"การซ่อนข้อมูลล้มเหลว\n{message}")
+
+    def on_save_stego_clicked(self) -> None:
+        source = self.embed_output_path
+        if not source or not os.path.exists(source):
+            return
+        target, _ = QFileDialog.getSaveFileName(self, "บันทึกไฟล์", source)
+        if not target or os.path.abspath(target) == os.path.abspath(source):
+            return
+        shutil.move(source, target)
+        self.embed_output_path = target
+        print(f"[Result] บันทึกไฟล์ที่ {target}")
+
+    def on_save_trace_clicked(self) -> None:
+        if self.embed_profiler is None:
+            return
+        target, _ = QFileDialog.getSaveFileName(
+            self, "บันทึก Trace", "stegosight-trace.json", "JSON (*.json)"
+        )
+        if target:
+            self.embed_profiler.write_trace(target)
+            print(f"[Result] บันทึก Trace ที่ {target}")
 
     def _update_embed_preview(self, path: str) -> None:
         if not self.embed_preview_label or not self.embed_file_info_label:
@@ -513,9 +615,22 @@ class EmbedTab(QWidget):
             f"ชื่อไฟล์: {os.path.basename(path)}\n"
             f"ขนาดไฟล์: {format_file_size(file_size)}\n"
             f"ประเภทไฟล์: {os.path.splitext(path)[1] or 'ไม่ทราบ'}\n"
-            f"ความจุโดยประมาณ: {estimate_capacity(file_size)}"
+            f"ความจุโดยประมาณ: {self._capacity_text(path, file_size)}"
         )
         self.embed_file_info_label.setText(info_text)
 
+    def _capacity_text(self, path: str, file_size: int) -> str:
+        """Header-probed capacity of the selected method, else the size heuristic."""
+
+        method = self.embed_selected_method
+        if method in supported_methods(path):
+            try:
+                capacity = probe_capacity(path, method)
+            except (OSError, ValueError):
+                pass
+            else:
+                return f"{format_file_size(capacity)} ของข้อมูลลับ ({method})"
+        return estimate_capacity(file_size)
+
 
 __all__ = ["EmbedTab"]
@@ -5,10 +5,11 @@ import os
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QCheckBox,
+    QFileDialog,
     QGroupBox,
     QLabel,
     QLineEdit,
-    QPlainTextEdit,
+    QMessageBox,
     QPushButton,
     QSplitter,
     QStackedWidget,
@@ -17,8 +18,17 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
-from ..components import FileDropArea, MethodCard
-from ..utils import infer_media_type_from_suffix
+from ...services.embedding import extract_file
+from ...services.header import PayloadError
+from ...services.ingest import UnpackWriter
+from ...services.keys import KeyCache
+from ...services.profiling import Profiler
+from ...services.registry import EXTRACT, method_cards
+from ...services.shards import is_shard, parse_shard, reassemble_shards
+from ...services.sink import ResultSink, discard_file, keep_file
+from ..components import FileDropArea, MethodCard, PagedTextView
+from ..utils import format_file_size, infer_media_type_from_suffix
+from ..workers import TaskWorker
 
 
 class ExtractTab(QWidget):
@@ -27,12 +37,17 @@ class ExtractTab(QWidget):
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.extract_context_stack: QStackedWidget | None = None
-        self.extract_text_output: QPlainTextEdit | None = None
+        self.extract_text_output: PagedTextView | None = None
+        self.extract_hex_checkbox: QCheckBox | None = None
         self.extract_file_info_label: QLabel | None = None
         self.extract_encrypted_checkbox: QCheckBox | None = None
         self.extract_password_input: QLineEdit | None = None
         self.extract_button: QPushButton | None = None
         self.extract_drop: FileDropArea | None = None
+        self.extract_paths: list[str] = []
+        self.extract_result_path: str | None = None
+        self._extract_worker: TaskWorker | None = None
+        self.extract_profiler: Profiler | None = None
 
         self.extract_method_container: QWidget | None = None
         self.extract_method_container_layout: QVBoxLayout | None = None
@@ -59,8 +74,11 @@ class ExtractTab(QWidget):
 
         step1_group = QGroupBox("ขั้นตอนที่ 1: เลือกไฟล์ที่ต้องการตรวจสอบ")
         step1_layout = QVBoxLayout(step1_group)
-        self.extract_drop = FileDropArea("🖼️ ลากไฟล์ Stego มาวาง หรือกดเพื่อเลือก")
-        self.extract_drop.fileSelected.connect(self.on_extract_file_selected)
+        self.extract_drop = FileDropArea(
+            "🖼️ ลากไฟล์ Stego มาวาง หรือกดเพื่อเลือก (เลือกหลายไฟล์เพื่อรวมข้อมูลที่แบ่งส่วน)",
+            multiple=True,
+        )
+        self.extract_drop.filesSelected.connect(self.on_extract_files_selected)
         step1_layout.addWidget(self.extract_drop)
         control_layout.addWidget(step1_group)
 
@@ -145,9 +163,11 @@ class ExtractTab(QWidget):
         result_tabs = QTabWidget()
         text_tab = QWidget()
         text_layout = QVBoxLayout(text_tab)
-        self.extract_text_output = QPlainTextEdit()
-        self.extract_text_output.setReadOnly(True)
+        self.extract_text_output = PagedTextView()
         self.extract_text_output.setObjectName("ExtractTextOutput")
+        self.extract_hex_checkbox = QCheckBox("แสดงแบบ Hex")
+        self.extract_hex_checkbox.toggled.connect(self.extract_text_output.setHexMode)
+        text_layout.addWidget(self.extract_hex_checkbox)
         text_layout.addWidget(self.extract_text_output)
 
         file_tab = QWidget()
@@ -156,7 +176,7 @@ class ExtractTab(QWidget):
         self.extract_file_info_label.setWordWrap(True)
         self.extract_file_info_label.setObjectName("ExtractFileInfo")
         save_button = QPushButton("บันทึกไฟล์ที่ดึงได้...")
-        save_button.clicked.connect(lambda: print("[UI] Save extracted file"))
+        save_button.clicked.connect(self.on_save_extracted_clicked)
         file_layout.addWidget(self.extract_file_info_label)
         file_layout.addWidget(save_button)
 
@@ -168,50 +188,7 @@ class ExtractTab(QWidget):
 
     # ------------------------------------------------------------------
     def _build_extract_method_definitions(self) -> dict[str, dict[str, dict[str, str]]]:
-        return {
-            "image": {
-                "adaptive": {
-                    "title": "✨ ตรวจจับอัตโนมัติ (แนะนำ)",
-                    "desc": "ลองถอดข้อมูลด้วยหลายเทคนิคเช่น LSB, PVD, DCT และ Tail Append",
-                },
-                "lsb": {
-                    "title": "🔹 LSB Matching",
-                    "desc": "ดึงข้อมูลจากการฝังแบบ LSB (เหมาะกับ PNG/BMP)",
-                },
-                "pvd": {
-                    "title": "🔸 Pixel Value Differencing",
-                    "desc": "ใช้ความต่างของพิกเซลเพื่อตีความบิตที่ซ่อนอยู่",
-                },
-                "dct": {
-                    "title": "📊 Discrete Cosine Transform",
-                    "desc": "กู้ข้อมูลที่ฝังในสัมประสิทธิ์ DCT ของไฟล์ JPEG",
-                },
-                "append": {
-                    "title": "📎 Tail Append",
-                    "desc": "ตรวจสอบข้อมูลที่อาจถูกต่อท้ายไฟล์",
-                },
-            },
-            "audio": {
-                "audio_adaptive": {
-                    "title": "✨ ตรวจจับอัตโนมัติ",
-                    "desc": "ทดลอง LSB และเทคนิคเฉพาะเสียงของ STEGOSIGHT",
-                },
-                "audio_lsb": {
-                    "title": "🎧 LSB ในสัญญาณเสียง",
-                    "desc": "ถอดข้อมูลที่ซ่อนในบิตต่ำสุดของสัญญาณ PCM",
-                },
-            },
-            "video": {
-                "video_adaptive": {
-                    "title": "✨ ตรวจจับอัตโนมัติ",
-                    "desc": "ลองกู้ข้อมูลจากเฟรมวิดีโอโดยอัตโนมัติ",
-                },
-                "video_lsb": {
-                    "title": "🎞️ Frame LSB",
-                    "desc": "ดึงข้อมูลจากบิตต่ำสุดของแต่ละพิกเซลในเฟรม",
-                },
-            },
-        }
+        return method_cards(EXTRACT)
 
     def _populate_extract_method_cards(self, media_type: str) -> None:
         layout = self.extract_method_container_layout
@@ -268,6 +245,12 @@ class ExtractTab(QWidget):
         self._populate_extract_method_cards(media_type)
 
     # ------------------------------------------------------------------
+    def on_extract_files_selected(self, paths: list[str]) -> None:
+        print(f"[Action] Extract targets selected: {len(paths)} file(s)")
+        self.extract_paths = list(paths)
+        if paths:
+            self.on_extract_file_selected(paths[0])
+
     def on_extract_file_selected(self, path: str) -> None:
         print(f"[Action] Extract target selected: {path}")
         media_type = infer_media_type_from_suffix(os.path.splitext(path)[1])
@@ -278,17 +261,100 @@ class ExtractTab(QWidget):
         print(
             f"[Action] เริ่มการดึงข้อมูล... (method={self.extract_selected_method})"
         )
+        paths = [path for path in self.extract_paths if os.path.exists(path)]
+        if not paths:
+            QMessageBox.warning(self, "STEGOSIGHT", "กรุณาเลือกไฟล์ที่ต้องการดึงข้อมูลก่อน")
+            return
+
+        method = self.extract_selected_method
+        key = (self.extract_password_input.text() if self.extract_password_input else "") or None
+        self.extract_profiler = profiler = Profiler(f"extract:{method}")
+
+        def task() -> str:
+            # Written next to the stego file, so saving it nearby is a rename.
+            # Every attempt of this job shares derived keys; wiped when the job ends.
+            with ResultSink(os.path.dirname(os.path.abspath(paths[0]))) as sink:
+                with profiler.activate(), KeyCache() as key_cache:
+                    # Packed secrets are inflated and verified on their way in.
+                    output = UnpackWriter(sink)
+                    if len(paths) > 1:
+                        reassemble_shards(paths, method, output, key=key, key_cache=key_cache)
+                    else:
+                        data = extract_file(paths[0], method, password=key, key_cache=key_cache)
+                        if is_shard(data):
+                            header, data = parse_shard(data)
+                            if header.total != 1:
+                                raise PayloadError(
+                                    f"ไฟล์นี้เป็นส่วนที่ {header.index + 1} จาก {header.total} "
+                                    "กรุณาเลือกไฟล์ทุกส่วนพร้อมกัน"
+                                )
+                        output.write(data)
+                    output.close()
+            return sink.path
+
+        if self.extract_button is not None:
+            self.extract_button.setEnabled(False)
+        self._extract_worker = TaskWorker(task, self)
+        self._extract_worker.succeeded.connect(self._complete_extraction)
+        self._extract_worker.failed.connect(self._fail_extraction)
+        self._extract_worker.start()
+
+    def _complete_extraction(self, path: str) -> None:
+        if self.extract_button is not None:
+            self.extract_button.setEnabled(True)
+        self._discard_result()
+        self.extract_result_path = path
+        size = os.path.getsize(path)
+
         if self.extract_context_stack is not None:
             self.extract_context_stack.setCurrentIndex(1)
         if self.extract_text_output is not None:
-            self.extract_text_output.setPlainText(
-                "ผลลัพธ์ตัวอย่าง: \n" "พบข้อความลับที่ถูกถอดรหัสเรียบร้อย"
-            )
+            # Only the first page is read here; the rest loads on scroll.
+            self.extract_text_output.open(path)
+            if self.extract_hex_checkbox is not None:
+                self.extract_hex_checkbox.blockSignals(True)
+                self.extract_hex_checkbox.setChecked(self.extract_text_output.hex_mode)
+                self.extract_hex_checkbox.blockSignals(False)
+        profile = self.extract_profiler.summary() if self.extract_profiler is not None else ""
         if self.extract_file_info_label is not None:
             self.extract_file_info_label.setText(
-                "ไฟล์ลับ: secret_document.txt\nขนาด: 4.2 KB"
+                f"ไฟล์ลับ: {len(self.extract_paths)} ไฟล์ต้นทาง\nขนาด: {format_file_size(size)}"
+                + (f"\n\nเวลาแต่ละขั้นตอน:\n{profile}" if profile else "")
             )
         print("[Result] การดึงข้อมูลเสร็จสมบูรณ์")
+        if profile:
+            print(f"[Profile]\n{profile}")
+
+    def _fail_extraction(self, message: str) -> None:
+        print(f"[Error] การดึงข้อมูลล้มเหลว: {message}")
+        if self.extract_button is not None:
+            self.extract_button.setEnabled(True)
+        QMessageBox.critical(self, "STEGOSIGHT", f"การดึงข้อมูลล้มเหลว\n{message}")
+
+    def _discard_result(self) -> None:
+        discard_file(self.extract_result_path)
+        self.extract_result_path = None
+        if self.extract_text_output is not None:
+            self.extract_text_output.clear()
+
+    def on_save_extracted_clicked(self) -> None:
+        source = self.extract_result_path
+        if not source or not os.path.exists(source):
+            return
+        target, _ = QFileDialog.getSaveFileName(
+            self, "บันทึกไฟล์ที่ดึงได้", os.path.dirname(self.extract_paths[0]) if self.extract_paths else ""
+        )
+        if not target:
+            return
+        try:
+            keep_file(source, target)
+        except OSError as exc:
+            QMessageBox.critical(self, "STEGOSIGHT", f"บันทึกไฟล์ไม่สำเร็จ\n{exc}")
+            return
+        self.extract_result_path = None
+        if self.extract_text_output is not None:
+            self.extract_text_output.set_source(target)
+        print(f"[Result] บันทึกไฟล์ที่ {target}")
 
 
 __all__ = ["ExtractTab"]
@@ -1,8 +1,9 @@
-from .file_info import estimate_capacity, format_file_size
+from .file_info import estimate_capacity, format_file_size, format_hex_dump
 from .media import infer_media_type_from_suffix
 
 __all__ = [
     "estimate_capacity",
     "format_file_size",
+    "format_hex_dump",
     "infer_media_type_from_suffix",
 ]
@@ -16,4 +16,16 @@ def estimate_capacity(size: int) -> str:
     return f"~{format_file_size(int(approx))} ของข้อมูลลับ"
 
 
-__all__ = ["format_file_size", "estimate_capacity"]
+def format_hex_dump(data: bytes, offset: int = 0, width: int = 16) -> str:
+    """``offset  hex bytes  |ascii|`` lines, ``width`` bytes per line."""
+
+    lines = []
+    for start in range(0, len(data), width):
+        row = data[start : start + width]
+        hex_part = " ".join(f"{byte:02x}" for byte in row)
+        text = "".join(chr(byte) if 32 <= byte < 127 else "." for byte in row)
+        lines.append(f"{offset + start:08x}  {hex_part:<{width * 3 - 1}}  |{text}|")
+    return "\n".join(lines)
+
+
+__all__ = ["format_file_size", "format_hex_dump", "estimate_capacity"]
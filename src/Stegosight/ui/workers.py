@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class TaskWorker(QThread):
+    """Runs a callable off the GUI thread and reports its outcome.
+
+    With ``with_progress`` the task is called with a callback that forwards
+    intermediate values through :attr:`progress`.
+    """
+
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(object)
+
+    def __init__(self, task: Callable[..., Any], parent=None, *, with_progress: bool = False) -> None:
+        super().__init__(parent)
+        self._task = task
+        self._with_progress = with_progress
+
+    def run(self) -> None:  # type: ignore[override]
+        try:
+            result = self._task(self.progress.emit) if self._with_progress else self._task()
+        except Exception as exc:  # surfaced to the user, not swallowed
+            self.failed.emit(str(exc))
+        else:
+            self.succeeded.emit(result)
+
+
+__all__ = ["TaskWorker"]